@@ -0,0 +1,98 @@
+# alternatives.py
+"""
+Alternative routes with the penalty method.
+
+After the shortest route is found, the weights of its edges are multiplied
+by a penalty and the search runs again, so the next route is pushed onto
+other roads. A candidate is kept when it is not much longer than the
+shortest route and does not share too much of its length with any route
+already kept. Penalties only ever raise weights, so the straight-line A*
+heuristic stays admissible on the penalized graph.
+
+Each round is one A* search on a CompactGraph that shares every buffer
+but the weights with the original, instead of Yen's algorithm on the
+NetworkX graph, which runs one search per node of every previous path.
+"""
+import numpy as np
+
+from dijkstra_algorithm import _astar_search, get_compact_graph
+
+DEFAULT_ALTERNATIVES = 3
+# Share of a candidate's length that may overlap any earlier route
+DEFAULT_MAX_OVERLAP = 0.7
+# Longest acceptable alternative relative to the shortest route
+DEFAULT_MAX_STRETCH = 1.4
+DEFAULT_PENALTY = 1.5
+
+
+def _path_edges(graph, path):
+    """CSR positions of the edges along a path of original node ids."""
+    offsets, targets, _ = graph.adjacency()
+    index = graph.node_index
+    positions = []
+    for u, v in zip(path[:-1], path[1:]):
+        i, j = index[u], index[v]
+        for e in range(offsets[i], offsets[i + 1]):
+            if targets[e] == j:
+                positions.append(e)
+                break
+    return np.asarray(positions, dtype=np.int64)
+
+
+def alternative_routes(G, start, end, k=DEFAULT_ALTERNATIVES, max_overlap=DEFAULT_MAX_OVERLAP,
+                       max_stretch=DEFAULT_MAX_STRETCH, penalty=DEFAULT_PENALTY, max_rounds=None):
+    """
+    Up to k meaningfully different routes from start to end, shortest first.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        start, end: Original node ids
+        k: Number of routes wanted, including the shortest
+        max_overlap: Largest share of a route's length it may have in
+            common with any earlier route (0..1)
+        max_stretch: Longest route accepted, as a multiple of the shortest
+        penalty: Factor applied to the weights of every route found
+        max_rounds: Searches after the first (default 3 * k)
+
+    Returns:
+        list of dicts with path, distance_m, overlap (largest shared share
+        with an earlier route), settled_nodes and engine; empty if end is
+        unreachable
+    """
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    if penalty <= 1:
+        raise ValueError("penalty must be greater than 1")
+    graph = get_compact_graph(G)
+    source, target = graph.index_of(start), graph.index_of(end)
+    if not graph.can_reach(source, target):
+        return []
+    path, distance, settled = _astar_search(graph, source, target)
+    if path is None:
+        return []
+
+    routes = [{"path": path, "distance_m": distance, "overlap": 0.0,
+               "settled_nodes": settled, "engine": "alternatives"}]
+    kept_edges = [_path_edges(graph, path)]
+    weights = np.array(graph.weights, dtype=np.float64)
+    weights[kept_edges[0]] *= penalty
+
+    for _ in range(3 * k if max_rounds is None else max_rounds):
+        if len(routes) >= k:
+            break
+        path, _, settled = _astar_search(graph.with_weights(weights), source, target)
+        edges = _path_edges(graph, path)
+        length = float(graph.weights[edges].sum())
+        # Penalize every candidate, kept or not, so the next round moves on
+        weights[edges] *= penalty
+        if length > max_stretch * routes[0]["distance_m"]:
+            continue
+        overlap = max(float(graph.weights[np.intersect1d(edges, kept)].sum()) / length if length else 1.0
+                      for kept in kept_edges)
+        if overlap > max_overlap:
+            continue
+        routes.append({"path": path, "distance_m": length, "overlap": overlap,
+                       "settled_nodes": settled, "engine": "alternatives"})
+        kept_edges.append(edges)
+
+    return routes
@@ -1,10 +1,21 @@
 import streamlit as st
-from route_finder import nearest_node_for_point
-from locations_config import CHANDIGARH_LOCATIONS
+from dijkstra_algorithm import DEFAULT_ENGINE, ROUTING_ENGINES, ENGINE_LABELS
+from route_finder import cached_route
+from contraction_hierarchy import load_contraction_hierarchy, DEFAULT_HIERARCHY_PATH
+from graph_registry import graph_registry
+from snapping import snap_named_locations
+from location_matrix import get_location_matrix
+from isochrones import isochrones
+from tour_planner import plan_tour
+from alternatives import alternative_routes
+from landmarks import get_landmarks
+from map_rendering import route_latlons, route_map_html
+from network_profiles import PROFILE_LABELS, PROFILE_NAMES, get_multi_profile
+from locations_config import CHANDIGARH_LOCATIONS, CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M
 from streamlit_folium import folium_static
+import streamlit.components.v1 as components
 import folium
-import osmnx as ox
-import networkx as nx
+import os
 
 # Page configuration
 st.set_page_config(
@@ -163,8 +174,23 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+def load_app_graph(mode="drive"):
+    """
+    Graph of one travel mode with the named locations pre-snapped.
+
+    Every mode shares one topology built from the memory-mapped snapshots
+    (from osmnx on the first run), so switching mode hands out another
+    weight array instead of loading a graph. Snapping labels the mode's
+    strongly connected components, so unreachable pairs are rejected
+    without a search from the first query on.
+    """
+    G = get_multi_profile(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M).graph(mode)
+    snap_named_locations(G)
+    return G
+
+
 # Initialize session state
-session_keys = ["G", "start_node", "end_node", "start_latlon", "end_latlon", "start_name", "end_name"]
+session_keys = ["start_node", "end_node", "start_latlon", "end_latlon", "start_name", "end_name"]
 for key in session_keys:
     if key not in st.session_state:
         st.session_state[key] = None
@@ -205,6 +231,31 @@ with col2:
         st.stop()
     end_latlon = CHANDIGARH_LOCATIONS[end_location]
 
+travel_mode = st.radio(
+    "Travel mode",
+    options=list(PROFILE_NAMES),
+    format_func=lambda mode: PROFILE_LABELS[mode],
+    horizontal=True,
+    key="travel_mode"
+)
+
+# The precomputed table answers named pairs without searching; ALT landmarks
+# are built on first use; Contraction Hierarchies are offered once built
+# offline with contraction_hierarchy.py
+engine_options = ["location_matrix"] + list(ROUTING_ENGINES) + ["landmarks"]
+if os.path.exists(DEFAULT_HIERARCHY_PATH):
+    engine_options.append("contraction_hierarchy")
+
+engine = st.selectbox(
+    "Routing algorithm",
+    options=engine_options,
+    format_func=lambda name: ENGINE_LABELS[name],
+    index=0,
+    key="engine_select"
+)
+
+show_alternatives = st.checkbox("Show alternative routes", key="alternatives_toggle")
+
 # Validation
 if start_location == end_location:
     st.error("⚠️ Please select different start and destination locations")
@@ -216,27 +267,27 @@ if st.button(" Find Shortest Route"):
     st.markdown("</div>", unsafe_allow_html=True)
     
     try:
-        # Load Graph
-        if st.session_state.G is None:
-            with st.spinner("Loading road network data..."):
-                center_point = (30.7411, 76.7807)  # Sector 17
-                
-                G = ox.graph_from_point(
-                    center_point,
-                    dist=8000,  # 8km radius
-                    network_type="drive",
-                    simplify=True
-                )
-                st.session_state.G = G
-        else:
-            G = st.session_state.G
+        # Load Graph (shared by all sessions through the process-wide registry)
+        with st.spinner("Loading road network data..."):
+            G = load_app_graph(travel_mode)
+
+        if engine == "contraction_hierarchy":
+            with st.spinner("Loading contraction hierarchy..."):
+                ch = graph_registry.get(("hierarchy", DEFAULT_HIERARCHY_PATH),
+                                        lambda: load_contraction_hierarchy(DEFAULT_HIERARCHY_PATH))
+                if not ch.matches(G):
+                    st.warning("The saved contraction hierarchy was built for different road weights "
+                               "(another travel mode or live updates); using "
+                               f"{ENGINE_LABELS[DEFAULT_ENGINE]} instead. Rebuild it with contraction_hierarchy.py")
+                    engine = DEFAULT_ENGINE
         
-        # Find Nearest Nodes
+        # Named locations were snapped once when the graph was loaded
         with st.spinner("Locating positions on road network..."):
-            start_node = nearest_node_for_point(G, start_latlon[0], start_latlon[1])
-            end_node = nearest_node_for_point(G, end_latlon[0], end_latlon[1])
+            named_nodes = snap_named_locations(G)
+            start_node = named_nodes[start_location]
+            end_node = named_nodes[end_location]
             
-            if start_node not in G.nodes or end_node not in G.nodes:
+            if start_node not in G or end_node not in G:
                 st.error("Unable to locate positions on road network")
                 st.stop()
         
@@ -248,17 +299,24 @@ if st.button(" Find Shortest Route"):
         st.session_state.start_name = start_location
         st.session_state.end_name = end_location
         
-        # Run shortest path algorithm
-        with st.spinner("Computing shortest path using Dijkstra's algorithm..."):
+        # Run shortest path algorithm (one search gives both path and distance)
+        with st.spinner(f"Computing shortest path using {ENGINE_LABELS[engine]}..."):
             try:
-                route = nx.shortest_path(G, start_node, end_node, weight='length')
-                distance_meters = nx.shortest_path_length(G, start_node, end_node, weight='length')
-            except nx.NetworkXNoPath:
-                st.error("No route found between these locations")
-                st.stop()
+                if engine == "location_matrix":
+                    result = get_location_matrix(G).lookup(start_location, end_location)
+                elif engine == "contraction_hierarchy":
+                    result = ch.find_route(start_node, end_node)
+                elif engine == "landmarks":
+                    # Built on first use; kept valid through closures and slowdowns
+                    result = get_landmarks(G).find_route(G, start_node, end_node)
+                else:
+                    # Popular pairs are answered from the shared route cache
+                    result = cached_route(G, start_node, end_node, engine=engine)
             except Exception as e:
                 st.error(f"Error finding route: {str(e)}")
                 st.stop()
+            route = result["path"]
+            distance_meters = result["distance_m"]
         
         if not route or len(route) < 2:
             st.error("No route found between these locations")
@@ -291,104 +349,40 @@ if st.button(" Find Shortest Route"):
         # Create Map Visualization
         st.markdown("##  Route Visualization")
         
-        route_coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in route]
-        
-        # Calculate proper center and zoom
-        lats = [coord[0] for coord in route_coords]
-        lons = [coord[1] for coord in route_coords]
-        center_lat = (min(lats) + max(lats)) / 2
-        center_lon = (min(lons) + max(lons)) / 2
-        
-        # Calculate appropriate zoom level based on route span
-        lat_span = max(lats) - min(lats)
-        lon_span = max(lons) - min(lons)
-        max_span = max(lat_span, lon_span)
-        
-        # Dynamic zoom: smaller span = more zoom
-        if max_span < 0.02:
-            zoom = 14
-        elif max_span < 0.05:
-            zoom = 13
-        elif max_span < 0.1:
-            zoom = 12
-        else:
-            zoom = 11
-        
-        # Create map with better styling
-        route_map = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=zoom,
-            tiles='OpenStreetMap'
-        )
-        
-        # Add route line with better styling
-        folium.PolyLine(
-            route_coords,
-            color="#0066cc",
-            weight=6,
-            opacity=0.85,
-            popup=f"<b>Route:</b> {distance_km:.2f} km"
-        ).add_to(route_map)
-        
-        # Add start marker with name label
-        folium.Marker(
-            start_latlon,
-            popup=f"<div style='font-size: 14px; font-weight: bold;'>START<br>{start_location}</div>",
-            tooltip=f"START: {start_location}",
-            icon=folium.Icon(color="green", icon="play", prefix='fa')
-        ).add_to(route_map)
-        
-        # Add permanent label for start
-        folium.Marker(
-            start_latlon,
-            icon=folium.DivIcon(html=f"""
-                <div style="
-                    background-color: white;
-                    border: 2px solid #28a745;
-                    border-radius: 8px;
-                    padding: 4px 8px;
-                    font-weight: bold;
-                    font-size: 12px;
-                    color: #28a745;
-                    white-space: nowrap;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.2);
-                ">
-                     {start_location}
-                </div>
-            """)
-        ).add_to(route_map)
+        # Alternatives go first, in grey, so the chosen route is drawn over them
+        alternatives = []
+        if show_alternatives:
+            with st.spinner("Finding alternative routes..."):
+                alternatives = alternative_routes(G, start_node, end_node)[1:]
+        lines = []
+        for number, alternative in enumerate(alternatives, start=1):
+            lats, lons = route_latlons(G, alternative["path"])
+            lines.append({
+                "lats": lats,
+                "lons": lons,
+                "color": "#6c757d",
+                "weight": 5,
+                "opacity": 0.7,
+                "dash_array": "8",
+                "popup": f"<b>Alternative {number}:</b> {alternative['distance_m'] / 1000:.2f} km "
+                         f"({alternative['overlap']:.0%} shared)",
+            })
+        lats, lons = route_latlons(G, route)
+        lines.append({
+            "lats": lats,
+            "lons": lons,
+            "color": "#0066cc",
+            "weight": 6,
+            "opacity": 0.85,
+            "popup": f"<b>Route:</b> {distance_km:.2f} km",
+        })
         
-        # Add end marker with name label
-        folium.Marker(
-            end_latlon,
-            popup=f"<div style='font-size: 14px; font-weight: bold;'>DESTINATION<br>{end_location}</div>",
-            tooltip=f"DESTINATION: {end_location}",
-            icon=folium.Icon(color="red", icon="stop", prefix='fa')
-        ).add_to(route_map)
-        
-        # Add permanent label for end
-        folium.Marker(
-            end_latlon,
-            icon=folium.DivIcon(html=f"""
-                <div style="
-                    background-color: white;
-                    border: 2px solid #dc3545;
-                    border-radius: 8px;
-                    padding: 4px 8px;
-                    font-weight: bold;
-                    font-size: 12px;
-                    color: #dc3545;
-                    white-space: nowrap;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.2);
-                ">
-                     {end_location}
-                </div>
-            """)
-        ).add_to(route_map)
+        # Base map and markers are cached per location pair; only the route lines are new
+        route_map_page = route_map_html(start_location, start_latlon, end_location, end_latlon, lines)
         
         # Display map in styled container
         st.markdown('<div class="map-container">', unsafe_allow_html=True)
-        folium_static(route_map, width=1200, height=650)
+        components.html(route_map_page, width=1200, height=650)
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Route Summary
@@ -397,8 +391,12 @@ if st.button(" Find Shortest Route"):
             <div class="summary-box">
                 <p><strong>From:</strong> {start_location}</p>
                 <p><strong>To:</strong> {end_location}</p>
+                <p><strong>Mode:</strong> {PROFILE_LABELS[travel_mode]}</p>
                 <p><strong>Distance:</strong> {distance_km:.2f} km ({distance_meters:.0f} meters)</p>
-                <p><strong>Algorithm:</strong> Dijkstra's Shortest Path</p>
+                <p><strong>Algorithm:</strong> {ENGINE_LABELS[engine]} ({result['settled_nodes']} nodes settled)</p>
+                {"".join(f"<p><strong>Alternative {number}:</strong> {alternative['distance_m'] / 1000:.2f} km, "
+                         f"{alternative['overlap']:.0%} shared with a shorter route</p>"
+                         for number, alternative in enumerate(alternatives, start=1))}
             </div>
         """, unsafe_allow_html=True)
         
@@ -411,6 +409,90 @@ if st.button(" Find Shortest Route"):
 else:
     st.markdown("</div>", unsafe_allow_html=True)
 
+# Reachability overlay: recomputed from the cached search as the slider moves
+st.markdown("##  Reachable Area")
+show_reach = st.checkbox(f"Show everything reachable from {start_location}", key="reach_toggle")
+if show_reach:
+    # Travel times come from the drive speed profiles
+    reach_modes = ["time", "distance"] if travel_mode == "drive" else ["distance"]
+    reach_mode = st.radio("Measure by", options=reach_modes, horizontal=True, key="reach_mode",
+                          format_func=lambda mode: "Drive time" if mode == "time" else "Road distance")
+    if reach_mode == "time":
+        reach_limit = st.slider("Minutes", min_value=1, max_value=30, value=10, key="reach_minutes") * 60
+    else:
+        reach_limit = st.slider("Kilometers", min_value=0.5, max_value=10.0, value=3.0, step=0.5,
+                                key="reach_km") * 1000
+
+    try:
+        G = load_app_graph(travel_mode)
+        reach_start = snap_named_locations(G)[start_location]
+        # Three nested bands at a third, two thirds and all of the limit
+        bands = isochrones(G, reach_start, [reach_limit / 3, 2 * reach_limit / 3, reach_limit],
+                           mode=reach_mode)
+
+        reach_map = folium.Map(location=list(start_latlon), zoom_start=13, tiles='OpenStreetMap')
+        for band, color in reversed(list(zip(bands, ["#1a9850", "#fee08b", "#d73027"]))):
+            label = (f"{band['limit'] / 60:.0f} min" if reach_mode == "time"
+                     else f"{band['limit'] / 1000:.1f} km")
+            for rings in band["polygons"]:
+                folium.Polygon(
+                    locations=rings,
+                    color=color,
+                    weight=1,
+                    fill=True,
+                    fill_color=color,
+                    fill_opacity=0.35,
+                    tooltip=f"Within {label} ({len(band['nodes'])} intersections)"
+                ).add_to(reach_map)
+        folium.Marker(
+            start_latlon,
+            tooltip=f"START: {start_location}",
+            icon=folium.Icon(color="green", icon="play", prefix='fa')
+        ).add_to(reach_map)
+        folium_static(reach_map, width=1200, height=550)
+    except Exception as e:
+        st.error(f"Error computing reachable area: {str(e)}")
+
+# Multi-stop tour starting at the selected start location
+st.markdown("##  Multi-Stop Tour")
+tour_stops = st.multiselect(
+    f"Stops to visit after {start_location}",
+    options=[name for name in sorted(CHANDIGARH_LOCATIONS) if name != start_location],
+    key="tour_stops"
+)
+round_trip = st.checkbox(f"Return to {start_location}", key="tour_round_trip")
+if tour_stops and st.button(" Plan Tour"):
+    try:
+        G = load_app_graph(travel_mode)
+        with st.spinner(f"Ordering {len(tour_stops)} stops..."):
+            tour = plan_tour(G, [start_location] + tour_stops, round_trip=round_trip)
+
+        method = "exact (Held-Karp)" if tour["optimal"] else "2-opt / Or-opt heuristic"
+        st.markdown(f"**Order:** {' → '.join(tour['order'])}")
+        st.markdown(f"**Total distance:** {tour['distance_m'] / 1000:.2f} km, solved {method}")
+        st.table([
+            {"Leg": f"{leg['from']} → {leg['to']}",
+             "Distance (km)": round(leg["stats"]["distance_km"], 2),
+             "Route points": leg["stats"]["num_nodes"]}
+            for leg in tour["legs"]
+        ])
+
+        tour_map = folium.Map(location=list(start_latlon), zoom_start=13, tiles='OpenStreetMap')
+        folium.PolyLine(G.node_latlons(tour["path"]), color="#0066cc", weight=5, opacity=0.85).add_to(tour_map)
+        for number, name in enumerate(tour["order"][:len(tour["legs"]) + (0 if round_trip else 1)], start=1):
+            folium.Marker(
+                CHANDIGARH_LOCATIONS[name],
+                tooltip=f"{number}. {name}",
+                icon=folium.DivIcon(html=f"""
+                    <div style="background-color: #0066cc; color: white; border-radius: 50%;
+                                width: 24px; height: 24px; text-align: center; line-height: 24px;
+                                font-weight: bold; font-size: 12px;">{number}</div>
+                """)
+            ).add_to(tour_map)
+        folium_static(tour_map, width=1200, height=550)
+    except Exception as e:
+        st.error(f"Error planning tour: {str(e)}")
+
 # Footer
 st.markdown("<br><br>", unsafe_allow_html=True)
 st.markdown("""
@@ -0,0 +1,231 @@
+# batch_router.py
+"""
+Command-line batch router for origin-destination files.
+
+Reads OD pairs from CSV or JSONL, routes them across a process pool and
+writes one result per input row as it goes, so memory stays bounded no
+matter how large the input is. Each row gives either location names from
+CHANDIGARH_LOCATIONS:
+
+    origin,destination
+    Sector 17 Plaza,PGI Hospital
+
+or coordinates:
+
+    origin_lat,origin_lon,dest_lat,dest_lon
+    30.7411,76.7807,30.7664,76.7757
+
+An optional "id" column is copied to the output. Example:
+
+    python batch_router.py od_pairs.csv -o routes.jsonl --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from dijkstra_algorithm import DEFAULT_ENGINE, ROUTING_ENGINES, find_route
+from graph_snapshot import load_graph_snapshot, read_snapshot, snapshot_path
+from locations_config import CHANDIGARH_CENTER, CHANDIGARH_LOCATIONS, CHANDIGARH_RADIUS_M
+from route_finder import nearest_nodes_batch
+from snapping import snap_named_locations
+
+CHUNK_SIZE = 256
+RESULT_FIELDS = ["id", "origin", "destination", "distance_m", "num_nodes", "error"]
+
+
+def _file_format(path, explicit):
+    if explicit:
+        return explicit
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_od_pairs(path, fmt=None):
+    """
+    Yield one dict per OD row from a CSV or JSONL file ('-' for stdin).
+
+    A JSONL line that is not a JSON object is yielded as a ValueError
+    instead, so it becomes an error row rather than ending the batch.
+    """
+    fmt = _file_format(path, fmt)
+    stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(stream)
+        else:
+            for number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"line {number} is not valid JSON ({e})")
+                    continue
+                yield row if isinstance(row, dict) else ValueError(f"line {number} is not a JSON object")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def chunked(rows, size):
+    """Group an iterator into lists of at most size items."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Per-process state set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(graph_path, engine, geometry):
+    graph, _ = read_snapshot(graph_path)
+    _worker.update(
+        graph=graph,
+        named=snap_named_locations(graph),
+        engine=engine,
+        geometry=geometry,
+    )
+
+
+def _endpoint(row, prefix, name_key):
+    """(label, lat, lon, name) for one end of a row; name is None for coordinates."""
+    name = row.get(name_key)
+    if name:
+        if name not in CHANDIGARH_LOCATIONS:
+            raise ValueError(f"Unknown location '{name}'")
+        return name, None, None, name
+    lat, lon = float(row[f"{prefix}_lat"]), float(row[f"{prefix}_lon"])
+    return f"{lat},{lon}", lat, lon, None
+
+
+def _route_chunk(rows):
+    """Route one chunk of rows inside a worker; returns result dicts in input order."""
+    graph = _worker["graph"]
+    parsed, results = [], []
+    for row in rows:
+        result = {"id": "", "origin": "", "destination": "", "distance_m": None, "num_nodes": 0, "error": ""}
+        if isinstance(row, ValueError):
+            result["error"] = f"Bad row: {row}"
+            results.append(result)
+            continue
+        result["id"] = row.get("id", "")
+        try:
+            origin = _endpoint(row, "origin", "origin")
+            destination = _endpoint(row, "dest", "destination")
+            result["origin"], result["destination"] = origin[0], destination[0]
+            parsed.append((result, origin, destination))
+        except (KeyError, ValueError, TypeError) as e:
+            result["error"] = f"Bad row: {e}"
+        results.append(result)
+
+    # Snap every coordinate endpoint of the chunk in one vectorized call
+    points = [end for _, o, d in parsed for end in (o, d) if end[3] is None]
+    snapped = iter(nearest_nodes_batch(graph, [p[1] for p in points], [p[2] for p in points]).tolist()
+                   if points else [])
+    for result, origin, destination in parsed:
+        start = _worker["named"][origin[3]] if origin[3] else next(snapped)
+        end = _worker["named"][destination[3]] if destination[3] else next(snapped)
+        route = find_route(graph, start, end, engine=_worker["engine"])
+        if route["path"] is None:
+            result["error"] = "No path found"
+            continue
+        result["distance_m"] = round(route["distance_m"], 3)
+        result["num_nodes"] = len(route["path"])
+        if _worker["geometry"]:
+            result["geometry"] = [[lat, lon] for lat, lon in graph.node_latlons(route["path"])]
+    return results
+
+
+class ResultWriter:
+    """Append results to a CSV or JSONL stream as they arrive."""
+
+    def __init__(self, stream, fmt, geometry):
+        self.stream = stream
+        self.fmt = fmt
+        self.count = 0
+        if fmt == "csv":
+            fields = RESULT_FIELDS + (["geometry"] if geometry else [])
+            self.writer = csv.DictWriter(stream, fieldnames=fields, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, results):
+        for result in results:
+            if self.fmt == "csv":
+                if "geometry" in result:
+                    result = dict(result, geometry=json.dumps(result["geometry"]))
+                self.writer.writerow(result)
+            else:
+                self.stream.write(json.dumps(result) + "\n")
+        self.count += len(results)
+        self.stream.flush()
+
+
+def run_batch(input_path, output, workers=None, engine=DEFAULT_ENGINE, geometry=False,
+              input_format=None, output_format="jsonl", chunk_size=CHUNK_SIZE):
+    """
+    Route every OD pair in input_path and write results to the output stream.
+
+    At most 2 * workers chunks are in flight, and results are written in
+    input order as soon as the oldest chunk finishes.
+
+    Returns:
+        dict with queries, seconds and queries_per_sec
+    """
+    # Make sure the memory-mapped snapshot exists before workers open it
+    load_graph_snapshot(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, network_type="drive", simplify=True)
+    graph_path = snapshot_path(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, network_type="drive", simplify=True)
+
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(output, output_format, geometry)
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(graph_path, engine, geometry)) as pool:
+        pending = deque()
+        for chunk in chunked(read_od_pairs(input_path, input_format), chunk_size):
+            pending.append(pool.submit(_route_chunk, chunk))
+            while len(pending) >= 2 * workers:
+                writer.write(pending.popleft().result())
+        while pending:
+            writer.write(pending.popleft().result())
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "queries": writer.count,
+        "seconds": elapsed,
+        "queries_per_sec": writer.count / elapsed if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Route origin-destination pairs from a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file of OD pairs ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--engine", choices=list(ROUTING_ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument("--geometry", action="store_true", help="include [lat, lon] node coordinates")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    output_format = args.output_format or ("jsonl" if args.output == "-" else _file_format(args.output, None))
+    output = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        stats = run_batch(args.input, output, workers=args.workers, engine=args.engine,
+                          geometry=args.geometry, input_format=args.input_format,
+                          output_format=output_format, chunk_size=args.chunk_size)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Routed {stats['queries']} queries in {stats['seconds']:.2f}s "
+          f"({stats['queries_per_sec']:.1f} queries/sec)", file=sys.stderr)
@@ -0,0 +1,433 @@
+# benchmarks.py
+"""
+Micro-benchmarks for the routing code on the cached Chandigarh road network.
+
+Run from the repository root so osmnx picks up the responses in cache/:
+
+    python benchmarks.py paths engines trace timedep alternatives rendering landmarks ingest tiles profiles
+"""
+import argparse
+import heapq
+import itertools
+import tempfile
+import time
+import tracemalloc
+
+import folium
+import networkx as nx
+import numpy as np
+import osmnx as ox
+
+from alternatives import alternative_routes
+from dijkstra_algorithm import (
+    dijkstra_shortest_path, dijkstra_with_steps, find_route, get_compact_graph, replay_trace, ROUTING_ENGINES,
+)
+from graph_snapshot import load_graph_snapshot
+from landmarks import build_landmarks
+from locations_config import CHANDIGARH_LOCATIONS, CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M
+from map_rendering import base_map_html, route_latlons, route_map_html
+from network_profiles import PROFILE_NAMES, load_multi_profile
+from overpass_ingest import bbox_from_point, compact_graph_from_overpass, overpass_response_files
+from snapping import snap_named_locations
+from tiled_graph import TiledGraph, build_tile_store
+from travel_time import fastest_route, get_speed_profiles
+
+
+def load_benchmark_graph():
+    """Load the same drive network the app uses (served from cache/)."""
+    return ox.graph_from_point(
+        CHANDIGARH_CENTER,
+        dist=CHANDIGARH_RADIUS_M,
+        network_type="drive",
+        simplify=True
+    )
+
+
+def location_pairs(G):
+    """Snap every named location and return all ordered (start, end) node pairs."""
+    nodes = list(snap_named_locations(G, CHANDIGARH_LOCATIONS).values())
+    return [(s, t) for s in nodes for t in nodes if s != t]
+
+
+def _path_copy_dijkstra(G, start, end):
+    """The previous implementation: every heap entry carries a copy of its path."""
+    graph = get_compact_graph(G)
+    offsets, targets, weights = graph.adjacency()
+    source = graph.index_of(start)
+    target = graph.index_of(end)
+
+    pq = [(0, source, [])]
+    visited = set()
+    distances = {source: 0}
+
+    while pq:
+        (dist, node, path) = heapq.heappop(pq)
+        if node in visited:
+            continue
+        visited.add(node)
+        path = path + [node]
+        if node == target:
+            return [graph.ids[i] for i in path], dist
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if neighbor in visited:
+                continue
+            new_dist = dist + weights[e]
+            if neighbor not in distances or new_dist < distances[neighbor]:
+                distances[neighbor] = new_dist
+                heapq.heappush(pq, (new_dist, neighbor, path))
+
+    return None, float('inf')
+
+
+def _copying_trace(G, start, end):
+    """The previous step trace: every step copies the visited set and the current path."""
+    graph = get_compact_graph(G)
+    offsets, targets, weights = graph.adjacency()
+    ids = graph.ids
+    source, target = graph.index_of(start), graph.index_of(end)
+    distances = {source: 0}
+    predecessors = {source: -1}
+    visited = set()
+    pq = [(0, source)]
+    while pq:
+        dist, node = heapq.heappop(pq)
+        if node in visited:
+            continue
+        visited.add(node)
+        path = []
+        walk = node
+        while walk != -1:
+            path.append(ids[walk])
+            walk = predecessors[walk]
+        yield {"current_node": ids[node], "distance": dist, "visited": [ids[i] for i in visited],
+               "path": path[::-1], "nodes_explored": len(visited), "queue_size": len(pq)}
+        if node == target:
+            return
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            new_dist = dist + weights[e]
+            if neighbor not in visited and new_dist < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_dist
+                predecessors[neighbor] = node
+                heapq.heappush(pq, (new_dist, neighbor))
+
+
+def measure(fn, G, pairs):
+    """
+    Run fn(G, s, t) over all pairs.
+
+    Returns:
+        dict with queries/sec, mean latency and peak traced memory of one query
+    """
+    fn(G, *pairs[0])  # warm up the compact graph cache
+
+    start_time = time.perf_counter()
+    for s, t in pairs:
+        fn(G, s, t)
+    elapsed = time.perf_counter() - start_time
+
+    peak = 0
+    for s, t in pairs[:20]:
+        tracemalloc.start()
+        fn(G, s, t)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "queries_per_sec": len(pairs) / elapsed,
+        "mean_ms": elapsed / len(pairs) * 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+def print_results(title, results):
+    """Print one row per variant from a {name: measure() dict} mapping."""
+    print(f"\n{title}")
+    print(f"{'Variant':<28} {'Queries/s':>10} {'Mean ms':>10} {'Peak KB':>10}")
+    print("-" * 61)
+    for name, r in results.items():
+        print(f"{name:<28} {r['queries_per_sec']:>10.1f} {r['mean_ms']:>10.2f} {r['peak_kb']:>10.1f}")
+
+
+def bench_paths(G, pairs):
+    """Path copying in heap entries vs predecessor-pointer reconstruction."""
+    results = {
+        "path copy per push": measure(_path_copy_dijkstra, G, pairs),
+        "predecessor pointers": measure(dijkstra_shortest_path, G, pairs),
+    }
+    print_results(f"Path reconstruction ({len(pairs)} location pairs)", results)
+    return results
+
+
+def bench_engines(G, pairs):
+    """Latency and settled-node counts of each routing engine."""
+    results = {}
+    for engine in ROUTING_ENGINES:
+        results[engine] = measure(lambda G, s, t: find_route(G, s, t, engine=engine), G, pairs)
+        settled = [find_route(G, s, t, engine=engine)["settled_nodes"] for s, t in pairs]
+        results[engine]["mean_settled"] = sum(settled) / len(settled)
+    print_results(f"Routing engines ({len(pairs)} location pairs)", results)
+    for engine, r in results.items():
+        print(f"{engine:<28} mean settled nodes: {r['mean_settled']:.0f}")
+    return results
+
+
+def bench_trace(G, pairs):
+    """Full-copy step trace vs delta steps (each replayed into a TraceState)."""
+    pairs = pairs[:30]  # the copying trace is quadratic in settled nodes
+    results = {
+        "copy visited + path per step": measure(lambda G, s, t: list(_copying_trace(G, s, t)), G, pairs),
+        "delta steps": measure(lambda G, s, t: replay_trace(dijkstra_with_steps(G, s, t)), G, pairs),
+        "delta steps, every 50": measure(
+            lambda G, s, t: replay_trace(dijkstra_with_steps(G, s, t, every=50)), G, pairs),
+    }
+    print_results(f"Exploration trace ({len(pairs)} location pairs)", results)
+    return results
+
+
+def bench_timedep(G, pairs):
+    """Per-query overhead of time-dependent search over static length routing."""
+    profiles = get_speed_profiles(G)
+    results = {
+        "static dijkstra": measure(lambda G, s, t: find_route(G, s, t, engine="dijkstra"), G, pairs),
+        "static astar": measure(lambda G, s, t: find_route(G, s, t, engine="astar"), G, pairs),
+        "time-dep dijkstra 09:00": measure(
+            lambda G, s, t: fastest_route(G, s, t, 9 * 3600, profiles, heuristic=False), G, pairs),
+        "time-dep astar 09:00": measure(
+            lambda G, s, t: fastest_route(G, s, t, 9 * 3600, profiles), G, pairs),
+        "time-dep astar 03:00": measure(
+            lambda G, s, t: fastest_route(G, s, t, 3 * 3600, profiles), G, pairs),
+    }
+    print_results(f"Time-dependent routing ({len(pairs)} location pairs)", results)
+    print(f"Speed profile matrix: {profiles.speeds.shape}, {profiles.nbytes() / 1024:.0f} KB")
+    return results
+
+
+# p95 latency the alternatives API should meet for 3 routes on the Chandigarh graph
+ALTERNATIVES_TARGET_MS = 100
+
+
+def bench_alternatives(G, pairs):
+    """Penalty-method alternatives vs Yen's k-shortest paths in NetworkX (3 routes each)."""
+    simple = nx.DiGraph()
+    for u, v, length in G.edges(data="length"):
+        if u != v and (not simple.has_edge(u, v) or simple[u][v]["length"] > length):
+            simple.add_edge(u, v, length=length)
+
+    def yen(G, s, t):
+        try:
+            return list(itertools.islice(nx.shortest_simple_paths(simple, s, t, weight="length"), 3))
+        except nx.NetworkXNoPath:
+            return []
+
+    yen_pairs = pairs[:20]  # Yen's is slow enough that a sample suffices
+    results = {
+        f"yen k=3 ({len(yen_pairs)} pairs)": measure(yen, G, yen_pairs),
+        "penalty method k=3": measure(lambda G, s, t: alternative_routes(G, s, t, k=3), G, pairs),
+    }
+    print_results(f"Alternative routes ({len(pairs)} location pairs)", results)
+
+    latencies, found = [], []
+    for s, t in pairs:
+        start_time = time.perf_counter()
+        found.append(len(alternative_routes(G, s, t, k=3)))
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    p50, p95 = np.percentile(latencies, [50, 95])
+    verdict = "meets" if p95 <= ALTERNATIVES_TARGET_MS else "misses"
+    print(f"penalty method p50 {p50:.1f} ms, p95 {p95:.1f} ms ({verdict} the {ALTERNATIVES_TARGET_MS} ms p95 target), "
+          f"mean routes found {sum(found) / len(found):.2f}")
+    return results
+
+
+def _full_folium_page(G, start, end, path):
+    """The previous map rendering: a new folium.Map with every route node, rendered per result."""
+    coords = get_compact_graph(G).node_latlons(path)
+    start_latlon, end_latlon = coords[0], coords[-1]
+    route_map = folium.Map(location=list(start_latlon), zoom_start=13, tiles='OpenStreetMap')
+    folium.PolyLine(coords, color="#0066cc", weight=6, opacity=0.85, popup="<b>Route</b>").add_to(route_map)
+    for latlon, name, color in ((start_latlon, start, "green"), (end_latlon, end, "red")):
+        folium.Marker(latlon, popup=str(name), tooltip=str(name), icon=folium.Icon(color=color)).add_to(route_map)
+        folium.Marker(latlon, icon=folium.DivIcon(html=f"<div>{name}</div>")).add_to(route_map)
+    return route_map.get_root().render()
+
+
+def _cached_page(G, start, end, path):
+    coords = get_compact_graph(G).node_latlons([path[0], path[-1]])
+    lats, lons = route_latlons(G, path)
+    line = {"lats": lats, "lons": lons, "color": "#0066cc", "weight": 6, "opacity": 0.85, "popup": "<b>Route</b>"}
+    return route_map_html(str(start), coords[0], str(end), coords[1], [line])
+
+
+def bench_rendering(G, pairs):
+    """Route map HTML: full folium render per result vs cached base map plus simplified lines."""
+    routes = {(s, t): find_route(G, s, t, engine="astar")["path"] for s, t in pairs}
+    pairs = [pair for pair in pairs if routes[pair]]
+    cached_page = lambda G, s, t: _cached_page(G, s, t, routes[s, t])
+    results = {"full folium render": measure(lambda G, s, t: _full_folium_page(G, s, t, routes[s, t]), G, pairs)}
+    # Cold: every pair renders its base map once; warm: re-routing a pair already shown
+    base_map_html.cache_clear()
+    start_time = time.perf_counter()
+    for s, t in pairs:
+        cached_page(G, s, t)
+    elapsed = time.perf_counter() - start_time
+    results["base map cold"] = {"queries_per_sec": len(pairs) / elapsed,
+                                "mean_ms": elapsed / len(pairs) * 1000, "peak_kb": float("nan")}
+    results["base map cached"] = measure(cached_page, G, pairs)
+    print_results(f"Route map rendering ({len(pairs)} location pairs)", results)
+
+    full = [len(_full_folium_page(G, s, t, routes[s, t])) for s, t in pairs]
+    cached = [len(_cached_page(G, s, t, routes[s, t])) for s, t in pairs]
+    nodes = [len(routes[pair]) for pair in pairs]
+    points = [len(route_latlons(G, routes[pair])[0]) for pair in pairs]
+    print(f"mean page size {np.mean(full) / 1024:.1f} KB -> {np.mean(cached) / 1024:.1f} KB, "
+          f"mean route points {np.mean(nodes):.0f} nodes -> {np.mean(points):.0f} after simplification")
+    return results
+
+
+def bench_landmarks(G, pairs):
+    """ALT with avoid and farthest landmark selection vs plain Dijkstra and straight-line A*."""
+    variants = {
+        "dijkstra": lambda G, s, t: find_route(G, s, t, engine="dijkstra"),
+        "astar": lambda G, s, t: find_route(G, s, t, engine="astar"),
+    }
+    built = {}
+    for method in ("avoid", "farthest"):
+        start_time = time.perf_counter()
+        landmarks = build_landmarks(G, method=method)
+        built[method] = (landmarks, time.perf_counter() - start_time)
+        variants[f"alt {method} k={landmarks.num_landmarks}"] = (
+            lambda G, s, t, landmarks=landmarks: landmarks.find_route(G, s, t))
+
+    results = {}
+    for name, fn in variants.items():
+        results[name] = measure(fn, G, pairs)
+        settled = [fn(G, s, t)["settled_nodes"] for s, t in pairs]
+        results[name]["mean_settled"] = sum(settled) / len(settled)
+    print_results(f"ALT landmarks ({len(pairs)} location pairs)", results)
+    for name, r in results.items():
+        print(f"{name:<28} mean settled nodes: {r['mean_settled']:.0f}")
+    for method, (landmarks, build_s) in built.items():
+        print(f"{method} landmarks: built in {build_s:.2f} s, tables {landmarks.nbytes() / 1024:.0f} KB (float32)")
+    return results
+
+
+def _load_once(load):
+    """Time and traced peak memory of one call to load(); returns (result, seconds, peak KB)."""
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024
+
+
+def bench_ingest(G, pairs):
+    """Building the compact graph from cached Overpass responses: osmnx + NetworkX vs streaming."""
+    paths = overpass_response_files(ox.settings.cache_folder)
+    bbox = bbox_from_point(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M)
+    variants = {
+        "osmnx + get_compact_graph": lambda: get_compact_graph(load_benchmark_graph()),
+        "streaming overpass": lambda: compact_graph_from_overpass(paths, bbox=bbox),
+    }
+    results = {}
+    for name, load in variants.items():
+        graph, elapsed, peak = _load_once(load)
+        results[name] = {"queries_per_sec": 1 / elapsed, "mean_ms": elapsed * 1000, "peak_kb": peak}
+        results[name]["size"] = (graph.num_nodes, graph.num_edges)
+    print_results(f"Graph ingestion ({len(paths)} cached Overpass responses)", results)
+    for name, r in results.items():
+        print(f"{name:<28} {r['size'][0]} nodes, {r['size'][1]} edges")
+    return results
+
+
+def bench_tiles(G, pairs):
+    """Routing on the whole graph vs the tile store, with a roomy and a tight tile budget."""
+    with tempfile.TemporaryDirectory() as folder:
+        manifest = build_tile_store(G, folder)
+        roomy, tight = TiledGraph(folder), TiledGraph(folder, max_bytes=2 * 1024 * 1024)
+        variants = {
+            "whole graph dijkstra": lambda G, s, t: find_route(G, s, t, engine="dijkstra"),
+            "tiled, 64 MB budget": lambda G, s, t: roomy.find_route(s, t),
+            "tiled, 2 MB budget": lambda G, s, t: tight.find_route(s, t),
+        }
+        results = {name: measure(fn, G, pairs) for name, fn in variants.items()}
+        print_results(f"Tiled routing ({len(pairs)} location pairs, {len(manifest['tiles'])} tiles)", results)
+
+        mismatched = 0
+        touched = []
+        for s, t in pairs:
+            whole, tiled = find_route(G, s, t, engine="dijkstra"), tight.find_route(s, t)
+            mismatched += whole["distance_m"] != tiled["distance_m"]
+            touched.append(len(tiled["tiles"]))
+        print(f"distances differing from the whole graph: {mismatched}, "
+              f"mean tiles read per query: {np.mean(touched):.1f} of {len(manifest['tiles'])}")
+        for name, router in (("64 MB budget", roomy), ("2 MB budget", tight)):
+            stats = router.stats()
+            print(f"{name}: {stats['entries']} tiles/overlays resident, {stats['resident_bytes'] / 1024:.0f} KB, "
+                  f"{stats['evictions']} evictions, hit ratio {stats['hit_ratio']:.2f}")
+    return results
+
+
+def bench_profiles(G, pairs):
+    """Drive/walk/bike on one shared topology: mode switch vs graph load, routing per profile, memory."""
+    start_time = time.perf_counter()
+    profiles = load_multi_profile(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M)
+    build_s = time.perf_counter() - start_time
+
+    switches = 10000
+    start_time = time.perf_counter()
+    for name in itertools.islice(itertools.cycle(PROFILE_NAMES), switches):
+        profiles.graph(name)
+    switch_us = (time.perf_counter() - start_time) / switches * 1e6
+    start_time = time.perf_counter()
+    for name in PROFILE_NAMES:
+        load_graph_snapshot(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, network_type=name)
+    load_ms = (time.perf_counter() - start_time) / len(PROFILE_NAMES) * 1000
+
+    results = {}
+    for name in PROFILE_NAMES:
+        graph = profiles.graph(name)
+        results[f"{name} (shared topology)"] = measure(
+            lambda G, s, t: find_route(G, s, t, engine="bidirectional_astar"), graph, location_pairs(graph))
+    print_results(f"Network profiles ({profiles.topology.num_nodes} nodes, {profiles.topology.num_edges} edges)",
+                  results)
+    print(f"merged in {build_s:.2f} s; mode switch {switch_us:.2f} us vs {load_ms:.1f} ms per snapshot load")
+
+    report = profiles.memory_report()
+    print(f"shared topology {report['shared_bytes'] / 1024:.0f} KB, access bits {report['access_bytes'] / 1024:.0f} KB")
+    for name in PROFILE_NAMES:
+        print(f"{name:<6} weights {report['profile_bytes'][name] / 1024:.0f} KB, "
+              f"separate graph {report['separate_bytes'][name] / 1024:.0f} KB")
+    print(f"total {report['total_bytes'] / 1024:.0f} KB vs {report['separate_total_bytes'] / 1024:.0f} KB "
+          f"for separate graphs ({report['saved_bytes'] / 1024:.0f} KB saved)")
+    return results
+
+
+BENCHMARKS = {
+    "paths": bench_paths,
+    "engines": bench_engines,
+    "trace": bench_trace,
+    "timedep": bench_timedep,
+    "alternatives": bench_alternatives,
+    "rendering": bench_rendering,
+    "landmarks": bench_landmarks,
+    "ingest": bench_ingest,
+    "tiles": bench_tiles,
+    "profiles": bench_profiles,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Routing benchmarks on the Chandigarh graph")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    G = load_benchmark_graph()
+    pairs = location_pairs(G)
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name](G, pairs)
@@ -0,0 +1,144 @@
+# connectivity.py
+"""
+Constant-time reachability checks from strongly connected components.
+
+Components are found once per graph with scipy's linear-time SCC routine,
+over the edges with a finite weight (closed roads connect nothing), and
+renumbered in topological order of the condensation DAG: every edge
+between two components goes from a lower label to a higher one. So two
+nodes with the same label always reach each other, a higher label never
+reaches a lower one, and the remaining pairs are looked up in the
+transitive closure of the DAG (one bit per pair of components).
+
+Road networks have one giant component and a few hundred stray one-way
+stubs and islands, so the closure is small. Graphs with more than
+CLOSURE_MAX_COMPONENTS components skip it and search the DAG instead,
+visiting only components whose labels lie between the two endpoints.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+# components^2 / 8 bytes: 8 MB at the limit
+CLOSURE_MAX_COMPONENTS = 8192
+
+
+def _topological_order(count, tails, heads):
+    """Kahn's algorithm over the condensation; returns component ids in topological order."""
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=count), out=offsets[1:])
+    successors = heads[np.argsort(tails, kind="stable")].tolist()
+    offsets = offsets.tolist()
+    indegree = np.bincount(heads, minlength=count).tolist()
+    stack = [c for c in range(count) if indegree[c] == 0]
+    order = []
+    while stack:
+        c = stack.pop()
+        order.append(c)
+        for d in successors[offsets[c]:offsets[c + 1]]:
+            indegree[d] -= 1
+            if indegree[d] == 0:
+                stack.append(d)
+    return np.asarray(order, dtype=np.int64)
+
+
+class Connectivity:
+    """
+    Strongly connected components of one CompactGraph.
+
+    labels[i] is the component of dense node i, numbered in topological
+    order; sizes[c] counts its nodes and largest is the biggest component.
+    The condensation DAG is kept in CSR form (dag_offsets, dag_targets).
+    """
+
+    def __init__(self, graph):
+        n = graph.num_nodes
+        finite = np.isfinite(graph.weights)
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.offsets))[finite]
+        targets = graph.targets[finite].astype(np.int64)
+        matrix = csr_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+        count, raw = connected_components(matrix, directed=True, connection="strong")
+
+        tails, heads = raw[sources], raw[targets]
+        between = tails != heads
+        dag = np.unique(tails[between] * count + heads[between])
+        tails, heads = dag // count, dag % count
+        rank = np.empty(count, dtype=np.int64)
+        rank[_topological_order(count, tails, heads)] = np.arange(count)
+
+        self.labels = rank[raw].astype(np.int32)
+        tails, heads = rank[tails], rank[heads]
+        order = np.lexsort((heads, tails))
+        self.dag_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=count), out=self.dag_offsets[1:])
+        self.dag_targets = heads[order].astype(np.int32)
+        self.sizes = np.bincount(self.labels, minlength=count)
+        self.largest = int(self.sizes.argmax()) if count else -1
+        self.closure = self._closure() if count <= CLOSURE_MAX_COMPONENTS else None
+
+    @classmethod
+    def from_arrays(cls, labels, dag_offsets, dag_targets, sizes, closure=None):
+        """Components stored by arrays(), e.g. memory-mapped, without recomputing them."""
+        connectivity = cls.__new__(cls)
+        connectivity.labels = labels
+        connectivity.dag_offsets = dag_offsets
+        connectivity.dag_targets = dag_targets
+        connectivity.sizes = sizes
+        connectivity.largest = int(np.argmax(sizes)) if len(sizes) else -1
+        connectivity.closure = closure
+        return connectivity
+
+    def arrays(self):
+        """The arrays from_arrays() takes, by name; closure is left out when there is none."""
+        arrays = {"labels": self.labels, "dag_offsets": self.dag_offsets,
+                  "dag_targets": self.dag_targets, "sizes": self.sizes}
+        if self.closure is not None:
+            arrays["closure"] = self.closure
+        return arrays
+
+    @property
+    def num_components(self):
+        return len(self.sizes)
+
+    def _closure(self):
+        """Packed bit matrix: bit (a, b) is set when component a reaches component b."""
+        count = self.num_components
+        closure = np.zeros((count, (count + 7) // 8), dtype=np.uint8)
+        offsets, targets = self.dag_offsets, self.dag_targets
+        # Successors have higher labels, so their rows are complete when c is reached
+        for c in range(count - 1, -1, -1):
+            successors = targets[offsets[c]:offsets[c + 1]]
+            if len(successors):
+                np.bitwise_or.reduce(closure[successors], axis=0, out=closure[c])
+            closure[c, c >> 3] |= 0x80 >> (c & 7)
+        return closure
+
+    def nbytes(self):
+        arrays = [self.labels, self.dag_offsets, self.dag_targets, self.sizes, self.closure]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def can_reach(self, source, target):
+        """Whether dense node target is reachable from dense node source."""
+        a, b = int(self.labels[source]), int(self.labels[target])
+        if a == b:
+            return True
+        if a > b:
+            return False
+        if self.closure is not None:
+            return bool(self.closure[a, b >> 3] & (0x80 >> (b & 7)))
+        offsets, targets = self.dag_offsets, self.dag_targets
+        stack, seen = [a], {a}
+        while stack:
+            c = stack.pop()
+            for d in targets[offsets[c]:offsets[c + 1]].tolist():
+                if d == b:
+                    return True
+                # Components past b come later in topological order and cannot lead back to it
+                if d < b and d not in seen:
+                    seen.add(d)
+                    stack.append(d)
+        return False
+
+    def in_largest(self, indices):
+        """Boolean mask of the dense nodes that belong to the largest component."""
+        return self.labels[indices] == self.largest
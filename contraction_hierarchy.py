@@ -0,0 +1,459 @@
+# contraction_hierarchy.py
+"""
+Contraction Hierarchies (CH) for fast point-to-point queries on a static
+road network.
+
+Preprocessing contracts nodes one at a time in edge-difference order and
+adds shortcut edges that preserve shortest-path distances. A query is then
+a bidirectional Dijkstra that only relaxes edges leading to higher-ranked
+nodes, which settles a few hundred nodes instead of most of the city.
+
+Build offline and load at startup:
+
+    python contraction_hierarchy.py snapshots/chandigarh_drive_ch.npz
+"""
+import heapq
+import os
+import sys
+
+import numpy as np
+
+from dijkstra_algorithm import get_compact_graph
+
+CH_FORMAT_VERSION = 2
+
+DEFAULT_HIERARCHY_PATH = "snapshots/chandigarh_drive_ch.npz"
+
+# Witness searches stop after this many settled nodes; a search that gives
+# up simply keeps the shortcut, which is always safe.
+WITNESS_SETTLE_LIMIT = 500
+
+
+class ContractionHierarchy:
+    """
+    Upward and downward search graphs of a contracted road network.
+
+    Both graphs are CSR arrays indexed by the dense node index of the
+    CompactGraph the hierarchy was built from. The forward graph holds
+    edges v -> w and the backward graph edges u -> v (stored at v), always
+    towards the higher-ranked endpoint. middle[e] is the contracted node a
+    shortcut bypasses, or -1 for an original road segment.
+    """
+
+    def __init__(self, node_ids, rank, forward, backward, source_edges=0, graph_version=None):
+        self.node_ids = node_ids
+        self.rank = rank
+        self.forward = forward
+        self.backward = backward
+        self.source_edges = source_edges
+        self.graph_version = graph_version
+        self.ids = node_ids.tolist()
+        self.node_index = {node: i for i, node in enumerate(self.ids)}
+        self._lists = None
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_shortcuts(self):
+        return int((self.forward[3] >= 0).sum() + (self.backward[3] >= 0).sum())
+
+    def __contains__(self, node):
+        return node in self.node_index
+
+    def nbytes(self):
+        """Memory held by the array buffers, in bytes."""
+        arrays = [self.node_ids, self.rank, *self.forward, *self.backward]
+        return sum(a.nbytes for a in arrays)
+
+    def matches(self, G):
+        """
+        True if this hierarchy was built from G as it is now.
+
+        Shortcut lengths depend on every edge weight, so a graph with the
+        same nodes and edges but updated weights (closures, slowdowns, another
+        travel profile) does not match.
+        """
+        graph = get_compact_graph(G)
+        return (graph.num_nodes == self.num_nodes
+                and graph.num_edges == self.source_edges
+                and graph.version == self.graph_version
+                and np.array_equal(graph.node_ids, self.node_ids))
+
+    def _adjacency(self):
+        if self._lists is None:
+            self._lists = tuple(
+                tuple(array.tolist() for array in csr)
+                for csr in (self.forward, self.backward)
+            )
+        return self._lists
+
+    def _index_of(self, node):
+        try:
+            return self.node_index[node]
+        except KeyError:
+            raise ValueError(f"Node {node} is not in the hierarchy")
+
+    def find_route(self, start, end):
+        """
+        Bidirectional upward search with shortcuts unpacked.
+
+        Returns:
+            dict with path (None if unreachable), distance_m, settled_nodes,
+            engine - the same shape as dijkstra_algorithm.find_route
+        """
+        source = self._index_of(start)
+        target = self._index_of(end)
+        searches = [_upward_search(csr, root) for csr, root in zip(self._adjacency(), (source, target))]
+        next(searches[0])
+        next(searches[1])
+
+        fwd_dist, fwd_pred, fwd_edge = {source: 0}, {source: -1}, {}
+        bwd_dist, bwd_pred, bwd_edge = {target: 0}, {target: -1}, {}
+        state = ((fwd_dist, fwd_pred, fwd_edge), (bwd_dist, bwd_pred, bwd_edge))
+        best = float('inf')
+        meeting = -1
+        settled = 0
+        active = [True, True]
+
+        # Alternate between the two directions; each side stops on its own
+        # once its queue minimum can no longer improve the best meeting point.
+        while active[0] or active[1]:
+            for side in (0, 1):
+                if not active[side]:
+                    continue
+                step = searches[side].send(best)
+                if step is None:
+                    active[side] = False
+                    continue
+                node, dist, pred, edge = step
+                settled += 1
+                dists, preds, edges = state[side]
+                dists[node], preds[node], edges[node] = dist, pred, edge
+                other = state[1 - side][0]
+                if node in other and dist + other[node] < best:
+                    best = dist + other[node]
+                    meeting = node
+
+        if meeting == -1:
+            return {"path": None, "distance_m": float('inf'), "settled_nodes": settled,
+                    "engine": "contraction_hierarchy"}
+
+        forward_csr, backward_csr = self._adjacency()
+        dense = []
+        node = meeting
+        while fwd_pred[node] != -1:
+            dense.append((fwd_pred[node], node, fwd_edge[node], 0))
+            node = fwd_pred[node]
+        dense.reverse()
+        node = meeting
+        while bwd_pred[node] != -1:
+            dense.append((node, bwd_pred[node], bwd_edge[node], 1))
+            node = bwd_pred[node]
+
+        path = [source]
+        for u, v, e, direction in dense:
+            csr = forward_csr if direction == 0 else backward_csr
+            self._unpack(u, v, csr[3][e], path)
+        return {
+            "path": [self.ids[i] for i in path],
+            "distance_m": best,
+            "settled_nodes": settled,
+            "engine": "contraction_hierarchy",
+        }
+
+    def _unpack(self, u, v, middle, path):
+        """Append the original nodes of edge u -> v (excluding u) to path."""
+        if middle == -1:
+            path.append(v)
+            return
+        forward_csr, backward_csr = self._adjacency()
+        # u -> middle is stored at middle in the backward graph, middle -> v
+        # in the forward graph, because middle has the lowest rank of the three.
+        self._unpack(u, middle, _edge_middle(backward_csr, middle, u), path)
+        self._unpack(middle, v, _edge_middle(forward_csr, middle, v), path)
+
+    def shortest_path(self, start, end):
+        """Same contract as dijkstra_algorithm.dijkstra_shortest_path: (path, distance)."""
+        result = self.find_route(start, end)
+        return result["path"], result["distance_m"]
+
+    def many_to_many(self, starts, ends):
+        """
+        Bucket-based distance table between two node lists.
+
+        One backward upward search per end fills per-node buckets with
+        (column, distance); one forward upward search per start then scans
+        the buckets of every node it settles.
+
+        Returns:
+            float64 array of shape (len(starts), len(ends)), inf where unreachable
+        """
+        forward_csr, backward_csr = self._adjacency()
+        buckets = {}
+        for j, end in enumerate(ends):
+            for node, dist in _upward_distances(backward_csr, self._index_of(end)).items():
+                buckets.setdefault(node, []).append((j, dist))
+
+        table = np.full((len(starts), len(ends)), np.inf)
+        for i, start in enumerate(starts):
+            row = table[i]
+            for node, dist in _upward_distances(forward_csr, self._index_of(start)).items():
+                for j, to_end in buckets.get(node, ()):
+                    if dist + to_end < row[j]:
+                        row[j] = dist + to_end
+        return table
+
+
+def _edge_middle(csr, node, other):
+    """Middle node of the cheapest stored edge between node and other."""
+    offsets, targets, weights, middles = csr
+    best, middle = float('inf'), -1
+    for e in range(offsets[node], offsets[node + 1]):
+        if targets[e] == other and weights[e] < best:
+            best, middle = weights[e], middles[e]
+    return middle
+
+
+def _upward_search(csr, root):
+    """
+    Coroutine Dijkstra over one upward graph.
+
+    After priming, each send(best) settles the next node and yields
+    (node, distance, predecessor, edge index), or None once the queue is
+    empty or its minimum is at least best.
+    """
+    offsets, targets, weights, _ = csr
+    dist = {root: 0}
+    pred = {root: (-1, -1)}
+    done = set()
+    pq = [(0, root)]
+    best = yield
+    while pq:
+        d, node = heapq.heappop(pq)
+        if node in done:
+            continue
+        if d >= best:
+            break
+        done.add(node)
+        for e in range(offsets[node], offsets[node + 1]):
+            w = targets[e]
+            nd = d + weights[e]
+            if nd < dist.get(w, float('inf')):
+                dist[w] = nd
+                pred[w] = (node, e)
+                heapq.heappush(pq, (nd, w))
+        p, e = pred[node]
+        best = yield (node, d, p, e)
+    yield None
+
+
+def _upward_distances(csr, root):
+    """Exhaustive Dijkstra over one upward graph; returns {node: distance}."""
+    offsets, targets, weights, _ = csr
+    dist = {root: 0}
+    done = {}
+    pq = [(0, root)]
+    while pq:
+        d, node = heapq.heappop(pq)
+        if node in done:
+            continue
+        done[node] = d
+        for e in range(offsets[node], offsets[node + 1]):
+            w = targets[e]
+            nd = d + weights[e]
+            if nd < dist.get(w, float('inf')):
+                dist[w] = nd
+                heapq.heappush(pq, (nd, w))
+    return done
+
+
+def _witness_distances(out_edges, source, skip, limit):
+    """Dijkstra from source over remaining nodes, avoiding skip, bounded by limit."""
+    dist = {source: 0}
+    pq = [(0, source)]
+    done = set()
+    while pq and len(done) < WITNESS_SETTLE_LIMIT:
+        d, node = heapq.heappop(pq)
+        if node in done:
+            continue
+        if d > limit:
+            break
+        done.add(node)
+        for w, (weight, _) in out_edges[node].items():
+            if w == skip:
+                continue
+            nd = d + weight
+            if nd < dist.get(w, float('inf')):
+                dist[w] = nd
+                heapq.heappush(pq, (nd, w))
+    return dist
+
+
+def _shortcuts_for(v, out_edges, in_edges):
+    """Shortcuts (u, w, weight) needed to contract v without losing distances."""
+    shortcuts = []
+    if not in_edges[v] or not out_edges[v]:
+        return shortcuts
+    max_out = max(weight for weight, _ in out_edges[v].values())
+    for u, (w_in, _) in in_edges[v].items():
+        witness = _witness_distances(out_edges, u, v, w_in + max_out)
+        for w, (w_out, _) in out_edges[v].items():
+            if w == u:
+                continue
+            via = w_in + w_out
+            if witness.get(w, float('inf')) > via:
+                shortcuts.append((u, w, via))
+    return shortcuts
+
+
+def build_contraction_hierarchy(G, verbose=False):
+    """
+    Contract every node of G and return the resulting ContractionHierarchy.
+
+    Nodes are ordered lazily by edge difference (shortcuts added minus edges
+    removed) plus the number of already-contracted neighbours, which spreads
+    contraction evenly across the network.
+
+    Args:
+        G: Graph from load_graph_for_place / ox.graph_from_point, or a CompactGraph
+        verbose: Print progress every 1000 contracted nodes
+
+    Returns:
+        ContractionHierarchy
+    """
+    graph = get_compact_graph(G)
+    offsets, targets, weights = graph.adjacency()
+    n = graph.num_nodes
+
+    out_edges = [dict() for _ in range(n)]
+    in_edges = [dict() for _ in range(n)]
+    for u in range(n):
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            out_edges[u][v] = (weights[e], -1)
+            in_edges[v][u] = (weights[e], -1)
+
+    contracted_neighbors = [0] * n
+
+    def priority(v):
+        shortcuts = _shortcuts_for(v, out_edges, in_edges)
+        return len(shortcuts) - len(in_edges[v]) - len(out_edges[v]) + contracted_neighbors[v]
+
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+    rank = np.full(n, -1, dtype=np.int32)
+    upward_fwd = [None] * n
+    upward_bwd = [None] * n
+    order = 0
+
+    while heap:
+        _, v = heapq.heappop(heap)
+        if rank[v] >= 0:
+            continue
+        # Lazy update: re-evaluate and defer if another node is now cheaper
+        current = priority(v)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        for u, w, via in _shortcuts_for(v, out_edges, in_edges):
+            if via < out_edges[u].get(w, (float('inf'),))[0]:
+                out_edges[u][w] = (via, v)
+                in_edges[w][u] = (via, v)
+
+        upward_fwd[v] = list(out_edges[v].items())
+        upward_bwd[v] = list(in_edges[v].items())
+        for w in out_edges[v]:
+            del in_edges[w][v]
+            contracted_neighbors[w] += 1
+        for u in in_edges[v]:
+            del out_edges[u][v]
+            contracted_neighbors[u] += 1
+        out_edges[v] = {}
+        in_edges[v] = {}
+
+        rank[v] = order
+        order += 1
+        if verbose and order % 1000 == 0:
+            print(f"Contracted {order}/{n} nodes")
+
+    return ContractionHierarchy(
+        graph.node_ids,
+        rank,
+        _to_csr(upward_fwd, n),
+        _to_csr(upward_bwd, n),
+        source_edges=graph.num_edges,
+        graph_version=graph.version,
+    )
+
+
+def _to_csr(edge_lists, n):
+    """Pack per-node [(other, (weight, middle))] lists into CSR arrays."""
+    counts = np.fromiter((len(edges) for edges in edge_lists), dtype=np.int64, count=n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    flat = [(other, weight, middle) for edges in edge_lists for other, (weight, middle) in edges]
+    targets = np.fromiter((f[0] for f in flat), dtype=np.int32, count=len(flat))
+    weights = np.fromiter((f[1] for f in flat), dtype=np.float64, count=len(flat))
+    middles = np.fromiter((f[2] for f in flat), dtype=np.int32, count=len(flat))
+    return offsets, targets, weights, middles
+
+
+def save_contraction_hierarchy(ch, path):
+    """Write a hierarchy to a .npz file."""
+    arrays = {
+        "format_version": np.array(CH_FORMAT_VERSION),
+        "node_ids": ch.node_ids,
+        "rank": ch.rank,
+        "source_edges": np.array(ch.source_edges),
+        "graph_version": np.array(ch.graph_version or ""),
+    }
+    for name, csr in (("forward", ch.forward), ("backward", ch.backward)):
+        for part, array in zip(("offsets", "targets", "weights", "middles"), csr):
+            arrays[f"{name}_{part}"] = array
+    np.savez(path, **arrays)
+
+
+def load_contraction_hierarchy(path):
+    """
+    Load a hierarchy written by save_contraction_hierarchy.
+
+    Raises:
+        ValueError if the file was written by an incompatible format version
+    """
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["format_version"])
+        if version != CH_FORMAT_VERSION:
+            raise ValueError(f"Unsupported hierarchy format version {version} in {path}")
+        csrs = [
+            tuple(data[f"{name}_{part}"] for part in ("offsets", "targets", "weights", "middles"))
+            for name in ("forward", "backward")
+        ]
+        return ContractionHierarchy(
+            data["node_ids"],
+            data["rank"],
+            csrs[0],
+            csrs[1],
+            source_edges=int(data["source_edges"]),
+            graph_version=str(data["graph_version"]) or None,
+        )
+
+
+if __name__ == "__main__":
+    import time
+
+    from locations_config import CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M
+    from network_profiles import load_multi_profile
+
+    out_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_HIERARCHY_PATH
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    # The drive profile of the graph app.py routes on; matches() rejects it for other weights
+    G = load_multi_profile(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M).graph("drive")
+    start_time = time.perf_counter()
+    ch = build_contraction_hierarchy(G, verbose=True)
+    print(f"Built hierarchy for {ch.num_nodes} nodes with {ch.num_shortcuts} shortcuts "
+          f"in {time.perf_counter() - start_time:.1f}s")
+    save_contraction_hierarchy(ch, out_path)
+    print(f"Saved to {out_path}")
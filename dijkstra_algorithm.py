@@ -1,69 +1,482 @@
 # dijkstra_algorithm.py
+import hashlib
 import heapq
+import time
+import weakref
+from functools import cached_property
 
-def dijkstra_with_steps(G, start, end):
+import numpy as np
+
+from connectivity import Connectivity
+
+# 'highway' values kept per edge as road_classes codes (index into this
+# tuple); 0 stands for any other or a missing value
+ROAD_CLASSES = (
+    None, "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link", "tertiary", "tertiary_link", "unclassified", "residential",
+    "living_street", "service",
+)
+_ROAD_CLASS_CODES = {name: code for code, name in enumerate(ROAD_CLASSES) if name is not None}
+
+
+def road_class_code(highway):
+    """ROAD_CLASSES code of a 'highway' tag value (osmnx lists count by their first value)."""
+    if isinstance(highway, (list, tuple)):
+        highway = highway[0] if highway else None
+    return _ROAD_CLASS_CODES.get(highway, 0)
+
+
+class CompactGraph:
+    """
+    Read-only CSR (compressed sparse row) form of a road network.
+
+    Node ids are mapped to dense ints 0..n-1. The outgoing edges of node i
+    are targets[offsets[i]:offsets[i + 1]] with matching weights. Parallel
+    edges are collapsed to the shortest one, so every (u, v) pair appears once.
+
+    Optional edge geometry is stored CSR-style too: the interior vertices of
+    edge e (its curve between the two end nodes) are
+    geometry_xy[geometry_offsets[e]:geometry_offsets[e + 1]] as (x, y) rows.
+    Optional road_classes holds one uint8 ROAD_CLASSES code per edge, the
+    road type travel-time estimates need once the tags are gone.
+    """
+
+    def __init__(self, node_ids, offsets, targets, weights, xs=None, ys=None, crs=None, version=None,
+                 geometry_offsets=None, geometry_xy=None, road_classes=None):
+        self.node_ids = node_ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.xs = xs
+        self.ys = ys
+        self.crs = crs
+        self.geometry_offsets = geometry_offsets
+        self.geometry_xy = geometry_xy
+        self.road_classes = road_classes
+        self._version = version
+        self._adjacency = None
+        self._reverse = None
+        self._connectivity = None
+
+    @cached_property
+    def ids(self):
+        """Original node ids as a list, indexed by dense index."""
+        return self.node_ids.tolist()
+
+    @cached_property
+    def node_index(self):
+        """Original node id -> dense index."""
+        return {node: i for i, node in enumerate(self.ids)}
+
+    @property
+    def version(self):
+        """
+        Content hash of the topology and weights.
+
+        Derived data (hierarchies, matrices, cached routes) records this to
+        tell whether it still belongs to the graph it is used with.
+        """
+        if self._version is None:
+            digest = hashlib.sha1()
+            for array in (self.node_ids, self.offsets, self.targets, self.weights):
+                digest.update(np.ascontiguousarray(array).tobytes())
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def __contains__(self, node):
+        return node in self.node_index
+
+    def __len__(self):
+        return self.num_nodes
+
+    def __getstate__(self):
+        # Derived lookup tables are rebuilt lazily; only ship the arrays
+        state = dict(self.__dict__)
+        for key in ("ids", "node_index"):
+            state.pop(key, None)
+        state["_adjacency"] = None
+        state["_reverse"] = None
+        state["_connectivity"] = None
+        return state
+
+    def index_of(self, node):
+        """Return the dense index of an original node id."""
+        try:
+            return self.node_index[node]
+        except KeyError:
+            raise ValueError(f"Node {node} is not in the graph")
+
+    def edge_weight(self, u, v):
+        """Weight of edge u -> v between original node ids, or None if absent."""
+        i, j = self.node_index.get(u), self.node_index.get(v)
+        if i is None or j is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        hits = np.flatnonzero(self.targets[start:end] == j)
+        return float(self.weights[start + hits[0]]) if len(hits) else None
+
+    def node_latlons(self, nodes):
+        """Return [(y, x), ...] for a sequence of original node ids in one gather."""
+        index = np.fromiter((self.node_index[n] for n in nodes), dtype=np.int64)
+        return list(zip(self.ys[index].tolist(), self.xs[index].tolist()))
+
+    def find_edges(self, tails, heads):
+        """
+        CSR positions of the edges tails[i] -> heads[i] (dense indices).
+
+        Returns:
+            int64 array, -1 where there is no such edge
+        """
+        tails = np.asarray(tails, dtype=np.int64)
+        heads = np.asarray(heads, dtype=np.int64)
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.offsets))
+        keys = sources * self.num_nodes + self.targets
+        order = None
+        # Rows built here are sorted by target; only foreign CSR data needs a sort
+        if len(keys) > 1 and np.any(keys[1:] < keys[:-1]):
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+        wanted = tails * self.num_nodes + heads
+        positions = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+        found = (keys[positions] == wanted) if len(keys) else np.zeros(len(wanted), dtype=bool)
+        if order is not None:
+            positions = order[positions]
+        return np.where(found, positions, -1)
+
+    def path_coordinates(self, path):
+        """
+        (xs, ys) arrays tracing a path of original node ids, including the
+        curved edge geometry between nodes where the graph has it.
+        """
+        index = np.fromiter((self.node_index[n] for n in path), dtype=np.int64, count=len(path))
+        if self.geometry_offsets is None or len(index) < 2:
+            return self.xs[index], self.ys[index]
+        edges = self.find_edges(index[:-1], index[1:])
+        edges = edges[edges >= 0]
+        if len(edges) != len(index) - 1:
+            return self.xs[index], self.ys[index]
+        starts = self.geometry_offsets[edges]
+        counts = self.geometry_offsets[edges + 1] - starts
+        # Each edge contributes its tail node followed by its interior vertices
+        node_slots = np.concatenate([[0], np.cumsum(counts + 1)])
+        total = int(node_slots[-1]) + 1
+        is_node = np.zeros(total, dtype=bool)
+        is_node[node_slots] = True
+        interior = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        xs, ys = np.empty(total), np.empty(total)
+        xs[is_node], ys[is_node] = self.xs[index], self.ys[index]
+        xs[~is_node], ys[~is_node] = self.geometry_xy[interior, 0], self.geometry_xy[interior, 1]
+        return xs, ys
+
+    def adjacency(self):
+        """
+        Return (offsets, targets, weights) as plain Python lists.
+
+        The search loops index these millions of times; list indexing is much
+        cheaper than pulling scalars out of NumPy arrays one at a time.
+        """
+        if self._adjacency is None:
+            self._adjacency = (
+                self.offsets.tolist(),
+                self.targets.tolist(),
+                self.weights.tolist(),
+            )
+        return self._adjacency
+
+    def reverse(self):
+        """Return the transposed graph (every edge flipped), built once and cached."""
+        if self._reverse is None:
+            sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.offsets))
+            order = np.argsort(self.targets, kind="stable")
+            offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=self.num_nodes), out=offsets[1:])
+            reverse = CompactGraph(
+                self.node_ids,
+                offsets,
+                sources[order].astype(np.int32),
+                self.weights[order],
+                xs=self.xs,
+                ys=self.ys,
+                crs=self.crs,
+                road_classes=self.road_classes[order] if self.road_classes is not None else None,
+            )
+            reverse._reverse = self
+            self._reverse = reverse
+        return self._reverse
+
+    def connectivity(self):
+        """Strongly connected components over the edges with a finite weight, built once and cached."""
+        if self._connectivity is None:
+            self._connectivity = Connectivity(self)
+        return self._connectivity
+
+    def can_reach(self, source, target):
+        """Whether dense node target is reachable from dense node source, without searching."""
+        return self.connectivity().can_reach(source, target)
+
+    def with_weights(self, weights):
+        """
+        New CompactGraph with the same topology and different edge weights.
+
+        Node ids, offsets, targets and coordinates are shared rather than
+        copied, as are the id lookup tables and adjacency lists built so far.
+        Components carry over too unless an edge was closed or reopened.
+        """
+        graph = CompactGraph(self.node_ids, self.offsets, self.targets, weights,
+                             xs=self.xs, ys=self.ys, crs=self.crs,
+                             geometry_offsets=self.geometry_offsets, geometry_xy=self.geometry_xy,
+                             road_classes=self.road_classes)
+        for key in ("ids", "node_index"):
+            if key in self.__dict__:
+                graph.__dict__[key] = self.__dict__[key]
+        if self._adjacency is not None:
+            graph._adjacency = (self._adjacency[0], self._adjacency[1], weights.tolist())
+        if self._connectivity is not None and np.array_equal(np.isfinite(weights), np.isfinite(self.weights)):
+            graph._connectivity = self._connectivity
+        return graph
+
+    def nbytes(self):
+        """Approximate memory held by the array buffers, in bytes."""
+        arrays = [self.node_ids, self.offsets, self.targets, self.weights, self.xs, self.ys,
+                  self.geometry_offsets, self.geometry_xy, self.road_classes]
+        components = self._connectivity.nbytes() if self._connectivity is not None else 0
+        return sum(a.nbytes for a in arrays if a is not None) + components
+
+
+def _squared_distance(point, node):
+    return (point[0] - node.get("x", np.nan)) ** 2 + (point[1] - node.get("y", np.nan)) ** 2
+
+
+def compact_graph_from_networkx(G, weight="length"):
+    """
+    Build a CompactGraph from a NetworkX (Multi)DiGraph such as osmnx returns.
+
+    Args:
+        G: NetworkX graph with node 'x'/'y' attributes
+        weight: Edge attribute used as the cost (missing values count as 1)
+
+    Returns:
+        CompactGraph
+    """
+    node_list = list(G.nodes)
+    try:
+        node_ids = np.asarray(node_list, dtype=np.int64)
+    except (TypeError, ValueError, OverflowError):
+        node_ids = np.empty(len(node_list), dtype=object)
+        node_ids[:] = node_list
+    index = {node: i for i, node in enumerate(node_list)}
+
+    sources, dests, costs, curves, classes = [], [], [], [], []
+    for u, v, data in G.edges(data=True):
+        if u == v:
+            continue
+        sources.append(index[u])
+        dests.append(index[v])
+        w = data.get(weight, 1)
+        costs.append(w if w is not None else 1)
+        classes.append(road_class_code(data.get("highway")))
+        # osmnx stores curved edges as a shapely LineString, normally running
+        # u -> v; undirected graphs may hold it the other way round
+        geometry = data.get("geometry")
+        curve = list(geometry.coords) if geometry is not None else []
+        if curve and _squared_distance(curve[-1], G.nodes[u]) < _squared_distance(curve[0], G.nodes[u]):
+            curve.reverse()
+        curves.append(curve[1:-1])
+    src = np.asarray(sources, dtype=np.int64)
+    dst = np.asarray(dests, dtype=np.int64)
+    wts = np.asarray(costs, dtype=np.float64)
+    road_classes = np.asarray(classes, dtype=np.uint8)
+    if not G.is_directed():
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+        wts = np.concatenate([wts, wts])
+        road_classes = np.concatenate([road_classes, road_classes])
+        curves = curves + [curve[::-1] for curve in curves]
+
+    # Sort by (source, target, weight) and keep the first of each (source,
+    # target) run: that is the minimum over parallel edges.
+    order = np.lexsort((wts, dst, src))
+    src, dst, wts = src[order], dst[order], wts[order]
+    if len(src):
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        src, dst, wts = src[keep], dst[keep], wts[keep]
+        order = order[keep]
+    road_classes = road_classes[order]
+
+    geometry_offsets = geometry_xy = None
+    if any(curves):
+        kept_curves = [curves[i] for i in order.tolist()]
+        geometry_offsets = np.zeros(len(kept_curves) + 1, dtype=np.int64)
+        np.cumsum([len(curve) for curve in kept_curves], out=geometry_offsets[1:])
+        geometry_xy = np.asarray([point[:2] for curve in kept_curves for point in curve],
+                                 dtype=np.float64).reshape(-1, 2)
+
+    offsets = np.zeros(len(node_list) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(node_list)), out=offsets[1:])
+
+    xs = np.asarray([G.nodes[n].get("x", np.nan) for n in node_list], dtype=np.float64)
+    ys = np.asarray([G.nodes[n].get("y", np.nan) for n in node_list], dtype=np.float64)
+
+    return CompactGraph(
+        node_ids,
+        offsets,
+        dst.astype(np.int32),
+        wts,
+        xs=xs,
+        ys=ys,
+        crs=G.graph.get("crs"),
+        geometry_offsets=geometry_offsets,
+        geometry_xy=geometry_xy,
+        road_classes=road_classes,
+    )
+
+
+_compact_cache = weakref.WeakKeyDictionary()
+
+
+def get_compact_graph(G, weight="length"):
+    """
+    Return the CompactGraph for G, building it on first use.
+
+    CompactGraphs are passed through unchanged. NetworkX graphs are converted
+    once per weight attribute and remembered for as long as the graph object
+    is alive; the cached form is rebuilt if the node count changed since.
+    Edge edits on a graph that was already converted need an explicit
+    compact_graph_from_networkx().
+    """
+    if isinstance(G, CompactGraph):
+        return G
+    size = len(G)
+    per_weight = _compact_cache.setdefault(G, {})
+    cached = per_weight.get(weight)
+    if cached is None or cached[0] != size:
+        cached = (size, compact_graph_from_networkx(G, weight=weight))
+        per_weight[weight] = cached
+    return cached[1]
+
+
+def set_compact_graph(G, graph, weight="length"):
+    """Make get_compact_graph(G, weight) return graph, e.g. after an edge update."""
+    _compact_cache.setdefault(G, {})[weight] = (len(G), graph)
+
+
+def _reconstruct_path(ids, predecessors, target):
+    """Walk predecessor pointers back from target and return original node ids."""
+    path = []
+    node = target
+    while node != -1:
+        path.append(ids[node])
+        node = predecessors[node]
+    path.reverse()
+    return path
+
+
+def dijkstra_with_steps(G, start, end, every=1, every_ms=None):
     """
     Dijkstra algorithm generator that yields progress steps.
     Uses edge 'length' attribute from OSM data for accurate distance calculation.
+    G may be a NetworkX graph or a CompactGraph.
+
+    Steps carry only what changed since the previous step, so a full trace
+    costs O(V + E) instead of copying the visited set and path every time:
+        settled: [(node, distance, predecessor or None), ...]
+        relaxed: [(from_node, to_node, new_distance), ...]
+    plus current_node, distance, frontier_size and nodes_explored. Feed the
+    steps to a TraceState to rebuild the visited set or a path on demand.
+
+    Args:
+        every: Yield once per this many settled nodes
+        every_ms: Also yield once this many milliseconds have passed since
+            the previous step, whichever comes first
+
+    The last item is {"done": True, "path", "total_distance", "nodes_explored"}.
     """
-    pq = [(0, start, [])]
-    visited = set()
-    distances = {start: 0}
+    graph = get_compact_graph(G)
+    offsets, targets, weights = graph.adjacency()
+    ids = graph.ids
+    source = graph.index_of(start)
+    target = graph.index_of(end)
+
+    n = graph.num_nodes
+    distances = [float('inf')] * n
+    predecessors = [-1] * n
+    settled = bytearray(n)
+    distances[source] = 0
+    # Unreachable targets end the trace at once instead of exploring everything reachable
+    pq = [(0, source)] if graph.can_reach(source, target) else []
     nodes_explored = 0
 
+    pending_settled = []
+    pending_relaxed = []
+    since_yield = 0
+    last_yield = time.perf_counter()
+
+    def step(node, dist):
+        return {
+            "current_node": ids[node],
+            "distance": dist,
+            "settled": pending_settled,
+            "relaxed": pending_relaxed,
+            "frontier_size": len(pq),
+            "nodes_explored": nodes_explored
+        }
+
     while pq:
-        (dist, node, path) = heapq.heappop(pq)
-        
-        if node in visited:
+        (dist, node) = heapq.heappop(pq)
+
+        if settled[node]:
             continue
 
-        visited.add(node)
-        path = path + [node]
+        settled[node] = 1
         nodes_explored += 1
-
-        # Yield progress step
-        yield {
-            "current_node": node,
-            "distance": dist,
-            "visited": list(visited),
-            "path": path,
-            "nodes_explored": nodes_explored,
-            "queue_size": len(pq)
-        }
+        pred = predecessors[node]
+        pending_settled.append((ids[node], dist, ids[pred] if pred != -1 else None))
 
         # Check if destination reached
-        if node == end:
+        if node == target:
+            yield step(node, dist)
             yield {
                 "done": True,
-                "path": path,
+                "path": _reconstruct_path(ids, predecessors, node),
                 "total_distance": dist,
                 "nodes_explored": nodes_explored
             }
             return
 
         # Explore neighbors
-        for neighbor in G.neighbors(node):
-            if neighbor in visited:
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
                 continue
-            
-            # Get edge data - handle MultiDiGraph properly
-            edge_data = G.get_edge_data(node, neighbor)
-            if edge_data:
-                # For MultiDiGraph, edge_data is a dict of dicts
-                # Get the first edge's length
-                if isinstance(edge_data, dict):
-                    first_edge = edge_data[list(edge_data.keys())[0]]
-                    weight = first_edge.get('length', 1)
-                else:
-                    weight = edge_data.get('length', 1)
-            else:
-                weight = 1
-            
-            new_dist = dist + weight
-            
-            if neighbor not in distances or new_dist < distances[neighbor]:
+
+            new_dist = dist + weights[e]
+
+            if new_dist < distances[neighbor]:
                 distances[neighbor] = new_dist
-                heapq.heappush(pq, (new_dist, neighbor, path))
+                predecessors[neighbor] = node
+                heapq.heappush(pq, (new_dist, neighbor))
+                pending_relaxed.append((ids[node], ids[neighbor], new_dist))
+
+        # Yield progress step
+        since_yield += 1
+        if since_yield >= every or (
+                every_ms is not None and (time.perf_counter() - last_yield) * 1000 >= every_ms):
+            yield step(node, dist)
+            pending_settled = []
+            pending_relaxed = []
+            since_yield = 0
+            last_yield = time.perf_counter()
+
+    if pending_settled:
+        yield step(node, dist)
 
     # No path found
     yield {
@@ -75,48 +488,500 @@ def dijkstra_with_steps(G, start, end):
     }
 
 
+class TraceState:
+    """
+    Rebuilds the full search state from dijkstra_with_steps deltas.
+
+    Call apply() with each step in order; visited(), path_to() and
+    snapshot() then reconstruct views only when they are asked for.
+    """
+
+    def __init__(self):
+        self.distances = {}
+        self.predecessors = {}
+        self.settled_order = []
+        self.current_node = None
+        self.distance = 0
+        self.frontier_size = 0
+        self.nodes_explored = 0
+        self.result = None
+
+    def apply(self, step):
+        """Fold one step (or the final done item) into the state."""
+        if step.get("done"):
+            self.result = step
+            self.nodes_explored = step["nodes_explored"]
+            return self
+        for node, dist, pred in step["settled"]:
+            self.settled_order.append(node)
+            self.distances[node] = dist
+            self.predecessors[node] = pred
+        self.current_node = step["current_node"]
+        self.distance = step["distance"]
+        self.frontier_size = step["frontier_size"]
+        self.nodes_explored = step["nodes_explored"]
+        return self
+
+    def visited(self):
+        """Settled nodes in the order they were settled."""
+        return list(self.settled_order)
+
+    def path_to(self, node):
+        """Shortest path from the start to a settled node."""
+        path = []
+        while node is not None:
+            path.append(node)
+            node = self.predecessors.get(node)
+        path.reverse()
+        return path
+
+    def snapshot(self):
+        """The state in the old per-step format (visited list and current path)."""
+        return {
+            "current_node": self.current_node,
+            "distance": self.distance,
+            "visited": self.visited(),
+            "path": self.path_to(self.current_node) if self.current_node is not None else [],
+            "nodes_explored": self.nodes_explored,
+            "queue_size": self.frontier_size
+        }
+
+
+def replay_trace(steps):
+    """Apply a whole step sequence and return the resulting TraceState."""
+    state = TraceState()
+    for step in steps:
+        state.apply(step)
+    return state
+
+
+def _dijkstra_search(graph, source, target):
+    """
+    Plain Dijkstra between dense indices.
+
+    Returns:
+        (path, distance, settled_count); path is None if target is unreachable
+    """
+    offsets, targets, weights = graph.adjacency()
+    n = graph.num_nodes
+    distances = [float('inf')] * n
+    predecessors = [-1] * n
+    settled = bytearray(n)
+    distances[source] = 0
+    pq = [(0, source)]
+    settled_count = 0
+
+    while pq:
+        (dist, node) = heapq.heappop(pq)
+
+        if settled[node]:
+            continue
+
+        settled[node] = 1
+        settled_count += 1
+
+        if node == target:
+            return _reconstruct_path(graph.ids, predecessors, target), dist, settled_count
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
+                continue
+
+            new_dist = dist + weights[e]
+
+            if new_dist < distances[neighbor]:
+                distances[neighbor] = new_dist
+                predecessors[neighbor] = node
+                heapq.heappush(pq, (new_dist, neighbor))
+
+    return None, float('inf'), settled_count
+
+
 def dijkstra_shortest_path(G, start, end):
     """
     Standard Dijkstra algorithm without step-by-step yields.
     Returns the shortest path and its distance.
-    
+    G may be a NetworkX graph or a CompactGraph.
+
+    Heap entries carry only (distance, node); the route is rebuilt from
+    predecessor pointers once the destination is settled.
+
     Returns:
         (path, distance) or (None, float('inf')) if no path exists
     """
-    pq = [(0, start, [])]
-    visited = set()
-    distances = {start: 0}
+    graph = get_compact_graph(G)
+    source, target = graph.index_of(start), graph.index_of(end)
+    if not graph.can_reach(source, target):
+        return None, float('inf')
+    path, dist, _ = _dijkstra_search(graph, source, target)
+    return path, dist
+
+
+def _shortest_path_tree(graph, source, stop_at=None):
+    """
+    Single-source Dijkstra from a dense index.
+
+    Args:
+        stop_at: Optional set of dense indices; the search ends as soon as
+            all of them are settled (one-to-many). Runs to exhaustion if None.
+
+    Returns:
+        (distances, predecessors) as lists over dense indices; unreachable
+        nodes have distance inf and predecessor -1. With stop_at, only the
+        labels of the stop_at nodes are guaranteed final.
+    """
+    offsets, targets, weights = graph.adjacency()
+    n = graph.num_nodes
+    distances = [float('inf')] * n
+    predecessors = [-1] * n
+    settled = bytearray(n)
+    distances[source] = 0
+    pq = [(0, source)]
+    remaining = set(stop_at) if stop_at is not None else None
+
+    while pq:
+        (dist, node) = heapq.heappop(pq)
+        if settled[node]:
+            continue
+        settled[node] = 1
+        if remaining is not None:
+            remaining.discard(node)
+            if not remaining:
+                break
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            new_dist = dist + weights[e]
+            if new_dist < distances[neighbor]:
+                distances[neighbor] = new_dist
+                predecessors[neighbor] = node
+                heapq.heappush(pq, (new_dist, neighbor))
+
+    return distances, predecessors
+
+
+def _bounded_search(graph, source, limit, weights=None):
+    """
+    Single-source Dijkstra that stops once the next node costs more than limit.
+
+    Args:
+        weights: Optional per-edge cost list in CSR order (e.g. travel
+            times); the graph's own weights if None
+
+    Returns:
+        (nodes, costs): settled dense indices in settling order and their
+        costs, all <= limit
+    """
+    offsets, targets, graph_weights = graph.adjacency()
+    weights = graph_weights if weights is None else weights
+    distances = {source: 0}
+    settled = set()
+    nodes, costs = [], []
+    pq = [(0, source)]
 
     while pq:
-        (dist, node, path) = heapq.heappop(pq)
-        
-        if node in visited:
+        (dist, node) = heapq.heappop(pq)
+        if dist > limit:
+            break
+        if node in settled:
             continue
+        settled.add(node)
+        nodes.append(node)
+        costs.append(dist)
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            new_dist = dist + weights[e]
+            if new_dist <= limit and new_dist < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_dist
+                heapq.heappush(pq, (new_dist, neighbor))
 
-        visited.add(node)
-        path = path + [node]
+    return nodes, costs
+
+
+def one_to_many_distances(G, start, ends):
+    """
+    Road distances from start to each node in ends with a single search
+    that stops once every end node is settled.
 
-        if node == end:
-            return path, dist
+    Returns:
+        float64 array aligned with ends (inf where unreachable)
+    """
+    graph = get_compact_graph(G)
+    indices = [graph.index_of(end) for end in ends]
+    distances, _ = _shortest_path_tree(graph, graph.index_of(start), stop_at=indices)
+    return np.asarray([distances[i] for i in indices], dtype=np.float64)
+
+
+def shortest_path_tree(G, start):
+    """
+    Distances and predecessors from start to every node.
+
+    Returns:
+        (distances float64 array, predecessors int32 array), both indexed by
+        the dense node index of get_compact_graph(G)
+    """
+    graph = get_compact_graph(G)
+    distances, predecessors = _shortest_path_tree(graph, graph.index_of(start))
+    return np.asarray(distances, dtype=np.float64), np.asarray(predecessors, dtype=np.int32)
+
+
+def path_from_tree(G, distances, predecessors, end):
+    """Original node ids from the tree root to end, or None if end is unreachable."""
+    graph = get_compact_graph(G)
+    target = graph.index_of(end)
+    if not np.isfinite(distances[target]):
+        return None
+    return _reconstruct_path(graph.ids, predecessors, target)
+
+
+# Radius used by osmnx when it computes edge 'length' values
+EARTH_RADIUS_M = 6371009
+
+# Straight-line estimates are shrunk slightly so they never exceed the true
+# road distance: float rounding for lat/lon, UTM scale distortion (< 0.1%
+# inside a zone) for projected graphs.
+GEOGRAPHIC_HEURISTIC_SCALE = 0.9999
+PROJECTED_HEURISTIC_SCALE = 0.998
+
+
+def is_geographic(graph):
+    """True if node x/y are lon/lat degrees rather than projected meters."""
+    if graph.crs is not None:
+        return "4326" in str(graph.crs)
+    return bool(np.nanmax(np.abs(graph.xs)) <= 180 and np.nanmax(np.abs(graph.ys)) <= 90)
+
+
+def straight_line_distances(graph, target):
+    """
+    Admissible lower bound on the road distance from every node to target.
+
+    Uses haversine on lat/lon graphs and Euclidean distance on projected
+    (e.g. UTM from load_graph_for_place) graphs. Nodes without coordinates
+    get 0, which is always a valid bound.
+
+    Returns:
+        float64 array indexed by dense node index
+    """
+    if graph.xs is None or graph.ys is None:
+        return np.zeros(graph.num_nodes)
+    return straight_line_between(graph, slice(None), target)
+
+
+def straight_line_between(graph, sources, targets):
+    """
+    Elementwise lower bound on the road distance from sources to targets.
+
+    sources and targets are dense indices (arrays, scalars or slices) that
+    broadcast against each other, with the same scaling as
+    straight_line_distances.
+    """
+    xs, ys = graph.xs, graph.ys
+    if xs is None or ys is None:
+        return np.zeros(np.broadcast(np.asarray(sources), np.asarray(targets)).shape)
+    return _straight_line(xs[sources], ys[sources], xs[targets], ys[targets], is_geographic(graph))
 
-        for neighbor in G.neighbors(node):
-            if neighbor in visited:
+
+def straight_line_to_point(graph, x, y):
+    """
+    Lower bound on the road distance from every node to the point (x, y).
+
+    Same scaling as straight_line_distances, for targets that are not
+    nodes of this graph (e.g. a node in another tile).
+    """
+    if graph.xs is None or graph.ys is None:
+        return np.zeros(graph.num_nodes)
+    return _straight_line(graph.xs, graph.ys, x, y, is_geographic(graph))
+
+
+def _straight_line(x1, y1, x2, y2, geographic):
+    """Scaled haversine (lon/lat) or Euclidean distance, elementwise; NaN becomes 0."""
+    if geographic:
+        lat1, lon1 = np.radians(y1), np.radians(x1)
+        lat2, lon2 = np.radians(y2), np.radians(x2)
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        h = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        h *= GEOGRAPHIC_HEURISTIC_SCALE
+    else:
+        h = np.hypot(np.subtract(x1, x2), np.subtract(y1, y2)) * PROJECTED_HEURISTIC_SCALE
+    return np.nan_to_num(h, nan=0.0)
+
+
+def _astar_search(graph, source, target, heuristic=None):
+    """
+    Unidirectional A* between dense indices, guided by straight_line_distances.
+
+    Args:
+        heuristic: Per-node lower bounds on the distance to target (list),
+            used instead of the straight line; must be consistent
+
+    Returns:
+        (path, distance, settled_count)
+    """
+    offsets, targets, weights = graph.adjacency()
+    h = straight_line_distances(graph, target).tolist() if heuristic is None else heuristic
+    n = graph.num_nodes
+    distances = [float('inf')] * n
+    predecessors = [-1] * n
+    settled = bytearray(n)
+    distances[source] = 0
+    pq = [(h[source], source)]
+    settled_count = 0
+
+    while pq:
+        (_, node) = heapq.heappop(pq)
+
+        if settled[node]:
+            continue
+
+        settled[node] = 1
+        settled_count += 1
+        dist = distances[node]
+
+        if node == target:
+            return _reconstruct_path(graph.ids, predecessors, target), dist, settled_count
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
                 continue
-            
-            edge_data = G.get_edge_data(node, neighbor)
-            if edge_data:
-                if isinstance(edge_data, dict):
-                    first_edge = edge_data[list(edge_data.keys())[0]]
-                    weight = first_edge.get('length', 1)
-                else:
-                    weight = edge_data.get('length', 1)
-            else:
-                weight = 1
-            
-            new_dist = dist + weight
-            
-            if neighbor not in distances or new_dist < distances[neighbor]:
+
+            new_dist = dist + weights[e]
+
+            if new_dist < distances[neighbor]:
                 distances[neighbor] = new_dist
-                heapq.heappush(pq, (new_dist, neighbor, path))
+                predecessors[neighbor] = node
+                heapq.heappush(pq, (new_dist + h[neighbor], neighbor))
+
+    return None, float('inf'), settled_count
+
+
+def _bidirectional_astar_search(graph, source, target):
+    """
+    Bidirectional A* between dense indices.
+
+    Both directions use the average potential p(v) = (h_t(v) - h_s(v)) / 2
+    (forward) and -p(v) (backward), which keeps the two searches consistent
+    with each other. The search stops once the two queue minima together
+    reach the best meeting distance found so far.
 
-    return None, float('inf')
\ No newline at end of file
+    Returns:
+        (path, distance, settled_count)
+    """
+    if source == target:
+        return [graph.ids[source]], 0, 1
+
+    h_t = straight_line_distances(graph, target)
+    h_s = straight_line_distances(graph, source)
+    potential = ((h_t - h_s) / 2).tolist()
+
+    n = graph.num_nodes
+    sides = []
+    for csr, root, sign in ((graph, source, 1), (graph.reverse(), target, -1)):
+        dist = [float('inf')] * n
+        dist[root] = 0
+        sides.append({
+            "adjacency": csr.adjacency(),
+            "sign": sign,
+            "dist": dist,
+            "pred": [-1] * n,
+            "settled": bytearray(n),
+            "pq": [(sign * potential[root], root)],
+        })
+    forward, backward = sides
+
+    best = float('inf')
+    meeting = -1
+    settled_count = 0
+
+    while forward["pq"] and backward["pq"]:
+        if forward["pq"][0][0] + backward["pq"][0][0] >= best:
+            break
+
+        side = forward if forward["pq"][0][0] <= backward["pq"][0][0] else backward
+        other = backward if side is forward else forward
+        (_, node) = heapq.heappop(side["pq"])
+        settled = side["settled"]
+        if settled[node]:
+            continue
+        settled[node] = 1
+        settled_count += 1
+
+        offsets, targets, weights = side["adjacency"]
+        dist, pred, sign, pq = side["dist"], side["pred"], side["sign"], side["pq"]
+        other_dist = other["dist"]
+        node_dist = dist[node]
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
+                continue
+
+            new_dist = node_dist + weights[e]
+
+            if new_dist < dist[neighbor]:
+                dist[neighbor] = new_dist
+                pred[neighbor] = node
+                heapq.heappush(pq, (new_dist + sign * potential[neighbor], neighbor))
+                if new_dist + other_dist[neighbor] < best:
+                    best = new_dist + other_dist[neighbor]
+                    meeting = neighbor
+
+    if meeting == -1:
+        return None, float('inf'), settled_count
+
+    path = _reconstruct_path(graph.ids, forward["pred"], meeting)
+    node = backward["pred"][meeting]
+    while node != -1:
+        path.append(graph.ids[node])
+        node = backward["pred"][node]
+    return path, best, settled_count
+
+
+# Selectable engines: name -> search over dense indices returning
+# (path, distance, settled_count)
+ROUTING_ENGINES = {
+    "dijkstra": _dijkstra_search,
+    "astar": _astar_search,
+    "bidirectional_astar": _bidirectional_astar_search,
+}
+
+ENGINE_LABELS = {
+    "dijkstra": "Dijkstra's Shortest Path",
+    "astar": "A* Search",
+    "bidirectional_astar": "Bidirectional A*",
+    # Served by precomputed structures rather than ROUTING_ENGINES
+    "contraction_hierarchy": "Contraction Hierarchies",
+    "landmarks": "ALT (A*, Landmarks, Triangle inequality)",
+    "location_matrix": "Precomputed Location Table",
+}
+
+DEFAULT_ENGINE = "bidirectional_astar"
+
+
+def find_route(G, start, end, engine=DEFAULT_ENGINE):
+    """
+    Compute the shortest route once and return both the path and its length.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        start, end: Original node ids
+        engine: One of ROUTING_ENGINES
+
+    Returns:
+        dict with path (None if unreachable), distance_m, settled_nodes, engine
+    """
+    if engine not in ROUTING_ENGINES:
+        raise ValueError(f"Unknown routing engine '{engine}'. Available engines: {list(ROUTING_ENGINES)}")
+    graph = get_compact_graph(G)
+    source, target = graph.index_of(start), graph.index_of(end)
+    if graph.can_reach(source, target):
+        path, distance, settled = ROUTING_ENGINES[engine](graph, source, target)
+    else:
+        path, distance, settled = None, float('inf'), 0
+    return {
+        "path": path,
+        "distance_m": distance,
+        "settled_nodes": settled,
+        "engine": engine,
+    }
@@ -0,0 +1,227 @@
+# geocoder.py
+"""
+Offline geocoding over names we already have on disk.
+
+Indexes CHANDIGARH_LOCATIONS, the Nominatim and Overpass responses osmnx
+saved in cache/, and street names from loaded graphs. Lookups are served
+from memory: a sorted key list answers prefix queries by binary search and
+a trigram inverted index answers fuzzy ones, so no request ever blocks on
+the network.
+"""
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from locations_config import CHANDIGARH_LOCATIONS
+
+OSMNX_CACHE_DIR = "cache"
+
+# Lower number wins when two entries match equally well
+SOURCE_PRIORITY = {"locations": 0, "nominatim": 1, "overpass": 2, "graph": 3}
+
+DEFAULT_MIN_SCORE = 0.45
+# Offline hits at least this good (an exact name, or a prefix covering
+# nearly all of a name from one of its words) are trusted even when
+# Nominatim could be asked instead
+CONFIDENT_SCORE = 0.9
+
+
+def normalize(text):
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocalGeocoder:
+    """
+    In-memory name index.
+
+    Each entry is (name, lat, lon, source). Every entry is reachable by
+    prefix from the start of any word of its name ("plaza" finds "Sector
+    17 Plaza"), and by trigram similarity for misspellings. Aliases only
+    match when typed in full, so the towns and districts in a Nominatim
+    display_name do not resolve to every place inside them.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._keys = []  # sorted (normalized key, entry id, key is a whole name)
+        self._sorted = True
+        self._aliases = defaultdict(set)  # normalized alias -> entry ids
+        self._grams = defaultdict(set)  # trigram -> entry ids
+        self._gram_counts = []  # entry id -> trigram count of its main name
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, name, lat, lon, source, aliases=()):
+        """Index one place; exact duplicates (same name, source, position) are skipped."""
+        key = normalize(name)
+        if not key:
+            return
+        marker = (key, source, round(lat, 5), round(lon, 5))
+        with self._lock:
+            if marker in self._seen:
+                return
+            self._seen.add(marker)
+            entry_id = len(self.entries)
+            self.entries.append((name, lat, lon, source))
+            words = key.split()
+            for i in range(len(words)):
+                self._keys.append((" ".join(words[i:]), entry_id, i == 0))
+            for alias in aliases:
+                alias = normalize(alias)
+                if alias and alias != key:
+                    self._aliases[alias].add(entry_id)
+            grams = trigrams(key)
+            for gram in grams:
+                self._grams[gram].add(entry_id)
+            self._gram_counts.append(len(grams))
+            self._sorted = False
+
+    def add_locations(self, locations=CHANDIGARH_LOCATIONS):
+        for name, (lat, lon) in locations.items():
+            self.add(name, lat, lon, "locations")
+
+    def add_cache_folder(self, cache_folder=OSMNX_CACHE_DIR):
+        """Index every Nominatim result list and Overpass response in the osmnx cache."""
+        if not os.path.isdir(cache_folder):
+            return
+        for file_name in sorted(os.listdir(cache_folder)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(cache_folder, file_name), encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, list):
+                self._add_nominatim(data)
+            elif isinstance(data, dict) and "elements" in data:
+                self._add_overpass(data["elements"])
+
+    def _add_nominatim(self, results):
+        for result in results:
+            try:
+                lat, lon = float(result["lat"]), float(result["lon"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            display = result.get("display_name", "")
+            name = result.get("name") or display.split(",")[0]
+            self.add(name, lat, lon, "nominatim", aliases=[display])
+
+    def _add_overpass(self, elements):
+        coords = {e["id"]: (e["lat"], e["lon"]) for e in elements if e.get("type") == "node" and "lat" in e}
+        for element in elements:
+            name = element.get("tags", {}).get("name")
+            if not name:
+                continue
+            if element["type"] == "node" and element["id"] in coords:
+                lat, lon = coords[element["id"]]
+            elif element["type"] == "way":
+                points = [coords[n] for n in element.get("nodes", []) if n in coords]
+                if not points:
+                    continue
+                # Middle vertex keeps the point on the street itself
+                lat, lon = points[len(points) // 2]
+            else:
+                continue
+            self.add(name, lat, lon, "overpass")
+
+    def add_graph_names(self, G):
+        """Index named edges of an unprojected osmnx graph at their midpoints."""
+        for u, v, name in G.edges(data="name"):
+            if not name:
+                continue
+            for single in name if isinstance(name, list) else [name]:
+                lat = (G.nodes[u]["y"] + G.nodes[v]["y"]) / 2
+                lon = (G.nodes[u]["x"] + G.nodes[v]["x"]) / 2
+                self.add(single, lat, lon, "graph")
+
+    def _ensure_sorted(self):
+        if not self._sorted:
+            with self._lock:
+                self._keys.sort()
+                self._sorted = True
+
+    def _prefix_matches(self, query):
+        self._ensure_sorted()
+        matches = {}
+        i = bisect_left(self._keys, (query,))
+        while i < len(self._keys) and self._keys[i][0].startswith(query):
+            key, entry_id, whole = self._keys[i]
+            if whole and key == query:
+                score = 1.0
+            else:
+                # Longer coverage of the key and matches from the first word rank higher
+                score = 0.65 + 0.25 * len(query) / len(key) + (0.05 if whole else 0.0)
+            matches[entry_id] = max(matches.get(entry_id, 0.0), score)
+            i += 1
+        return matches
+
+    def _fuzzy_matches(self, query):
+        grams = trigrams(query)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for entry_id in self._grams.get(gram, ()):
+                overlap[entry_id] += 1
+        # Dice coefficient over trigram sets, scaled below prefix hits
+        return {
+            entry_id: 0.7 * 2 * shared / (len(grams) + self._gram_counts[entry_id])
+            for entry_id, shared in overlap.items()
+        }
+
+    def lookup(self, query, limit=5, min_score=DEFAULT_MIN_SCORE):
+        """
+        Best matches for a name, prefix or misspelling.
+
+        Returns:
+            list of dicts with name, lat, lon, source and score (0..1),
+            best first
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        scores = self._fuzzy_matches(query)
+        for entry_id, score in self._prefix_matches(query).items():
+            scores[entry_id] = max(scores.get(entry_id, 0.0), score)
+        for entry_id in self._aliases.get(query, ()):
+            scores[entry_id] = 1.0
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= min_score),
+            key=lambda item: (-item[1], SOURCE_PRIORITY.get(self.entries[item[0]][3], 9), item[0]),
+        )
+        return [
+            dict(zip(("name", "lat", "lon", "source"), self.entries[entry_id]), score=round(score, 3))
+            for entry_id, score in ranked[:limit]
+        ]
+
+    def geocode(self, query, min_score=DEFAULT_MIN_SCORE):
+        """(lat, lon) of the best match scoring at least min_score, or None."""
+        matches = self.lookup(query, limit=1, min_score=min_score)
+        return (matches[0]["lat"], matches[0]["lon"]) if matches else None
+
+
+_default_geocoder = None
+_default_lock = threading.Lock()
+
+
+def get_local_geocoder():
+    """Process-wide geocoder over CHANDIGARH_LOCATIONS and the osmnx cache, built on first use."""
+    global _default_geocoder
+    with _default_lock:
+        if _default_geocoder is None:
+            geocoder = LocalGeocoder()
+            geocoder.add_locations()
+            geocoder.add_cache_folder()
+            _default_geocoder = geocoder
+    return _default_geocoder
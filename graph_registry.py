@@ -0,0 +1,186 @@
+# graph_registry.py
+"""
+Process-wide cache of road graphs and the indexes built on them.
+
+Streamlit runs every browser session in the same Python process, so graphs
+kept here are loaded once and shared by all sessions instead of being
+copied into each st.session_state. Entries are made read-only on insert
+and evicted least-recently-used first once the memory budget is exceeded.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024  # bytes
+
+# Rough per-element footprint of a NetworkX MultiDiGraph with osmnx
+# attributes (dicts for adjacency plus attribute dicts per node/edge)
+_NX_BYTES_PER_NODE = 600
+_NX_BYTES_PER_EDGE = 1500
+
+
+def estimate_nbytes(value):
+    """Approximate memory held by a registry entry, in bytes."""
+    if isinstance(value, nx.Graph):
+        return value.number_of_nodes() * _NX_BYTES_PER_NODE + value.number_of_edges() * _NX_BYTES_PER_EDGE
+    nbytes = getattr(value, "nbytes", None)
+    if callable(nbytes):
+        return int(nbytes())
+    if nbytes is not None:
+        return int(nbytes)
+    arrays = [a for a in vars(value).values() if isinstance(a, np.ndarray)] if hasattr(value, "__dict__") else []
+    return sum(a.nbytes for a in arrays)
+
+
+def make_read_only(value):
+    """Freeze NetworkX graphs and lock NumPy buffers so shared entries cannot be mutated."""
+    if isinstance(value, nx.Graph):
+        return nx.freeze(value)
+    if hasattr(value, "__dict__"):
+        for attr in vars(value).values():
+            arrays = attr if isinstance(attr, tuple) else (attr,)
+            for array in arrays:
+                if isinstance(array, np.ndarray) and array.flags.writeable:
+                    array.flags.writeable = False
+    return value
+
+
+class GraphRegistry:
+    """
+    Thread-safe LRU cache keyed by region parameters.
+
+    get(key, loader) returns the cached value or calls loader() exactly once
+    per key even when several sessions miss at the same time.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BUDGET):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock held while that key is being loaded
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time_s = 0.0
+
+    def get(self, key, loader, nbytes=None):
+        """
+        Return the value for key, loading it with loader() on a miss.
+
+        Args:
+            key: Hashable region parameters, e.g. ("drive", center, dist)
+            loader: Zero-argument callable that builds the value
+            nbytes: Size of the value if known; estimated otherwise
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another session may have finished loading while we waited
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+
+            start_time = time.perf_counter()
+            try:
+                value = make_read_only(loader())
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            elapsed = time.perf_counter() - start_time
+
+            # Insert before dropping the key lock, so a session arriving now finds the entry
+            with self._lock:
+                self.load_time_s += elapsed
+                size = estimate_nbytes(value) if nbytes is None else nbytes
+                self._entries[key] = (value, size)
+                self._evict(keep=key)
+                self._loading.pop(key, None)
+            return value
+
+    def _evict(self, keep):
+        """Drop least-recently-used entries until the budget is met (caller holds the lock)."""
+        total = sum(size for _, size in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._entries.pop(key)[1]
+            self.evictions += 1
+
+    def invalidate(self, key):
+        """Remove one entry; the next get() reloads it."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def peek(self, key):
+        """Return the cached value for key without loading it or touching the counters, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key, value, nbytes=None):
+        """Insert or replace the value for key, e.g. one derived from an older entry."""
+        value = make_read_only(value)
+        with self._lock:
+            size = estimate_nbytes(value) if nbytes is None else nbytes
+            self._entries[key] = (value, size)
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+        return value
+
+    def replace_value(self, old, new):
+        """Point every entry holding old (by identity) at new instead; returns the count."""
+        new = make_read_only(new)
+        with self._lock:
+            keys = [k for k, (value, _) in self._entries.items() if value is old]
+            for key in keys:
+                self._entries[key] = (new, self._entries[key][1])
+            return len(keys)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.load_time_s = 0.0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def stats(self):
+        """
+        Cache counters.
+
+        Returns:
+            dict with hits, misses, hit_ratio, evictions, load_time_s,
+            entries and resident_bytes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "load_time_s": self.load_time_s,
+                "entries": len(self._entries),
+                "resident_bytes": sum(size for _, size in self._entries.values()),
+            }
+
+
+# Shared by app.py and route_finder within one process
+graph_registry = GraphRegistry()
@@ -0,0 +1,222 @@
+# graph_snapshot.py
+"""
+Versioned on-disk snapshots of the compact road graph.
+
+A snapshot holds node ids and coordinates, the CSR adjacency, edge
+lengths and (when the source graph has them) curved edge geometry and road
+classes in one binary file. Arrays are memory-mapped with numpy.memmap, so
+a cold start only opens the file instead of parsing Overpass JSON and
+rebuilding the osmnx graph.
+
+File layout:
+    8 bytes   magic b"CHDGRAPH"
+    4 bytes   format version (little-endian uint32)
+    4 bytes   header length (little-endian uint32)
+    header    UTF-8 JSON: parameters, source fingerprint, array table
+    arrays    raw little-endian buffers, each aligned to 64 bytes
+"""
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from dijkstra_algorithm import CompactGraph, get_compact_graph
+from overpass_ingest import ingest_cached_overpass
+
+SNAPSHOT_MAGIC = b"CHDGRAPH"
+SNAPSHOT_VERSION = 3
+SNAPSHOT_DIR = "snapshots"
+OSMNX_CACHE_DIR = "cache"
+
+_ALIGNMENT = 64
+_ARRAYS = ("node_ids", "xs", "ys", "offsets", "targets", "weights")
+# Written only when the graph carries edge geometry or road classes
+_OPTIONAL_ARRAYS = ("geometry_offsets", "geometry_xy", "road_classes")
+
+
+def snapshot_key(center, dist, network_type="drive", simplify=True):
+    """Stable key for the parameters passed to ox.graph_from_point."""
+    params = json.dumps(
+        [round(center[0], 6), round(center[1], 6), dist, network_type, bool(simplify)]
+    )
+    return hashlib.sha1(params.encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_path(center, dist, network_type="drive", simplify=True, snapshot_dir=SNAPSHOT_DIR):
+    """Path of the snapshot file for these graph parameters."""
+    key = snapshot_key(center, dist, network_type, simplify)
+    return os.path.join(snapshot_dir, f"graph_{key}.bin")
+
+
+def cache_fingerprint(cache_folder=OSMNX_CACHE_DIR):
+    """
+    Size and modification time of every osmnx cache response.
+
+    A snapshot records this when it is written; it is stale once any of the
+    recorded files changes or disappears.
+    """
+    fingerprint = {}
+    if not os.path.isdir(cache_folder):
+        return fingerprint
+    for name in sorted(os.listdir(cache_folder)):
+        path = os.path.join(cache_folder, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            fingerprint[name] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def write_snapshot(G, path, params=None, sources=None):
+    """
+    Write the compact form of G to path.
+
+    Args:
+        G: NetworkX graph or CompactGraph (node ids must be integers)
+        path: Destination file; written atomically via a temporary file
+        params: Graph parameters stored for reference
+        sources: cache_fingerprint() of the data the graph was built from
+    """
+    graph = get_compact_graph(G)
+    if graph.node_ids.dtype == object:
+        raise ValueError("Snapshots require integer node ids")
+
+    arrays = {
+        "node_ids": graph.node_ids.astype("<i8"),
+        "xs": graph.xs.astype("<f8"),
+        "ys": graph.ys.astype("<f8"),
+        "offsets": graph.offsets.astype("<i8"),
+        "targets": graph.targets.astype("<i4"),
+        "weights": graph.weights.astype("<f8"),
+    }
+    if graph.geometry_offsets is not None:
+        arrays["geometry_offsets"] = graph.geometry_offsets.astype("<i8")
+        arrays["geometry_xy"] = graph.geometry_xy.astype("<f8").ravel()
+    if graph.road_classes is not None:
+        arrays["road_classes"] = graph.road_classes.astype("u1")
+    table = {}
+    position = 0
+    for name in arrays:
+        position = -(-position // _ALIGNMENT) * _ALIGNMENT
+        table[name] = {"dtype": arrays[name].dtype.str, "length": len(arrays[name]), "offset": position}
+        position += arrays[name].nbytes
+
+    header = json.dumps({
+        "params": params or {},
+        "sources": sources or {},
+        "crs": str(graph.crs) if graph.crs is not None else None,
+        "graph_version": graph.version,
+        "arrays": table,
+    }).encode("utf-8")
+    data_start = -(-(16 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack("<II", SNAPSHOT_VERSION, len(header)) + header)
+        for name in arrays:
+            f.seek(data_start + table[name]["offset"])
+            f.write(arrays[name].tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_header(path):
+    """
+    Read and validate the header of a snapshot file.
+
+    Returns:
+        (header dict, byte offset where the array data starts)
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(16)
+        if len(prefix) < 16 or prefix[:8] != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a graph snapshot: {path}")
+        version, header_len = struct.unpack("<II", prefix[8:])
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version} in {path}")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    data_start = -(-(16 + header_len) // _ALIGNMENT) * _ALIGNMENT
+    return header, data_start
+
+
+def read_snapshot(path):
+    """
+    Memory-map a snapshot file.
+
+    Returns:
+        (CompactGraph backed by read-only memmaps, header dict)
+    """
+    header, data_start = read_snapshot_header(path)
+    arrays = {}
+    for name in _ARRAYS + _OPTIONAL_ARRAYS:
+        if name in _OPTIONAL_ARRAYS and name not in header["arrays"]:
+            arrays[name] = None
+            continue
+        entry = header["arrays"][name]
+        if entry["length"] == 0:
+            arrays[name] = np.zeros(0, dtype=entry["dtype"])
+            continue
+        arrays[name] = np.memmap(
+            path,
+            dtype=np.dtype(entry["dtype"]),
+            mode="r",
+            offset=data_start + entry["offset"],
+            shape=(entry["length"],),
+        )
+    graph = CompactGraph(
+        arrays["node_ids"],
+        arrays["offsets"],
+        arrays["targets"],
+        arrays["weights"],
+        xs=arrays["xs"],
+        ys=arrays["ys"],
+        crs=header["crs"],
+        version=header["graph_version"],
+        geometry_offsets=arrays["geometry_offsets"],
+        geometry_xy=arrays["geometry_xy"].reshape(-1, 2) if arrays["geometry_xy"] is not None else None,
+        road_classes=arrays["road_classes"],
+    )
+    return graph, header
+
+
+def snapshot_is_current(header, cache_folder=OSMNX_CACHE_DIR):
+    """True if none of the cache files the snapshot was built from has changed."""
+    current = cache_fingerprint(cache_folder)
+    return all(current.get(name) == list(stat) for name, stat in header.get("sources", {}).items())
+
+
+def load_graph_snapshot(center, dist, network_type="drive", simplify=True,
+                        snapshot_dir=SNAPSHOT_DIR, cache_folder=OSMNX_CACHE_DIR):
+    """
+    Return the CompactGraph for these parameters, from a snapshot if possible.
+
+    When the file is missing, unreadable or stale, the graph is rebuilt by
+    streaming the cached Overpass responses (see overpass_ingest.py), or
+    with ox.graph_from_point when the cache does not cover the area, and a
+    fresh snapshot is written.
+
+    Returns:
+        CompactGraph
+    """
+    path = snapshot_path(center, dist, network_type, simplify, snapshot_dir)
+    if os.path.exists(path):
+        try:
+            graph, header = read_snapshot(path)
+            if snapshot_is_current(header, cache_folder):
+                return graph
+        except (ValueError, KeyError, OSError):
+            pass  # corrupt or old-format snapshot; rebuild it below
+
+    G = ingest_cached_overpass(center, dist, network_type=network_type, simplify=simplify,
+                               cache_folder=cache_folder)
+    if G is None:
+        import osmnx as ox
+
+        G = ox.graph_from_point(center, dist=dist, network_type=network_type, simplify=simplify)
+        if len(G.edges) == 0:
+            raise ValueError(f"No road network found around {center} with network type '{network_type}'")
+    params = {"center": list(center), "dist": dist, "network_type": network_type, "simplify": simplify}
+    write_snapshot(G, path, params=params, sources=cache_fingerprint(cache_folder))
+    graph, _ = read_snapshot(path)
+    return graph
@@ -0,0 +1,215 @@
+# graph_updates.py
+"""
+Incremental edge-weight updates for road closures and live speed feeds.
+
+Updates are copy-on-write: apply_edge_updates builds a new weights array,
+wraps it in a CompactGraph that shares every other buffer with the old
+one, and swaps that graph in wherever the old one was published (the
+graph_registry and the NetworkX -> CompactGraph cache). Searches already
+running keep the graph object they started with, so every query sees one
+consistent set of weights, and a batch of updates costs O(edges) NumPy
+work instead of a reload through osmnx.
+
+Derived data keyed by the graph version is carried over selectively:
+cached routes that cannot have changed are re-keyed to the new version,
+location matrices only recompute rows the change can affect, and speed
+profiles are reused as-is, as are ALT landmarks as long as no weight drops
+below its value when they were built. Contraction hierarchies depend on
+every weight: a saved one no longer matches() the updated graph and has to
+be rebuilt with contraction_hierarchy.py.
+"""
+import math
+import threading
+import weakref
+
+import numpy as np
+
+from dijkstra_algorithm import get_compact_graph, set_compact_graph, straight_line_between
+from graph_registry import graph_registry
+from location_matrix import update_location_matrix
+from network_profiles import publish_profile_graph
+from route_finder import route_cache
+from snapping import share_snap_index
+from travel_time import SpeedProfiles
+
+# Updated graph -> weights of the graph originally loaded, for reopen
+_original_weights = weakref.WeakKeyDictionary()
+# Updated graph -> whether its original weights are lengths (see _weights_are_lengths)
+_length_weights = weakref.WeakKeyDictionary()
+_update_lock = threading.Lock()
+
+
+def edge_positions(graph, us, vs):
+    """
+    CSR positions of the edges us[i] -> vs[i] (original node ids).
+
+    Raises:
+        ValueError: if a node or an edge does not exist
+    """
+    tails = np.fromiter((graph.index_of(u) for u in us), dtype=np.int64)
+    heads = np.fromiter((graph.index_of(v) for v in vs), dtype=np.int64)
+    positions = graph.find_edges(tails, heads)
+    missing = np.flatnonzero(positions < 0)
+    if len(missing):
+        raise ValueError(f"No edge from {us[missing[0]]} to {vs[missing[0]]}")
+    return positions
+
+
+def _collect(graph, original, weights, closed, reopened):
+    """Turn the three update kinds into (positions, new weights) arrays; later entries win."""
+    us, vs, values = [], [], []
+    items = weights.items() if isinstance(weights, dict) else ((edge[:2], edge[2]) for edge in weights or ())
+    for (u, v), w in items:
+        if w is None or w < 0 or (isinstance(w, float) and math.isnan(w)):
+            raise ValueError(f"Weight for ({u}, {v}) must be a non-negative number, got {w}")
+        us.append(u)
+        vs.append(v)
+        values.append(float(w))
+    for u, v in closed:
+        us.append(u)
+        vs.append(v)
+        values.append(math.inf)
+    reopen_from = len(us)
+    for u, v in reopened:
+        us.append(u)
+        vs.append(v)
+        values.append(0.0)
+
+    positions = edge_positions(graph, us, vs)
+    new_weights = np.asarray(values, dtype=np.float64)
+    new_weights[reopen_from:] = original[positions[reopen_from:]]
+    # Keep the last update per edge
+    _, last = np.unique(positions[::-1], return_index=True)
+    keep = len(positions) - 1 - last
+    return positions[keep], new_weights[keep]
+
+
+def _weights_are_lengths(graph, weights):
+    """
+    Whether no edge weighs less than its straight-line length.
+
+    That holds for length weights and is what lets the straight-line
+    bounds below (and A*) be used; travel times or other costs break it.
+    """
+    tails = np.repeat(np.arange(graph.num_nodes), np.diff(graph.offsets))
+    return bool((weights >= straight_line_between(graph, tails, graph.targets)).all())
+
+
+def _route_still_valid(graph, heavier_edges, lighter, changed, straight_line=True):
+    """
+    Build keep(key, value) for RouteCache.migrate.
+
+    A cached route stays optimal unless it uses an edge that got heavier,
+    or some edge that got lighter could beat it: lower bound(start -> tail)
+    + new weight + lower bound(head -> end) below the cached distance. The
+    lower bounds are straight-line lengths, or 0 if straight_line is False.
+    """
+    tails, heads, new_weights = changed
+    light_tails, light_heads, light_weights = tails[lighter], heads[lighter], new_weights[lighter]
+
+    def keep(key, value):
+        path = value["path"]
+        if path is None:
+            # Unreachable stays unreachable unless something got lighter
+            return not len(light_tails)
+        if any(edge in heavier_edges for edge in zip(path[:-1], path[1:])):
+            return False
+        if not len(light_tails):
+            return True
+        bound = light_weights
+        if straight_line:
+            start, end = graph.index_of(key[1]), graph.index_of(key[2])
+            bound = (straight_line_between(graph, start, light_tails) + light_weights
+                     + straight_line_between(graph, light_heads, end))
+        return bool(bound.min() >= value["distance_m"])
+
+    return keep
+
+
+def apply_edge_updates(G, weights=None, closed=(), reopened=(), weight="length", cache=None):
+    """
+    Patch edge weights of G's compact graph in one batch.
+
+    Args:
+        G: NetworkX graph or CompactGraph currently in use
+        weights: dict of (u, v) -> new weight, or iterable of (u, v, weight);
+            on a graph weighted by length, weights may not drop below the
+            straight-line length of the edge, which the A* heuristics rely on
+        closed: iterable of (u, v) edges to disable (weight becomes inf)
+        reopened: iterable of (u, v) edges restored to their weight at load time
+        weight: Weight attribute of the compact graph being patched
+        cache: RouteCache to migrate (default: the process-wide route_cache)
+
+    Returns:
+        dict with graph (the new CompactGraph, already published to the
+        graph_registry and, for a profile graph, its MultiProfileGraph), version,
+        changed_edges, routes_kept, routes_dropped and matrix_rows_recomputed.
+        Callers holding a CompactGraph G directly should switch to graph.
+    """
+    cache = route_cache if cache is None else cache
+    with _update_lock:
+        old = get_compact_graph(G, weight=weight)
+        original = _original_weights.get(old, old.weights)
+        lengths = _length_weights.get(old)
+        if lengths is None:
+            lengths = _weights_are_lengths(old, original)
+        positions, new_values = _collect(old, original, weights, closed, reopened)
+        changed = new_values != old.weights[positions]
+        positions, new_values = positions[changed], new_values[changed]
+
+        report = {"graph": old, "version": old.version, "changed_edges": 0,
+                  "routes_kept": 0, "routes_dropped": 0, "matrix_rows_recomputed": 0}
+        if not len(positions):
+            return report
+
+        tails = np.searchsorted(old.offsets, positions, side="right") - 1
+        heads = old.targets[positions].astype(np.int64)
+        # A* and the bounds used below need every length to stay >= the straight-line length;
+        # other weights (e.g. travel times) never had that bound to keep
+        if lengths:
+            too_light = new_values < straight_line_between(old, tails, heads)
+            if too_light.any():
+                i = int(np.flatnonzero(too_light)[0])
+                raise ValueError(f"Weight {new_values[i]} for ({old.ids[tails[i]]}, {old.ids[heads[i]]}) "
+                                 f"is below the straight-line length of the edge")
+
+        old_values = old.weights[positions]
+        new_weights = np.array(old.weights, dtype=np.float64)
+        new_weights[positions] = new_values
+        graph = old.with_weights(new_weights)
+        _original_weights[graph] = original
+        _length_weights[graph] = lengths
+
+        # Derived data first, so readers that pick up the new graph find it warm
+        share_snap_index(old, graph)
+        heavier = new_values > old_values
+        ids = old.ids
+        heavier_edges = {(ids[t], ids[h]) for t, h in zip(tails[heavier].tolist(), heads[heavier].tolist())}
+        keep = _route_still_valid(graph, heavier_edges, new_values < old_values, (tails, heads, new_values),
+                                  straight_line=lengths)
+        kept, dropped = cache.migrate(old.version, graph.version, keep)
+
+        rows = 0
+        matrix = graph_registry.peek(("location_matrix", old.version))
+        # Undoing an update returns to an earlier version whose matrix may still be cached
+        if matrix is not None and ("location_matrix", graph.version) not in graph_registry:
+            updated, rows = update_location_matrix(matrix, graph, positions, old_values, straight_line=lengths)
+            graph_registry.put(("location_matrix", graph.version), updated)
+        profiles = graph_registry.peek(("speed_profiles", old.version))
+        if profiles is not None:
+            graph_registry.put(("speed_profiles", graph.version), SpeedProfiles(graph, profiles.speeds))
+        landmarks = graph_registry.peek(("landmarks", old.version))
+        # Every other weight is unchanged, so only the patched edges can break the bounds
+        if landmarks is not None and not (new_values < landmarks.base_weights[positions]).any():
+            graph_registry.put(("landmarks", graph.version), landmarks)
+
+        # Publish: new lookups get the updated graph, running searches keep theirs
+        graph_registry.replace_value(old, graph)
+        publish_profile_graph(old, graph)
+        if G is not old:
+            set_compact_graph(G, graph, weight=weight)
+
+        report.update(graph=graph, version=graph.version, changed_edges=len(positions),
+                      routes_kept=kept, routes_dropped=dropped, matrix_rows_recomputed=rows)
+        return report
+
@@ -0,0 +1,210 @@
+# isochrones.py
+"""
+Reachability overlays: everything within a distance or drive time of a start.
+
+One bounded search up to the largest threshold gives every reached node
+and its cost; each band (e.g. 5 / 10 / 15 minutes) is then a NumPy
+threshold over those costs, including the part of an edge that can be
+driven before the budget runs out. Bands become polygons by buffering the
+reached road segments with shapely and simplifying the outline, in a
+local metric projection, before converting back to (lat, lon) for folium.
+
+Searches are kept in the graph_registry, so moving a slider to a smaller
+threshold (or redrawing at the same one) does not search again.
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+from shapely.ops import transform
+
+from dijkstra_algorithm import EARTH_RADIUS_M, _bounded_search, get_compact_graph, is_geographic
+from graph_registry import graph_registry
+from travel_time import SLOT_SECONDS, SLOTS_PER_DAY, get_speed_profiles, seconds_since_midnight
+
+ISOCHRONE_MODES = {"distance": "meters", "time": "seconds"}
+
+# Half-width of the corridor drawn around reached roads, and outline simplification
+DEFAULT_BUFFER_M = 80
+DEFAULT_TOLERANCE_M = 30
+
+
+class Reachability:
+    """
+    Costs from one source to every node within limit.
+
+    costs[i] is the cost to dense node i (inf beyond limit); edge_costs is
+    the per-edge cost in CSR order used by the search.
+    """
+
+    def __init__(self, graph, source, limit, costs, edge_costs, mode):
+        self.graph = graph
+        self.source = source
+        self.limit = limit
+        self.costs = costs
+        self.edge_costs = edge_costs
+        self.mode = mode
+
+    def nbytes(self):
+        return self.costs.nbytes
+
+    def _check(self, limit):
+        if limit > self.limit:
+            raise ValueError(f"Limit {limit} exceeds the searched limit {self.limit}")
+
+    def nodes(self, limit):
+        """Original ids of the nodes reachable within limit."""
+        self._check(limit)
+        return self.graph.node_ids[self.costs <= limit]
+
+    def edges(self, limit):
+        """
+        Edges reachable within limit.
+
+        Returns:
+            (tails, heads, fractions): dense indices and the share of each
+            edge, from its tail, that can be covered (1.0 = the whole edge)
+        """
+        self._check(limit)
+        graph = self.graph
+        sources = np.repeat(np.arange(graph.num_nodes), np.diff(graph.offsets))
+        tail_costs = self.costs[sources]
+        entered = np.flatnonzero(tail_costs <= limit)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fractions = (limit - tail_costs[entered]) / self.edge_costs[entered]
+        fractions = np.clip(np.nan_to_num(fractions, nan=1.0), 0.0, 1.0)
+        keep = fractions > 0
+        return sources[entered][keep], graph.targets[entered][keep].astype(np.int64), fractions[keep]
+
+
+def _edge_costs(graph, mode, depart_at, G):
+    """
+    Per-edge costs for a mode.
+
+    Returns:
+        (cost array, cost list for the search or None for the graph weights,
+        departure slot or None)
+    """
+    if mode == "distance":
+        return graph.weights, None, None
+    depart_s = seconds_since_midnight(datetime.now() if depart_at is None else depart_at)
+    slot = int(depart_s // SLOT_SECONDS) % SLOTS_PER_DAY
+    # Drive times at the speeds of the departure slot; isochrone horizons are short
+    costs = get_speed_profiles(G).slot_costs(slot)
+    return np.asarray(costs), costs, slot
+
+
+def reachable(G, start, limit, mode="distance", depart_at=None):
+    """
+    Everything reachable from start within limit.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        start: Original node id
+        limit: Meters for mode "distance", seconds for mode "time"
+        mode: One of ISOCHRONE_MODES
+        depart_at: Departure for mode "time" (seconds since midnight,
+            datetime.time or datetime; default now)
+
+    Returns:
+        Reachability searched to at least limit
+    """
+    if mode not in ISOCHRONE_MODES:
+        raise ValueError(f"Unknown isochrone mode '{mode}'. Available modes: {list(ISOCHRONE_MODES)}")
+    if not limit >= 0:
+        raise ValueError("Limit must be a non-negative number")
+    graph = get_compact_graph(G)
+    source = graph.index_of(start)
+    edge_costs, cost_list, slot = _edge_costs(graph, mode, depart_at, G)
+    key = ("reachability", graph.version, start, mode, slot)
+
+    cached = graph_registry.peek(key)
+    if cached is not None and cached.limit >= limit:
+        return cached
+    nodes, costs = _bounded_search(graph, source, limit, weights=cost_list)
+    all_costs = np.full(graph.num_nodes, np.inf)
+    all_costs[nodes] = costs
+    return graph_registry.put(key, Reachability(graph, source, limit, all_costs, edge_costs, mode))
+
+
+def _to_local(graph, origin):
+    """(forward, inverse) coordinate transforms between (x, y) of graph and meters."""
+    if not is_geographic(graph):
+        return (lambda x, y: (x, y)), (lambda x, y: (x, y))
+    lon0, lat0 = origin
+    mx = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(lat0))
+    my = math.radians(1) * EARTH_RADIUS_M
+    forward = lambda x, y: ((np.asarray(x) - lon0) * mx, (np.asarray(y) - lat0) * my)
+    inverse = lambda x, y: (np.asarray(x) / mx + lon0, np.asarray(y) / my + lat0)
+    return forward, inverse
+
+
+def _latlon_transform(graph):
+    """Callable mapping graph (x, y) arrays to (lon, lat)."""
+    if is_geographic(graph):
+        return lambda x, y: (x, y)
+    from pyproj import Transformer  # installed with osmnx; only needed for projected graphs
+    return Transformer.from_crs(graph.crs, "EPSG:4326", always_xy=True).transform
+
+
+def band_polygons(reach, limit, buffer_m=DEFAULT_BUFFER_M, tolerance_m=DEFAULT_TOLERANCE_M):
+    """
+    Outline of the area reachable within limit.
+
+    Returns:
+        list of polygons, each a list of rings of (lat, lon) tuples (outer
+        ring first, then holes), ready for folium.Polygon(locations=...)
+    """
+    graph = reach.graph
+    tails, heads, fractions = reach.edges(limit)
+    if not len(tails):
+        return []
+    forward, inverse = _to_local(graph, (graph.xs[reach.source], graph.ys[reach.source]))
+    x0, y0 = forward(graph.xs[tails], graph.ys[tails])
+    x1, y1 = forward(graph.xs[heads], graph.ys[heads])
+    # Partially reachable edges end where the budget runs out
+    x1 = x0 + (x1 - x0) * fractions
+    y1 = y0 + (y1 - y0) * fractions
+    segments = np.stack([np.column_stack([x0, y0]), np.column_stack([x1, y1])], axis=1)
+    segments = segments[np.isfinite(segments).all(axis=(1, 2))]
+
+    # Buffering segments one by one and merging is far faster than buffering one MultiLineString
+    area = shapely.union_all(shapely.buffer(shapely.linestrings(segments), buffer_m, quad_segs=2))
+    area = area.simplify(tolerance_m)
+    to_latlon = _latlon_transform(graph)
+    area = transform(lambda x, y: to_latlon(*inverse(x, y)), area)
+
+    polygons = [part for part in getattr(area, "geoms", [area]) if isinstance(part, Polygon) and not part.is_empty]
+    return [
+        [[(lat, lon) for lon, lat in ring.coords] for ring in (polygon.exterior, *polygon.interiors)]
+        for polygon in polygons
+    ]
+
+
+def isochrones(G, start, limits, mode="distance", depart_at=None,
+               buffer_m=DEFAULT_BUFFER_M, tolerance_m=DEFAULT_TOLERANCE_M):
+    """
+    Several reachability bands from one search.
+
+    Args:
+        limits: Thresholds in meters ("distance") or seconds ("time")
+
+    Returns:
+        list of dicts with limit, nodes (original ids), num_edges and
+        polygons (see band_polygons), ordered by increasing limit
+    """
+    limits = sorted(limits)
+    if not limits:
+        return []
+    reach = reachable(G, start, limits[-1], mode=mode, depart_at=depart_at)
+    bands = []
+    for limit in limits:
+        bands.append({
+            "limit": limit,
+            "nodes": reach.nodes(limit),
+            "num_edges": len(reach.edges(limit)[0]),
+            "polygons": band_polygons(reach, limit, buffer_m=buffer_m, tolerance_m=tolerance_m),
+        })
+    return bands
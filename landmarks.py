@@ -0,0 +1,260 @@
+# landmarks.py
+"""
+ALT routing: A* with Landmarks and the Triangle inequality.
+
+A handful of landmark nodes is chosen once, and the road distance from
+every landmark to every node and from every node to every landmark is
+stored as float32 (k, n) matrices. By the triangle inequality,
+
+    d(v, t) >= d(v, L) - d(t, L)   and   d(v, t) >= d(L, t) - d(L, v)
+
+so the best of these over a few landmarks is an A* heuristic that is far
+tighter than the straight line, and queries settle a fraction of the
+nodes plain Dijkstra does.
+
+The bounds were computed with the weights at build time, and raising a
+weight can only lengthen real distances, so they stay admissible when
+roads are closed or slowed down. Unlike contraction hierarchies the
+landmarks therefore survive apply_edge_updates; only a weight dropping
+below its build-time value needs a rebuild.
+
+Preprocessing is 2k one-to-all searches with scipy's csgraph Dijkstra
+and takes well under a second on the Chandigarh graph, so landmarks are
+built on first use and kept in the graph_registry.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from dijkstra_algorithm import _astar_search, get_compact_graph, straight_line_distances
+from graph_registry import graph_registry
+
+DEFAULT_NUM_LANDMARKS = 16
+# Landmarks consulted per query: the ones giving the best bound at the source
+ACTIVE_LANDMARKS = 4
+LANDMARK_METHODS = ("avoid", "farthest")
+
+
+def _csr(graph, reverse=False):
+    """scipy CSR matrix of the finite-weight edges (transposed for reverse)."""
+    n = graph.num_nodes
+    finite = np.isfinite(graph.weights)
+    sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.offsets))[finite]
+    targets = graph.targets[finite].astype(np.int64)
+    if reverse:
+        sources, targets = targets, sources
+    return csr_matrix((graph.weights[finite], (sources, targets)), shape=(n, n))
+
+
+def _lower_bounds(from_landmark, to_landmark, source, targets):
+    """Best triangle bound on d(source, targets) over the given landmark rows (float64)."""
+    with np.errstate(invalid="ignore"):
+        forward = to_landmark[:, [source]] - to_landmark[:, targets]
+        backward = from_landmark[:, targets] - from_landmark[:, [source]]
+        bounds = np.fmax(forward, backward).astype(np.float64)
+    # inf - inf: the landmark says nothing about this pair
+    return np.nan_to_num(bounds, nan=0.0, posinf=np.inf, neginf=0.0).max(axis=0, initial=0.0)
+
+
+def _farthest(csr, candidates, from_landmark, to_landmark, chosen, rng):
+    """The candidate farthest (both directions) from every landmark chosen so far."""
+    if not chosen:
+        # The first one is the candidate farthest from a random root
+        distances = dijkstra(csr, indices=int(rng.choice(candidates)))[candidates]
+        return int(candidates[np.argmax(np.where(np.isfinite(distances), distances, -1))])
+    rows = from_landmark[:len(chosen), candidates] + to_landmark[:len(chosen), candidates]
+    return int(candidates[np.argmax(rows.min(axis=0))])
+
+
+def _avoid(csr, candidates, in_candidates, from_landmark, to_landmark, chosen, rng):
+    """
+    Goldberg and Harrelson's avoid selection.
+
+    Grows a shortest-path tree from a random root and weighs every node by
+    how much the current landmarks underestimate its distance from the
+    root. The new landmark is a leaf of the heaviest subtree that holds no
+    landmark yet, i.e. one in the region the current set covers worst.
+    """
+    root = int(rng.choice(candidates))
+    distances, predecessors = dijkstra(csr, indices=root, return_predecessors=True)
+    reached = np.flatnonzero(np.isfinite(distances))
+    gaps = np.zeros(len(distances))
+    gaps[reached] = distances[reached]
+    if chosen:
+        k = len(chosen)
+        gaps[reached] -= _lower_bounds(from_landmark[:k], to_landmark[:k], root, reached)
+    gaps[~in_candidates] = 0.0
+
+    parents = predecessors.tolist()
+    children = [[] for _ in range(len(distances))]
+    for v in reached.tolist():
+        if parents[v] >= 0:
+            children[parents[v]].append(v)
+    order = [root]
+    for v in order:
+        order.extend(children[v])
+
+    # Subtree sums, children before parents; subtrees holding a landmark count as 0
+    sizes = gaps.tolist()
+    blocked = [False] * len(distances)
+    for landmark in chosen:
+        blocked[landmark] = True
+    for v in reversed(order):
+        if blocked[v]:
+            sizes[v] = 0.0
+        p = parents[v]
+        if p >= 0:
+            if blocked[v]:
+                blocked[p] = True
+            else:
+                sizes[p] += sizes[v]
+
+    node = max(order, key=lambda v: sizes[v])
+    if sizes[node] <= 0:
+        return _farthest(csr, candidates, from_landmark, to_landmark, chosen, rng)
+    while True:
+        heaviest = max(children[node], key=lambda v: sizes[v], default=None)
+        if heaviest is None or sizes[heaviest] <= 0:
+            return node
+        node = heaviest
+
+
+class Landmarks:
+    """
+    Landmark distance tables for one road graph.
+
+    from_landmark[i, v] is the road distance from landmark i to dense node
+    v and to_landmark[i, v] the distance from v to landmark i (inf when
+    unreachable). base_weights are the edge weights the tables were
+    computed with; they stay valid for any graph with the same topology
+    whose weights are no lower.
+    """
+
+    def __init__(self, node_ids, landmarks, from_landmark, to_landmark, base_weights, method):
+        self.node_ids = node_ids
+        self.landmarks = landmarks
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+        self.base_weights = base_weights
+        self.method = method
+        finite = np.concatenate([from_landmark[np.isfinite(from_landmark)],
+                                 to_landmark[np.isfinite(to_landmark)]])
+        # float32 rounding of two table entries, taken off every bound to keep it admissible
+        self.slack = 2 * float(np.finfo(np.float32).eps) * (float(finite.max()) if len(finite) else 0.0)
+
+    @property
+    def num_landmarks(self):
+        return len(self.landmarks)
+
+    def nbytes(self):
+        """Memory of the distance tables (base_weights is shared with the graph)."""
+        return self.landmarks.nbytes + self.from_landmark.nbytes + self.to_landmark.nbytes
+
+    def matches(self, G):
+        """True if the tables give admissible bounds on G: same nodes and edges, no weight lowered."""
+        graph = get_compact_graph(G)
+        return (graph.num_nodes == len(self.node_ids)
+                and graph.num_edges == len(self.base_weights)
+                and np.array_equal(graph.node_ids, self.node_ids)
+                and bool(np.all(graph.weights >= self.base_weights)))
+
+    def bounds(self, source, target):
+        """
+        Lower bounds on the distance from every node to target, as float64.
+
+        Uses the ACTIVE_LANDMARKS landmarks with the best bound for
+        source -> target.
+        """
+        with np.errstate(invalid="ignore"):
+            at_source = np.fmax(self.to_landmark[:, source] - self.to_landmark[:, target],
+                                self.from_landmark[:, target] - self.from_landmark[:, source])
+        active = np.argsort(-np.nan_to_num(at_source, nan=0.0, posinf=np.inf))[:ACTIVE_LANDMARKS]
+        from_target = self.from_landmark[active][:, [target]]
+        to_target = self.to_landmark[active][:, [target]]
+        with np.errstate(invalid="ignore"):
+            bounds = np.fmax(self.to_landmark[active] - to_target, from_target - self.from_landmark[active])
+        bounds = np.nan_to_num(bounds.astype(np.float64), nan=0.0, posinf=np.inf, neginf=0.0)
+        bounds = np.maximum(bounds.max(axis=0) - self.slack, 0.0)
+        bounds[target] = 0.0
+        return bounds
+
+    def find_route(self, G, start, end):
+        """
+        Shortest route with A* guided by the landmark bounds.
+
+        Args:
+            G: The graph to route on; its weights may be higher than at build time
+
+        Returns:
+            dict with path (None if unreachable), distance_m, settled_nodes, engine
+        """
+        graph = get_compact_graph(G)
+        source, target = graph.index_of(start), graph.index_of(end)
+        if not graph.can_reach(source, target):
+            path, distance, settled = None, float('inf'), 0
+        else:
+            # The straight line is admissible too, and sometimes the tighter of the two
+            h = np.maximum(self.bounds(source, target), straight_line_distances(graph, target))
+            path, distance, settled = _astar_search(graph, source, target, heuristic=h.tolist())
+        return {
+            "path": path,
+            "distance_m": distance,
+            "settled_nodes": settled,
+            "engine": "landmarks",
+        }
+
+
+def build_landmarks(G, k=DEFAULT_NUM_LANDMARKS, method="avoid", seed=0):
+    """
+    Choose k landmarks and compute their distance tables.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        k: Number of landmarks
+        method: "avoid" (landmarks where current bounds are weakest) or
+            "farthest" (each as far as possible from those chosen so far)
+        seed: Seed for the random roots, so builds are reproducible
+
+    Returns:
+        Landmarks
+    """
+    if method not in LANDMARK_METHODS:
+        raise ValueError(f"Unknown landmark selection '{method}'. Available methods: {list(LANDMARK_METHODS)}")
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    graph = get_compact_graph(G)
+    n = graph.num_nodes
+    forward, backward = _csr(graph), _csr(graph, reverse=True)
+    # Landmarks outside the giant component would bound almost nothing
+    in_candidates = graph.connectivity().in_largest(np.arange(n))
+    candidates = np.flatnonzero(in_candidates)
+    k = min(k, len(candidates))
+    rng = np.random.default_rng(seed)
+
+    chosen = []
+    from_landmark = np.empty((k, n), dtype=np.float32)
+    to_landmark = np.empty((k, n), dtype=np.float32)
+    for i in range(k):
+        if method == "avoid":
+            landmark = _avoid(forward, candidates, in_candidates, from_landmark, to_landmark, chosen, rng)
+        else:
+            landmark = _farthest(forward, candidates, from_landmark, to_landmark, chosen, rng)
+        from_landmark[i] = dijkstra(forward, indices=landmark)
+        to_landmark[i] = dijkstra(backward, indices=landmark)
+        chosen.append(landmark)
+        in_candidates[landmark] = False
+        candidates = candidates[candidates != landmark]
+
+    return Landmarks(graph.node_ids, np.asarray(chosen, dtype=np.int64), from_landmark, to_landmark,
+                     graph.weights, method)
+
+
+def get_landmarks(G):
+    """
+    Landmarks for G with the default settings, built on first use.
+
+    Kept in the graph_registry under the graph version; apply_edge_updates
+    carries them over to updated graphs they are still valid for.
+    """
+    graph = get_compact_graph(G)
+    return graph_registry.get(("landmarks", graph.version), lambda: build_landmarks(graph))
@@ -0,0 +1,208 @@
+# location_matrix.py
+"""
+Precomputed routes between all named locations.
+
+One single-source Dijkstra per location (run across a process pool) gives
+the full distance matrix plus a predecessor tree per source, so any pair of
+CHANDIGARH_LOCATIONS is answered with an array lookup instead of a search.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dijkstra_algorithm import _reconstruct_path, _shortest_path_tree, get_compact_graph, straight_line_between
+from graph_registry import graph_registry
+from locations_config import CHANDIGARH_LOCATIONS
+from snapping import snap_named_locations
+
+
+class LocationMatrix:
+    """
+    Distances and shortest-path trees between a fixed set of named locations.
+
+    distances[i, j] is the road distance from names[i] to names[j];
+    predecessors[i] is the int32 predecessor array (dense node indices) of
+    the shortest-path tree rooted at names[i]. After update_location_matrix
+    only the tree paths to the named locations are guaranteed shortest.
+    """
+
+    def __init__(self, graph, names, nodes, distances, predecessors):
+        self.graph = graph
+        self.graph_version = graph.version
+        self.names = names
+        self.nodes = nodes
+        self.distances = distances
+        self.predecessors = predecessors
+        self.position = {name: i for i, name in enumerate(names)}
+
+    def __contains__(self, name):
+        return name in self.position
+
+    def nbytes(self):
+        return self.distances.nbytes + self.predecessors.nbytes
+
+    def _positions(self, start_name, end_name):
+        try:
+            return self.position[start_name], self.position[end_name]
+        except KeyError as e:
+            raise ValueError(f"Location {e} is not in the precomputed matrix")
+
+    def distance(self, start_name, end_name):
+        """Road distance in meters between two named locations (inf if unreachable)."""
+        i, j = self._positions(start_name, end_name)
+        return float(self.distances[i, j])
+
+    def lookup(self, start_name, end_name):
+        """
+        Route between two named locations from the stored trees.
+
+        Returns:
+            dict with path (None if unreachable), distance_m, settled_nodes
+            (always 0) and engine - the same shape as find_route
+        """
+        i, j = self._positions(start_name, end_name)
+        distance = float(self.distances[i, j])
+        path = None
+        if np.isfinite(distance):
+            target = self.graph.index_of(self.nodes[j])
+            path = _reconstruct_path(self.graph.ids, self.predecessors[i].tolist(), target)
+        return {
+            "path": path,
+            "distance_m": distance,
+            "settled_nodes": 0,
+            "engine": "location_matrix",
+        }
+
+
+# Per-process graph for pool workers, set once by _init_worker
+_worker_graph = None
+
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _tree_row(source):
+    distances, predecessors = _shortest_path_tree(_worker_graph, source)
+    return np.asarray(distances, dtype=np.float64), np.asarray(predecessors, dtype=np.int32)
+
+
+def build_location_matrix(G, locations=CHANDIGARH_LOCATIONS, workers=None):
+    """
+    Run one single-source search per location and collect the results.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        locations: dict of name -> (lat, lon)
+        workers: Process count; defaults to one per CPU (capped by the
+            number of locations). 1 runs the searches in this process.
+
+    Returns:
+        LocationMatrix
+    """
+    graph = get_compact_graph(G)
+    snapped = snap_named_locations(graph, locations)
+    names = list(snapped)
+    nodes = [snapped[name] for name in names]
+    sources = [graph.index_of(node) for node in nodes]
+
+    if workers is None:
+        workers = min(len(sources), os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(graph)
+        rows = [_tree_row(source) for source in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graph,)) as pool:
+            rows = list(pool.map(_tree_row, sources))
+
+    predecessors = np.vstack([row[1] for row in rows]) if rows else np.zeros((0, graph.num_nodes), dtype=np.int32)
+    distances = np.empty((len(sources), len(sources)), dtype=np.float64)
+    for i, (row_distances, _) in enumerate(rows):
+        distances[i] = row_distances[sources]
+    return LocationMatrix(graph, names, nodes, distances, predecessors)
+
+
+def get_location_matrix(G, workers=None):
+    """
+    Return the matrix for the named locations on this graph.
+
+    Matrices are kept in the graph_registry under the graph's content
+    version, so a changed snapshot (new version) triggers a rebuild.
+    """
+    graph = get_compact_graph(G)
+    key = ("location_matrix", graph.version)
+    return graph_registry.get(key, lambda: build_location_matrix(graph, workers=workers))
+
+
+def _no_bound(graph, sources, targets):
+    """Zero lower bounds, shaped like straight_line_between(graph, sources, targets)."""
+    return np.zeros(np.broadcast(np.asarray(sources), np.asarray(targets)).shape)
+
+
+def _tree_path_nodes(tree, targets):
+    """Dense indices on the paths of a predecessor tree from its root to targets."""
+    on_path = set()
+    for node in targets.tolist():
+        while node != -1 and node not in on_path:
+            on_path.add(node)
+            node = int(tree[node])
+    return on_path
+
+
+def update_location_matrix(matrix, graph, positions, old_weights, straight_line=True):
+    """
+    Carry a matrix over to graph after the weights at CSR positions changed.
+
+    Only rows that the change can affect are searched again: rows whose
+    paths to the locations use an edge which got heavier, and sources for
+    which a lighter edge could shorten the route to some location (judged
+    by straight-line lower bounds on both sides of the edge). Rows that are
+    kept may hold stale tree branches towards other nodes; only the paths
+    to the locations are guaranteed shortest.
+
+    Args:
+        matrix: LocationMatrix built on the graph before the change
+        graph: CompactGraph after the change (same topology)
+        positions: int array of changed CSR edge positions
+        old_weights: weights at those positions before the change
+        straight_line: False if the weights are not lengths (e.g. travel
+            times), so straight-line distances bound nothing and every
+            row that a lighter edge could improve at all is recomputed
+
+    Returns:
+        (LocationMatrix for graph, number of rows recomputed)
+    """
+    new_weights = graph.weights[positions]
+    tails = np.searchsorted(graph.offsets, positions, side="right") - 1
+    heads = graph.targets[positions].astype(np.int64)
+    sources = np.array([graph.index_of(node) for node in matrix.nodes], dtype=np.int64)
+
+    heavier = new_weights > old_weights
+    heavy_tails, heavy_heads = tails[heavier], heads[heavier]
+    # Cheap filter first: trees that use a heavier edge anywhere
+    affected = (matrix.predecessors[:, heavy_heads] == heavy_tails).any(axis=1)
+    for i in np.flatnonzero(affected):
+        on_path = _tree_path_nodes(matrix.predecessors[i], sources)
+        affected[i] = any(head in on_path and matrix.predecessors[i, head] == tail
+                          for tail, head in zip(heavy_tails.tolist(), heavy_heads.tolist()))
+
+    lighter = new_weights < old_weights
+    if lighter.any():
+        bound = straight_line_between if straight_line else _no_bound
+        # rows x lighter edges: lower bound on s -> tail, then the edge
+        to_tail = bound(graph, sources[:, None], tails[lighter][None, :]) + new_weights[lighter]
+        # lighter edges x locations: lower bound on head -> t
+        from_head = bound(graph, heads[lighter][:, None], sources[None, :])
+        # best possible s -> t through any lighter edge, per row and location
+        through = (to_tail[:, :, None] + from_head[None, :, :]).min(axis=1)
+        affected |= (through < matrix.distances).any(axis=1)
+
+    distances = matrix.distances.copy()
+    predecessors = matrix.predecessors.copy()
+    for i in np.flatnonzero(affected):
+        row_distances, row_predecessors = _shortest_path_tree(graph, int(sources[i]))
+        distances[i] = np.asarray(row_distances)[sources]
+        predecessors[i] = row_predecessors
+    return LocationMatrix(graph, matrix.names, matrix.nodes, distances, predecessors), int(affected.sum())
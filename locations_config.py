@@ -4,6 +4,14 @@ Configuration file for predefined locations in Chandigarh.
 Add or modify locations here with their exact GPS coordinates.
 """
 
+# Road network area loaded by the app: 8km radius around Sector 17
+CHANDIGARH_CENTER = (30.7411, 76.7807)
+CHANDIGARH_RADIUS_M = 8000
+
+# Coverage of the tiled store (tiled_graph.py): Chandigarh, Mohali, Panchkula and Zirakpur
+TRICITY_CENTER = (30.7150, 76.7800)
+TRICITY_RADIUS_M = 15000
+
 # Chandigarh Locations - Only core Chandigarh city area
 CHANDIGARH_LOCATIONS = {
     # Educational Institutions
@@ -0,0 +1,195 @@
+# map_rendering.py
+"""
+Lightweight folium rendering for route results.
+
+Route coordinates come from one vectorized gather over the graph's
+coordinate arrays (following the real edge geometry when the graph has
+it) and are thinned with Douglas-Peucker to what is visible at the zoom
+level the map opens at. The base map with its start/end markers only
+depends on the location pair, so its HTML is rendered once per pair and
+cached; each result just injects its route lines as a few lines of
+Leaflet JavaScript instead of re-serializing a whole folium.Map.
+"""
+import json
+import math
+from functools import lru_cache
+
+import folium
+import numpy as np
+
+from dijkstra_algorithm import EARTH_RADIUS_M, get_compact_graph
+from isochrones import _latlon_transform
+
+# Web Mercator ground resolution at zoom 0 on the equator (meters per pixel)
+METERS_PER_PIXEL_Z0 = 2 * math.pi * 6378137 / 256
+# Largest deviation from the true line, in screen pixels at the opening zoom
+SIMPLIFY_PIXELS = 0.5
+# ~1 m at Chandigarh's latitude; more digits only grow the payload
+COORDINATE_DECIMALS = 5
+
+_ROUTE_LAYERS = "/*__ROUTE_LAYERS__*/"
+
+
+def zoom_for_span(lats, lons):
+    """Opening zoom level that fits the given coordinates: smaller span = more zoom."""
+    span = max(max(lats) - min(lats), max(lons) - min(lons))
+    if span < 0.02:
+        return 14
+    if span < 0.05:
+        return 13
+    if span < 0.1:
+        return 12
+    return 11
+
+
+def meters_per_pixel(zoom, lat):
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def douglas_peucker(xs, ys, tolerance):
+    """
+    Douglas-Peucker line simplification.
+
+    Args:
+        xs, ys: Coordinate arrays in a metric projection
+        tolerance: Largest allowed distance of a dropped point from the
+            simplified line, in the same units
+
+    Returns:
+        bool array marking the points to keep (always the first and last)
+    """
+    n = len(xs)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        dx, dy = xs[j] - xs[i], ys[j] - ys[i]
+        px, py = xs[i + 1:j] - xs[i], ys[i + 1:j] - ys[i]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(px * dy - py * dx) / length
+        k = int(distances.argmax())
+        if distances[k] > tolerance:
+            middle = i + 1 + k
+            keep[middle] = True
+            stack.append((i, middle))
+            stack.append((middle, j))
+    return keep
+
+
+def route_latlons(G, path, zoom=None):
+    """
+    (lats, lons) arrays along a route, simplified for display.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        path: Original node ids
+        zoom: Map zoom the tolerance is chosen for; defaults to the zoom
+            that fits the route
+
+    Returns:
+        (lats, lons) float arrays
+    """
+    graph = get_compact_graph(G)
+    xs, ys = graph.path_coordinates(path)
+    lons, lats = _latlon_transform(graph)(xs, ys)
+    lats, lons = np.asarray(lats), np.asarray(lons)
+    if len(lats) < 3:
+        return lats, lons
+    if zoom is None:
+        zoom = zoom_for_span(lats, lons)
+    mean_lat = float(np.mean(lats))
+    # Equirectangular meters are accurate enough for city-sized routes
+    mx = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(mean_lat))
+    my = math.radians(1) * EARTH_RADIUS_M
+    keep = douglas_peucker(lons * mx, lats * my, SIMPLIFY_PIXELS * meters_per_pixel(zoom, mean_lat))
+    return lats[keep], lons[keep]
+
+
+def _label_html(name, color):
+    return f"""
+        <div style="
+            background-color: white;
+            border: 2px solid {color};
+            border-radius: 8px;
+            padding: 4px 8px;
+            font-weight: bold;
+            font-size: 12px;
+            color: {color};
+            white-space: nowrap;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+        ">
+             {name}
+        </div>
+    """
+
+
+@lru_cache(maxsize=256)
+def base_map_html(start_name, start_latlon, end_name, end_latlon):
+    """
+    Rendered HTML of the map with start/end markers for one location pair.
+
+    Returns:
+        (html containing a placeholder for route layers, Leaflet map variable name)
+    """
+    lats, lons = (start_latlon[0], end_latlon[0]), (start_latlon[1], end_latlon[1])
+    route_map = folium.Map(
+        location=[(min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2],
+        zoom_start=zoom_for_span(lats, lons),
+        tiles='OpenStreetMap'
+    )
+    for latlon, name, kind, color, icon_color, icon in (
+        (start_latlon, start_name, "START", "#28a745", "green", "play"),
+        (end_latlon, end_name, "DESTINATION", "#dc3545", "red", "stop"),
+    ):
+        folium.Marker(
+            latlon,
+            popup=f"<div style='font-size: 14px; font-weight: bold;'>{kind}<br>{name}</div>",
+            tooltip=f"{kind}: {name}",
+            icon=folium.Icon(color=icon_color, icon=icon, prefix='fa')
+        ).add_to(route_map)
+        # Permanent label next to the marker
+        folium.Marker(latlon, icon=folium.DivIcon(html=_label_html(name, color))).add_to(route_map)
+    html = route_map.get_root().render()
+    # Route layers go at the end of the last script, after the map and markers exist
+    end = html.rindex("</script>")
+    return html[:end] + _ROUTE_LAYERS + "\n" + html[end:], route_map.get_name()
+
+
+def _coordinates_js(lats, lons):
+    points = np.round(np.column_stack([lats, lons]), COORDINATE_DECIMALS).tolist()
+    return json.dumps(points, separators=(",", ":"))
+
+
+def route_map_html(start_name, start_latlon, end_name, end_latlon, lines):
+    """
+    Full map HTML for one result: the cached base map plus route lines.
+
+    Args:
+        lines: list of dicts with lats, lons, color, weight, opacity and
+            optional popup and dash_array, drawn in order (last on top);
+            the map zooms to fit the last line
+
+    Returns:
+        HTML document string
+    """
+    html, map_name = base_map_html(start_name, tuple(start_latlon), end_name, tuple(end_latlon))
+    layers = []
+    for line in lines:
+        style = {"color": line["color"], "weight": line["weight"], "opacity": line["opacity"]}
+        if line.get("dash_array"):
+            style["dashArray"] = line["dash_array"]
+        layer = f"L.polyline({_coordinates_js(line['lats'], line['lons'])},{json.dumps(style)})"
+        if line.get("popup"):
+            layer += f".bindPopup({json.dumps(line['popup'])})"
+        layers.append(f"var route_layer_{len(layers)} = {layer}.addTo({map_name});")
+    if layers:
+        layers.append(f"{map_name}.fitBounds(route_layer_{len(layers) - 1}.getBounds(), {{padding: [30, 30]}});")
+    return html.replace(_ROUTE_LAYERS, "\n".join(layers))
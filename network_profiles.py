@@ -0,0 +1,269 @@
+# network_profiles.py
+"""
+Drive, walk and bike networks on one shared road topology.
+
+osmnx builds a separate graph per network_type, although the three share
+most of their nodes, coordinates and edge geometry. Here the union of
+their edges is stored once as a CompactGraph. Each profile adds only:
+
+    access   one bit per edge and profile (uint8, up to 8 profiles)
+    weights  its own float64 edge lengths, inf on edges it may not use
+
+Edges keep their own length per profile because simplification can merge
+a stretch into one edge for one mode and split it at a footpath junction
+for another. graph(profile) is the topology with that profile's weights
+(CompactGraph.with_weights shares every other array and the adjacency
+lists), built up front, so switching mode hands out another object
+instead of loading a graph. All routing functions take these graphs as
+they are, and apply_edge_updates publishes its result back into the
+MultiProfileGraph the patched graph came from.
+"""
+import sys
+import weakref
+
+import numpy as np
+
+from dijkstra_algorithm import CompactGraph, get_compact_graph
+from graph_registry import graph_registry
+from graph_snapshot import OSMNX_CACHE_DIR, SNAPSHOT_DIR, load_graph_snapshot
+from overpass_ingest import _gather_ranges
+from snapping import snap_usable_nodes_only
+
+PROFILE_NAMES = ("drive", "walk", "bike")
+PROFILE_LABELS = {"drive": "Drive", "walk": "Walk", "bike": "Bike"}
+
+# Profile graph -> (weak reference to its MultiProfileGraph, profile name)
+_profile_owners = weakref.WeakKeyDictionary()
+
+
+def _arrays_nbytes(graph):
+    """Bytes of a CompactGraph's arrays, leaving out derived indexes such as components."""
+    arrays = [graph.node_ids, graph.offsets, graph.targets, graph.weights, graph.xs, graph.ys,
+              graph.geometry_offsets, graph.geometry_xy, graph.road_classes]
+    return sum(a.nbytes for a in arrays if a is not None)
+
+
+class MultiProfileGraph:
+    """
+    Several travel profiles over one topology.
+
+    topology is the shared CompactGraph, carrying the first profile's
+    weights. access has bit i set on the edges names[i] may use, and
+    weights[name] is that profile's edge length array. separate_nbytes
+    records the array bytes of the per-profile graphs it was built from.
+    """
+
+    def __init__(self, topology, names, access, weights, separate_nbytes=None):
+        self.topology = topology
+        self.names = tuple(names)
+        self.access = access
+        self.weights = weights
+        self.separate_nbytes = separate_nbytes or {}
+        # Built before the profile graphs so that all of them share the lists
+        topology.adjacency()
+        topology.node_index
+        self._graphs = {name: topology if i == 0 else topology.with_weights(weights[name])
+                        for i, name in enumerate(self.names)}
+        for name, graph in self._graphs.items():
+            self._adopt(name, graph)
+
+    def _adopt(self, profile, graph):
+        # Inf weights mark edges the profile may not use; do not snap onto those nodes
+        snap_usable_nodes_only(graph)
+        _profile_owners[graph] = (weakref.ref(self), profile)
+
+    def graph(self, profile):
+        """CompactGraph of one profile; the same object on every call."""
+        if profile not in self._graphs:
+            raise ValueError(f"Unknown profile '{profile}'. Available profiles: {list(self.names)}")
+        return self._graphs[profile]
+
+    def replace_profile_graph(self, profile, graph):
+        """
+        Hand out graph for profile from now on, e.g. after an edge update.
+
+        Args:
+            profile: Name of the profile to replace
+            graph: CompactGraph on this topology with the profile's new
+                weights, as CompactGraph.with_weights returns; searches
+                already running keep the graph they started with
+        """
+        current = self.graph(profile)
+        if graph.offsets is not current.offsets or graph.targets is not current.targets:
+            raise ValueError(f"The new '{profile}' graph must share the topology of the current one")
+        self.weights[profile] = graph.weights
+        self._graphs[profile] = graph
+        if profile == self.names[0]:
+            self.topology = graph
+        self._adopt(profile, graph)
+
+    def accessible(self, profile):
+        """Boolean mask of the edges profile may use."""
+        self.graph(profile)
+        return (self.access & (1 << self.names.index(profile))) != 0
+
+    def nbytes(self):
+        return self.memory_report()["total_bytes"]
+
+    def memory_report(self):
+        """
+        Memory of the shared graph against separate per-profile graphs.
+
+        Returns:
+            dict with shared_bytes (topology without weights), access_bytes,
+            profile_bytes (weights per profile), total_bytes,
+            separate_bytes (per profile, as built), separate_total_bytes and
+            saved_bytes
+        """
+        profile_bytes = {name: self.weights[name].nbytes for name in self.names}
+        shared = _arrays_nbytes(self.topology) - self.topology.weights.nbytes
+        total = shared + self.access.nbytes + sum(profile_bytes.values())
+        separate_total = sum(self.separate_nbytes.values())
+        return {
+            "shared_bytes": shared,
+            "access_bytes": self.access.nbytes,
+            "profile_bytes": profile_bytes,
+            "total_bytes": total,
+            "separate_bytes": dict(self.separate_nbytes),
+            "separate_total_bytes": separate_total,
+            "saved_bytes": separate_total - total if separate_total else 0,
+        }
+
+
+def publish_profile_graph(old, new):
+    """
+    Replace old by new in the MultiProfileGraph old is a profile of, if any.
+
+    Returns:
+        True if old belonged to a (still loaded) MultiProfileGraph
+    """
+    owner = _profile_owners.get(old)
+    multi = owner[0]() if owner is not None else None
+    if multi is None or multi._graphs.get(owner[1]) is not old:
+        return False
+    multi.replace_profile_graph(owner[1], new)
+    return True
+
+
+def build_multi_profile(graphs):
+    """
+    Merge per-profile graphs of the same area into a MultiProfileGraph.
+
+    Args:
+        graphs: dict of profile name -> NetworkX graph or CompactGraph, in
+            the same CRS with integer OSM node ids; where profiles carry
+            different geometry or road classes for the same edge, the first
+            one's are kept
+
+    Returns:
+        MultiProfileGraph
+    """
+    if not graphs:
+        raise ValueError("At least one profile graph is required")
+    if len(graphs) > 8:
+        raise ValueError("At most 8 profiles fit the access bitmask")
+    names = list(graphs)
+    compact = [get_compact_graph(graphs[name]) for name in names]
+    crs = {str(graph.crs) for graph in compact}
+    if len(crs) > 1:
+        raise ValueError(f"Profile graphs must share one CRS, got {sorted(crs)}")
+    if any(graph.node_ids.dtype == object for graph in compact):
+        raise ValueError("Profile graphs require integer node ids")
+
+    node_ids = np.unique(np.concatenate([graph.node_ids for graph in compact]))
+    n = len(node_ids)
+    xs, ys = np.full(n, np.nan), np.full(n, np.nan)
+    edge_keys = []
+    for graph in compact:
+        position = np.searchsorted(node_ids, graph.node_ids)
+        if graph.xs is not None:
+            xs[position], ys[position] = graph.xs, graph.ys
+        tails = np.repeat(position, np.diff(graph.offsets))
+        edge_keys.append(tails * n + position[graph.targets])
+
+    # Union of the directed edges, sorted by (tail, head) as CSR rows
+    keys = np.unique(np.concatenate(edge_keys))
+    tails, heads = keys // n, keys % n
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=offsets[1:])
+
+    access = np.zeros(len(keys), dtype=np.uint8)
+    weights = {}
+    owner = np.full(len(keys), -1, dtype=np.int64)
+    owner_edge = np.zeros(len(keys), dtype=np.int64)
+    for bit, (name, graph, profile_keys) in enumerate(zip(names, compact, edge_keys)):
+        where = np.searchsorted(keys, profile_keys)
+        weights[name] = np.full(len(keys), np.inf)
+        weights[name][where] = graph.weights
+        access[where] |= np.uint8(1 << bit)
+        first = owner[where] < 0
+        owner[where[first]] = bit
+        owner_edge[where[first]] = np.flatnonzero(first)
+
+    geometry_offsets = geometry_xy = None
+    if any(graph.geometry_offsets is not None for graph in compact):
+        counts = np.zeros(len(keys), dtype=np.int64)
+        for bit, graph in enumerate(compact):
+            if graph.geometry_offsets is not None:
+                mine = np.flatnonzero(owner == bit)
+                counts[mine] = np.diff(graph.geometry_offsets)[owner_edge[mine]]
+        geometry_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(counts, out=geometry_offsets[1:])
+        geometry_xy = np.empty((int(geometry_offsets[-1]), 2))
+        for bit, graph in enumerate(compact):
+            if graph.geometry_offsets is not None:
+                mine = np.flatnonzero(owner == bit)
+                _, source = _gather_ranges(graph.geometry_offsets, owner_edge[mine])
+                _, destination = _gather_ranges(geometry_offsets, mine)
+                geometry_xy[destination] = graph.geometry_xy[source]
+
+    road_classes = None
+    if any(graph.road_classes is not None for graph in compact):
+        road_classes = np.zeros(len(keys), dtype=np.uint8)
+        for bit, graph in enumerate(compact):
+            if graph.road_classes is not None:
+                mine = np.flatnonzero(owner == bit)
+                road_classes[mine] = graph.road_classes[owner_edge[mine]]
+
+    topology = CompactGraph(
+        node_ids, offsets, heads.astype(np.int32), weights[names[0]],
+        xs=xs, ys=ys, crs=compact[0].crs,
+        geometry_offsets=geometry_offsets, geometry_xy=geometry_xy, road_classes=road_classes,
+    )
+    separate = {name: _arrays_nbytes(graph) for name, graph in zip(names, compact)}
+    return MultiProfileGraph(topology, names, access, weights, separate_nbytes=separate)
+
+
+def load_multi_profile(center, dist, profiles=PROFILE_NAMES, simplify=True,
+                       snapshot_dir=SNAPSHOT_DIR, cache_folder=OSMNX_CACHE_DIR):
+    """
+    Build the MultiProfileGraph for an area from one snapshot per profile.
+
+    Each profile's snapshot is read (or built) by load_graph_snapshot with
+    that profile as network_type; the merged graph keeps no reference to them.
+    """
+    graphs = {
+        name: load_graph_snapshot(center, dist, network_type=name, simplify=simplify,
+                                  snapshot_dir=snapshot_dir, cache_folder=cache_folder)
+        for name in profiles
+    }
+    return build_multi_profile(graphs)
+
+
+def get_multi_profile(center, dist, profiles=PROFILE_NAMES, simplify=True):
+    """load_multi_profile, once per process, kept in the graph_registry."""
+    key = ("profiles", tuple(center), dist, tuple(profiles), simplify)
+    return graph_registry.get(key, lambda: load_multi_profile(center, dist, profiles, simplify))
+
+
+if __name__ == "__main__":
+    from locations_config import CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M
+
+    profiles = tuple(sys.argv[1:]) or PROFILE_NAMES
+    report = load_multi_profile(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, profiles).memory_report()
+    print(f"shared topology {report['shared_bytes'] / 1e6:.2f} MB, access bits {report['access_bytes'] / 1e6:.2f} MB")
+    for name in profiles:
+        print(f"{name:<6} weights {report['profile_bytes'][name] / 1e6:.2f} MB, "
+              f"separate graph {report['separate_bytes'][name] / 1e6:.2f} MB")
+    print(f"total {report['total_bytes'] / 1e6:.2f} MB vs {report['separate_total_bytes'] / 1e6:.2f} MB "
+          f"for separate graphs")
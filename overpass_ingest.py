@@ -0,0 +1,472 @@
+# overpass_ingest.py
+"""
+Build CompactGraphs straight from Overpass JSON responses.
+
+ox.graph_from_point parses the whole response with json.load, turns it
+into a NetworkX MultiDiGraph with an attribute dict per node and edge,
+and simplifies that graph edge by edge. For a city that is fine; for a
+whole-Tricity or state extract the dicts dominate memory and load time.
+
+Here the response is decoded one element at a time, ways are filtered by
+the same highway rules osmnx uses for each network_type, and only what
+routing needs is kept in flat arrays: node ids and coordinates, edge
+endpoints, great-circle lengths and road classes. Simplification (merging the
+interstitial nodes of a road into one edge whose curve is kept as edge
+geometry), bbox truncation and the largest-component filter are NumPy
+passes over those arrays, in the same order osmnx applies them.
+
+Only areas the cached responses fully cover are ingested; anything else
+is left to osmnx. The response bundled in cache/ is a drive query for
+lat 30.650-30.700, lon 76.756-76.821 (southern Chandigarh), so it serves
+e.g. a 2 km radius around (30.675, 76.789) but not the app's 8 km area
+around CHANDIGARH_CENTER, whose first load downloads through osmnx.
+
+Build a snapshot from a saved response:
+
+    python overpass_ingest.py response.json snapshots/region.bin [network_type]
+"""
+import json
+import math
+import os
+import re
+import sys
+from array import array
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from dijkstra_algorithm import EARTH_RADIUS_M, CompactGraph, road_class_code
+
+CHUNK_SIZE = 1 << 20
+
+# osmnx's Overpass filters per network_type: tag -> regex the value must not match
+_EXCLUDED_TAGS = {
+    "drive": {
+        "highway": "abandoned|bridleway|bus_guideway|construction|corridor|cycleway|elevator|escalator|"
+                   "footway|no|path|pedestrian|planned|platform|proposed|raceway|razed|service|steps|track",
+        "motor_vehicle": "no",
+        "motorcar": "no",
+        "service": "alley|driveway|emergency_access|parking|parking_aisle|private",
+    },
+    "drive_service": {
+        "highway": "abandoned|bridleway|bus_guideway|construction|corridor|cycleway|elevator|escalator|"
+                   "footway|no|path|pedestrian|planned|platform|proposed|raceway|razed|steps|track",
+        "motor_vehicle": "no",
+        "motorcar": "no",
+        "service": "emergency_access|parking|parking_aisle|private",
+    },
+    "walk": {
+        "highway": "abandoned|bus_guideway|construction|cycleway|motor|no|planned|platform|proposed|"
+                   "raceway|razed",
+        "foot": "no",
+        "service": "private",
+    },
+    "bike": {
+        "highway": "abandoned|bus_guideway|construction|corridor|elevator|escalator|footway|motor|no|"
+                   "planned|platform|proposed|raceway|razed|steps",
+        "bicycle": "no",
+        "service": "private",
+    },
+    "all": {
+        "highway": "abandoned|construction|no|planned|platform|proposed|raceway|razed",
+        "service": "private",
+    },
+    "all_private": {
+        "highway": "abandoned|construction|no|planned|platform|proposed|raceway|razed",
+    },
+}
+NETWORK_TYPES = tuple(_EXCLUDED_TAGS)
+
+# A response downloaded for one network_type holds only the ways its filter
+# accepts, so it can only stand in for networks that filter contains. The
+# query is not recorded, so it is taken to be the first type (narrowest
+# first) whose filter accepts every way in the response.
+_QUERY_ORDER = ("drive", "drive_service", "walk", "bike", "all", "all_private")
+_SERVES = {
+    "drive": {"drive"},
+    "drive_service": {"drive", "drive_service"},
+    "walk": {"walk"},
+    "bike": {"bike"},
+    "all": {"drive", "drive_service", "walk", "bike", "all"},
+    "all_private": set(NETWORK_TYPES),
+}
+
+# Traversed both ways regardless of oneway tags, as in osmnx
+_BIDIRECTIONAL_TYPES = {"walk"}
+_ONEWAY_VALUES = {"yes", "true", "1", "-1", "reverse", "T", "F"}
+_REVERSED_VALUES = {"-1", "reverse", "T"}
+
+
+def way_filter(network_type):
+    """Predicate on a way's tags: True if osmnx would include it in network_type."""
+    if network_type not in _EXCLUDED_TAGS:
+        raise ValueError(f"Unknown network type '{network_type}'. Available types: {list(NETWORK_TYPES)}")
+    excluded = {tag: re.compile(pattern) for tag, pattern in _EXCLUDED_TAGS[network_type].items()}
+    check_access = network_type != "all_private"
+
+    def keep(tags):
+        if "highway" not in tags or "yes" in tags.get("area", ""):
+            return False
+        if check_access and "private" in tags.get("access", ""):
+            return False
+        return not any(tag in tags and pattern.search(tags[tag]) for tag, pattern in excluded.items())
+
+    return keep
+
+
+def iter_overpass_elements(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the entries of an Overpass JSON response's "elements" array one at a time.
+
+    Only about chunk_size characters plus the element being decoded are
+    held in memory, whatever the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer, pos = "", -1
+        while pos < 0:
+            more = f.read(chunk_size)
+            if not more:
+                return
+            buffer += more
+            key = buffer.find('"elements"')
+            pos = buffer.find("[", key) if key >= 0 else -1
+        pos += 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                buffer, pos = f.read(chunk_size), 0
+                if not buffer:
+                    raise ValueError(f"Unexpected end of Overpass response in {path}")
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element runs past the buffer: drop what was consumed and read on
+                more = f.read(chunk_size)
+                if not more:
+                    raise ValueError(f"Malformed Overpass response in {path}")
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield element
+            pos = end
+            if pos >= chunk_size:
+                buffer, pos = buffer[pos:], 0
+
+
+def is_overpass_response(path):
+    """True if path looks like a cached Overpass JSON response (not e.g. a Nominatim one)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            head = f.read(512)
+    except (OSError, UnicodeDecodeError):
+        return False
+    return head.lstrip().startswith("{") and "Overpass" in head
+
+
+def overpass_response_files(cache_folder):
+    """Paths of the Overpass responses in an osmnx cache folder."""
+    if not os.path.isdir(cache_folder):
+        return []
+    paths = (os.path.join(cache_folder, name) for name in sorted(os.listdir(cache_folder)))
+    return [path for path in paths if os.path.isfile(path) and is_overpass_response(path)]
+
+
+def bbox_from_point(center, dist):
+    """(north, south, east, west) of the square dist meters around center, like osmnx's."""
+    lat, lon = center
+    delta_lat = math.degrees(dist / EARTH_RADIUS_M)
+    delta_lon = delta_lat / math.cos(math.radians(lat))
+    return lat + delta_lat, lat - delta_lat, lon + delta_lon, lon - delta_lon
+
+
+def _read_elements(paths, network_type, query_types=None):
+    """
+    Stream the responses into flat arrays.
+
+    Args:
+        query_types: Optional set, narrowed in place to the network types
+            whose filter accepts every way seen
+
+    Returns:
+        (node_ids, lats, lons, tail_ids, head_ids, road_classes) as NumPy
+        arrays; edges are directed, two-way roads appear in both directions
+    """
+    keep = way_filter(network_type)
+    filters = {name: way_filter(name) for name in NETWORK_TYPES} if query_types is not None else {}
+    bidirectional = network_type in _BIDIRECTIONAL_TYPES
+    node_ids, lats, lons = array("q"), array("d"), array("d")
+    tails, heads, classes = array("q"), array("q"), array("B")
+    seen_ways = set()  # large areas come as several overlapping responses
+    for path in paths:
+        for element in iter_overpass_elements(path):
+            kind = element.get("type")
+            if kind == "node":
+                node_ids.append(element["id"])
+                lats.append(element["lat"])
+                lons.append(element["lon"])
+            elif kind == "way" and element["id"] not in seen_ways:
+                seen_ways.add(element["id"])
+                tags = element.get("tags", {})
+                nodes = element.get("nodes", [])
+                for name in [name for name in query_types or () if not filters[name](tags)]:
+                    query_types.discard(name)
+                if len(nodes) < 2 or not keep(tags):
+                    continue
+                oneway = not bidirectional and (tags.get("oneway") in _ONEWAY_VALUES
+                                                or tags.get("junction") == "roundabout")
+                if oneway and tags.get("oneway") in _REVERSED_VALUES:
+                    nodes = nodes[::-1]
+                code = road_class_code(tags.get("highway"))
+                tails.extend(nodes[:-1])
+                heads.extend(nodes[1:])
+                classes.extend([code] * (len(nodes) - 1))
+                if not oneway:
+                    tails.extend(nodes[1:])
+                    heads.extend(nodes[:-1])
+                    classes.extend([code] * (len(nodes) - 1))
+    return (np.frombuffer(node_ids, dtype=np.int64), np.frombuffer(lats), np.frombuffer(lons),
+            np.frombuffer(tails, dtype=np.int64), np.frombuffer(heads, dtype=np.int64),
+            np.frombuffer(classes, dtype=np.uint8))
+
+
+def _great_circle(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _gather_ranges(offsets, which):
+    """CSR offsets and flat positions selecting rows `which` of a CSR array, in that order."""
+    counts = offsets[which + 1] - offsets[which]
+    new_offsets = np.zeros(len(which) + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_offsets[1:])
+    flat = np.repeat(offsets[which] - new_offsets[:-1], counts) + np.arange(new_offsets[-1])
+    return new_offsets, flat
+
+
+def _endpoints(n, tails, heads):
+    """
+    Nodes where a simplified edge must start or end.
+
+    Interstitial nodes just continue one road: exactly two distinct
+    neighbours and as many edges in as out (one-way or two-way through
+    traffic). Everything else is an endpoint, as in osmnx.
+    """
+    pairs = np.unique(np.concatenate([tails * n + heads, heads * n + tails]))
+    neighbours = np.bincount(pairs // n, minlength=n)
+    indegree = np.bincount(heads, minlength=n)
+    outdegree = np.bincount(tails, minlength=n)
+    return (neighbours != 2) | (indegree != outdegree)
+
+
+def _walk_chains(offsets, tails, heads, lengths, endpoint):
+    """
+    Follow every edge leaving an endpoint through interstitial nodes.
+
+    Returns:
+        (first edges, last heads, total lengths, (chain, step, node) arrays
+        of interior nodes, covered-edge mask)
+    """
+    # Edge that continues edge e past its (interstitial) head: the head's
+    # out-edge that does not turn straight back
+    continues = np.flatnonzero(~endpoint[heads])
+    first_out = offsets[heads[continues]]
+    following = np.full(len(heads), -1, dtype=np.int64)
+    following[continues] = np.where(heads[first_out] == tails[continues], first_out + 1, first_out)
+
+    starts = np.flatnonzero(endpoint[tails])
+    current = starts.copy()
+    total = lengths[starts].copy()
+    covered = np.zeros(len(heads), dtype=bool)
+    covered[starts] = True
+    chains, steps, nodes = [], [], []
+    active = np.flatnonzero(~endpoint[heads[current]])
+    step = 0
+    while len(active):
+        edges = current[active]
+        chains.append(active)
+        steps.append(np.full(len(active), step, dtype=np.int64))
+        nodes.append(heads[edges])
+        edges = following[edges]
+        current[active] = edges
+        covered[edges] = True
+        total[active] += lengths[edges]
+        active = active[~endpoint[heads[edges]]]
+        step += 1
+    interior = tuple(np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+                     for parts in (chains, steps, nodes))
+    return starts, heads[current], total, interior, covered
+
+
+def _simplify(n, tails, heads, lengths, classes, lats, lons):
+    """
+    Merge chains of interstitial nodes into single edges.
+
+    Returns:
+        (tails, heads, lengths, classes, geometry_offsets, geometry_xy) with
+        dense node indices; a merged edge takes the road class of its first
+        segment, and geometry rows are the (lon, lat) interior points
+    """
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=offsets[1:])
+    endpoint = _endpoints(n, tails, heads)
+    starts, ends, total, interior, covered = _walk_chains(offsets, tails, heads, lengths, endpoint)
+    if not covered.all():
+        # Rings without any junction: make one node of each an endpoint
+        ring_tails, ring_heads = tails[~covered], heads[~covered]
+        ring = csr_matrix((np.ones(len(ring_tails)), (ring_tails, ring_heads)), shape=(n, n))
+        _, labels = connected_components(ring, directed=True, connection="weak")
+        ring_nodes = np.unique(ring_tails)
+        _, first = np.unique(labels[ring_nodes], return_index=True)
+        endpoint[ring_nodes[first]] = True
+        starts, ends, total, interior, covered = _walk_chains(offsets, tails, heads, lengths, endpoint)
+
+    chain, step, node = interior
+    order = np.lexsort((step, chain))
+    geometry_offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(chain, minlength=len(starts)), out=geometry_offsets[1:])
+    node = node[order]
+    geometry_xy = np.column_stack([lons[node], lats[node]])
+    return tails[starts], ends, total, classes[starts], geometry_offsets, geometry_xy
+
+
+def compact_graph_from_overpass(paths, network_type="drive", bbox=None, simplify=True, retain_all=False):
+    """
+    Build a CompactGraph from Overpass JSON responses without NetworkX.
+
+    Args:
+        paths: Response files (e.g. overpass_response_files(cache_folder))
+        network_type: One of NETWORK_TYPES, filtered like osmnx does
+        bbox: Optional (north, south, east, west); nodes outside are dropped
+            after simplification, like osmnx's truncation
+        simplify: Merge interstitial nodes into edges with curve geometry
+        retain_all: Keep every component instead of only the largest
+            weakly connected one
+
+    Returns:
+        CompactGraph with lat/lon coordinates, great-circle edge lengths
+        and road classes
+    """
+    return _compact_graph(_read_elements(paths, network_type), bbox, simplify, retain_all)
+
+
+def _compact_graph(elements, bbox, simplify, retain_all):
+    node_ids, lats, lons, tail_ids, head_ids, classes = elements
+    node_ids, first = np.unique(node_ids, return_index=True)
+    lats, lons = lats[first], lons[first]
+
+    # Dense indices of the nodes some kept way uses; way refs to nodes
+    # missing from the response are dropped
+    tails = np.searchsorted(node_ids, tail_ids)
+    heads = np.searchsorted(node_ids, head_ids)
+    tails, heads = np.minimum(tails, len(node_ids) - 1), np.minimum(heads, len(node_ids) - 1)
+    present = (node_ids[tails] == tail_ids) & (node_ids[heads] == head_ids) & (tail_ids != head_ids)
+    del tail_ids, head_ids
+    used = np.unique(np.concatenate([tails[present], heads[present]]))
+    remap = np.full(len(node_ids), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    tails, heads, classes = remap[tails[present]], remap[heads[present]], classes[present]
+    node_ids, lats, lons = node_ids[used], lats[used], lons[used]
+    n = len(node_ids)
+
+    # Sorted by (tail, head); one edge per pair
+    order = np.lexsort((heads, tails))
+    tails, heads, classes = tails[order], heads[order], classes[order]
+    distinct = np.ones(len(tails), dtype=bool)
+    distinct[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+    tails, heads, classes = tails[distinct], heads[distinct], classes[distinct]
+    lengths = _great_circle(lats[tails], lons[tails], lats[heads], lons[heads])
+
+    geometry_offsets = geometry_xy = None
+    if simplify and len(tails):
+        tails, heads, lengths, classes, geometry_offsets, geometry_xy = _simplify(
+            n, tails, heads, lengths, classes, lats, lons)
+
+    keep = np.ones(n, dtype=bool)
+    if bbox is not None:
+        north, south, east, west = bbox
+        keep = (lats <= north) & (lats >= south) & (lons <= east) & (lons >= west)
+    inside = keep[tails] & keep[heads] & (tails != heads)
+    if not retain_all and inside.any():
+        graph = csr_matrix((np.ones(int(inside.sum())), (tails[inside], heads[inside])), shape=(n, n))
+        _, labels = connected_components(graph, directed=True, connection="weak")
+        largest = np.bincount(labels[tails[inside]]).argmax()
+        inside &= labels[tails] == largest
+
+    # Parallel simplified edges (two roads between the same junctions): keep the shortest
+    edges = np.flatnonzero(inside)
+    edges = edges[np.lexsort((lengths[edges], heads[edges], tails[edges]))]
+    if len(edges):
+        first_of_pair = np.ones(len(edges), dtype=bool)
+        first_of_pair[1:] = (tails[edges][1:] != tails[edges][:-1]) | (heads[edges][1:] != heads[edges][:-1])
+        edges = edges[first_of_pair]
+    if geometry_offsets is not None:
+        geometry_offsets, flat = _gather_ranges(geometry_offsets, edges)
+        geometry_xy = geometry_xy[flat]
+    tails, heads, lengths, classes = tails[edges], heads[edges], lengths[edges], classes[edges]
+
+    used = np.unique(np.concatenate([tails, heads]))
+    remap = np.full(n, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    tails, heads = remap[tails], remap[heads]
+    offsets = np.zeros(len(used) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=len(used)), out=offsets[1:])
+
+    return CompactGraph(
+        node_ids[used],
+        offsets,
+        heads.astype(np.int32),
+        lengths,
+        xs=lons[used],
+        ys=lats[used],
+        crs="epsg:4326",
+        geometry_offsets=geometry_offsets if geometry_offsets is not None and len(geometry_xy) else None,
+        geometry_xy=geometry_xy if geometry_offsets is not None and len(geometry_xy) else None,
+        road_classes=classes,
+    )
+
+
+def ingest_cached_overpass(center, dist, network_type="drive", simplify=True, cache_folder="cache"):
+    """
+    The graph ox.graph_from_point would build, straight from the osmnx cache.
+
+    The responses together must span the bbox around center (see the
+    module docstring for the area the bundled cache covers).
+
+    Returns:
+        CompactGraph, or None when the cache holds no Overpass responses
+        covering the requested area, or only ones downloaded for a narrower
+        network type (the caller should use osmnx then)
+    """
+    paths = overpass_response_files(cache_folder)
+    if not paths:
+        return None
+    query_types = set(NETWORK_TYPES)
+    elements = _read_elements(paths, network_type, query_types)
+    query = next((name for name in _QUERY_ORDER if name in query_types), None)
+    if query is None or network_type not in _SERVES[query]:
+        return None
+    lats, lons = elements[1], elements[2]
+    north, south, east, west = bbox = bbox_from_point(center, dist)
+    # The responses must span the whole area; osmnx downloads a buffered one
+    if not len(lats) or lats.max() < north or lats.min() > south or lons.max() < east or lons.min() > west:
+        return None
+    graph = _compact_graph(elements, bbox, simplify, retain_all=False)
+    return graph if graph.num_edges else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        sys.exit("usage: python overpass_ingest.py RESPONSE.json OUTPUT.bin [network_type]")
+    from graph_snapshot import write_snapshot
+
+    network_type = sys.argv[3] if len(sys.argv) == 4 else "drive"
+    graph = compact_graph_from_overpass([sys.argv[1]], network_type=network_type)
+    write_snapshot(graph, sys.argv[2], params={"source": os.path.basename(sys.argv[1]),
+                                               "network_type": network_type, "simplify": True})
+    print(f"{graph.num_nodes} nodes, {graph.num_edges} edges, {graph.nbytes() / 1e6:.1f} MB -> {sys.argv[2]}")
@@ -1,9 +1,18 @@
 # route_finder.py (Enhanced Version)
 import osmnx as ox
-import networkx as nx
+import numpy as np
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+import threading
 import time
+from collections import OrderedDict
+from dijkstra_algorithm import (
+    CompactGraph, DEFAULT_ENGINE, find_route, get_compact_graph, one_to_many_distances,
+)
+from geocoder import CONFIDENT_SCORE, DEFAULT_MIN_SCORE, get_local_geocoder
+from graph_registry import graph_registry
+from network_profiles import PROFILE_NAMES, build_multi_profile
+from snapping import get_snap_index
 
 # configure osmnx
 ox.settings.log_console = False
@@ -11,11 +20,23 @@ ox.settings.use_cache = True
 
 geolocator = Nominatim(user_agent="route_optimizer_app")
 
-def geocode_place(place_name, retries=3):
+def geocode_place(place_name, retries=3, allow_network=False):
     """
-    Return (lat, lon) tuple for a place string using geopy / Nominatim.
-    Includes retry logic for better reliability.
+    Return (lat, lon) tuple for a place string.
+
+    Names are resolved from the offline index in geocoder.py first (named
+    locations, cached Nominatim/Overpass responses, street names of loaded
+    graphs). Nominatim is only queried when allow_network is True, with
+    retry logic for better reliability; the offline index then answers only
+    confident matches (CONFIDENT_SCORE), not loose prefix or fuzzy ones.
     """
+    min_score = CONFIDENT_SCORE if allow_network else DEFAULT_MIN_SCORE
+    local = get_local_geocoder().geocode(place_name, min_score=min_score)
+    if local is not None:
+        return local
+    if not allow_network:
+        raise ValueError(f"Could not find location: '{place_name}' in the offline index. Please try a more specific address.")
+
     for attempt in range(retries):
         try:
             location = geolocator.geocode(place_name, timeout=10)
@@ -36,6 +57,8 @@ def geocode_place(place_name, retries=3):
 def load_graph_for_place(place_name, network_type="drive", dist=None, simplify=True):
     """
     Load (and cache via osmnx internal cache) a road network graph for the given place.
+    The projected graph is kept in the process-wide graph_registry, so every
+    session asking for the same region shares one read-only copy.
     
     Args:
         place_name: e.g. "Chandigarh, India" or polygon query
@@ -44,12 +67,40 @@ def load_graph_for_place(place_name, network_type="drive", dist=None, simplify=T
         simplify: If False, preserves all nodes (more accurate but slower)
     
     Returns:
-        NetworkX MultiDiGraph with road network
+        NetworkX MultiDiGraph with road network (frozen)
+    """
+    key = ("place", place_name, network_type, dist, simplify)
+    return graph_registry.get(key, lambda: _load_projected_graph(place_name, network_type, dist, simplify))
+
+
+def load_profiles_for_place(place_name, profiles=PROFILE_NAMES, dist=None, simplify=True):
+    """
+    Load several network types for a place as one MultiProfileGraph.
+
+    The topology shared by the profiles is stored once, with an access
+    bitmask and a weight array per profile; the per-type NetworkX graphs
+    are only used to build it and are not kept.
+
+    Args:
+        place_name, dist, simplify: As for load_graph_for_place
+        profiles: Network types to merge, e.g. ("drive", "walk", "bike")
+
+    Returns:
+        MultiProfileGraph; .graph(profile) gives the CompactGraph to route on
     """
+    key = ("place_profiles", place_name, tuple(profiles), dist, simplify)
+    return graph_registry.get(key, lambda: build_multi_profile(
+        {name: _load_projected_graph(place_name, name, dist, simplify) for name in profiles}
+    ))
+
+
+def _load_projected_graph(place_name, network_type, dist, simplify):
+    """Download/parse the graph with osmnx and project it to UTM."""
     try:
         if dist:
-            # Load graph by radius around a point
-            lat, lon = geocode_place(place_name)
+            # Load graph by radius around a point; downloading the graph needs the
+            # network anyway, so a place missing from the offline index may go to Nominatim
+            lat, lon = geocode_place(place_name, allow_network=True)
             G = ox.graph_from_point((lat, lon), dist=dist, network_type=network_type, simplify=simplify)
         else:
             # Load graph for entire place
@@ -59,6 +110,9 @@ def load_graph_for_place(place_name, network_type="drive", dist=None, simplify=T
         if len(G.edges) == 0:
             raise ValueError(f"No road network found for '{place_name}' with network type '{network_type}'")
         
+        # Street names become offline geocoding targets (needs lat/lon, so before projecting)
+        get_local_geocoder().add_graph_names(G)
+
         # Project graph to UTM for accurate distance calculations
         G = ox.project_graph(G)
         
@@ -73,15 +127,40 @@ def load_graph_for_place(place_name, network_type="drive", dist=None, simplify=T
 def nearest_node_for_point(G, lat, lon):
     """
     Return nearest node id in G for given lat, lon.
-    Note: ox.distance.nearest_nodes expects (G, X, Y) => (lon, lat).
+    Uses the per-graph snapping index, so repeated calls don't rebuild a
+    spatial lookup. Works on NetworkX graphs and CompactGraphs.
     """
     try:
-        node = ox.distance.nearest_nodes(G, lon, lat)
-        return node
+        return get_snap_index(G).nearest_nodes([lat], [lon])[0].item()
     except Exception as e:
         raise ValueError(f"Error finding nearest node at ({lat}, {lon}): {str(e)}")
 
 
+def nearest_nodes_batch(G, lats, lons, slack_m=None):
+    """
+    Snap many GPS points in one vectorized call.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        lats, lons: Equal-length sequences or arrays of coordinates
+        slack_m: How much farther than the nearest node a node of the largest
+            component may be and still be preferred (see SnapIndex.nearest_indices)
+
+    Returns:
+        NumPy array of node ids, one per input point
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if lats.shape != lons.shape:
+        raise ValueError(f"lats and lons must have the same shape, got {lats.shape} and {lons.shape}")
+    if lats.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    try:
+        return get_snap_index(G).nearest_nodes(lats.ravel(), lons.ravel(), slack_m=slack_m)
+    except Exception as e:
+        raise ValueError(f"Error snapping {lats.size} points: {str(e)}")
+
+
 def get_route_length_meters(G, route):
     """
     Sum lengths (in meters) for route (list of nodes).
@@ -97,13 +176,20 @@ def get_route_length_meters(G, route):
         return 0.0
     
     length = 0.0
+    if isinstance(G, CompactGraph):
+        for u, v in zip(route[:-1], route[1:]):
+            weight = G.edge_weight(u, v)
+            if weight is None:
+                print(f"Warning: No edge found between {u} and {v}")
+            else:
+                length += weight
+        return length
+
     for u, v in zip(route[:-1], route[1:]):
-        # edges can be multi; get 'length' attribute for the first edge
+        # edges can be multi; use the shortest parallel edge, as routing does
         data = G.get_edge_data(u, v)
         if data:
-            # pick the first key
-            edge_attrs = data[list(data.keys())[0]]
-            length += edge_attrs.get("length", 0.0)
+            length += min(attrs.get("length", 0.0) for attrs in data.values())
         else:
             # Edge doesn't exist - this shouldn't happen in a valid route
             print(f"Warning: No edge found between {u} and {v}")
@@ -119,8 +205,9 @@ def validate_route_exists(G, start_node, end_node):
         (bool, str): (path_exists, message)
     """
     try:
-        # Quick check using NetworkX
-        if nx.has_path(G, start_node, end_node):
+        # Component labels answer this without a graph search
+        graph = get_compact_graph(G)
+        if graph.can_reach(graph.index_of(start_node), graph.index_of(end_node)):
             return True, "Path exists"
         else:
             return False, "No path exists between these locations in the road network"
@@ -145,4 +232,174 @@ def get_route_statistics(G, route):
         "distance_km": distance_m / 1000,
         "num_nodes": len(route),
         "num_segments": len(route) - 1
-    }
\ No newline at end of file
+    }
+
+
+def distance_matrix(G, sources, targets, hierarchy=None):
+    """
+    N x M road distance table between raw GPS points (e.g. drivers x pickups).
+
+    Points are snapped with the same index as nearest_node_for_point. Each
+    distinct source runs one one-to-many search that stops once all targets
+    are settled; with a ContractionHierarchy built for G, the bucket-based
+    many-to-many query is used instead.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        sources: Sequence of (lat, lon) tuples
+        targets: Sequence of (lat, lon) tuples
+        hierarchy: Optional ContractionHierarchy matching G
+
+    Returns:
+        NumPy float64 array of shape (len(sources), len(targets)) in meters,
+        inf where no route exists
+    """
+    if len(sources) == 0 or len(targets) == 0:
+        return np.zeros((len(sources), len(targets)))
+    source_points = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+    target_points = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+    source_nodes = nearest_nodes_batch(G, source_points[:, 0], source_points[:, 1]).tolist()
+    target_nodes = nearest_nodes_batch(G, target_points[:, 0], target_points[:, 1]).tolist()
+
+    if hierarchy is not None:
+        if not hierarchy.matches(G):
+            raise ValueError("The contraction hierarchy was built for a different graph")
+        return hierarchy.many_to_many(source_nodes, target_nodes)
+
+    table = np.empty((len(source_nodes), len(target_nodes)), dtype=np.float64)
+    rows = {}
+    for i, node in enumerate(source_nodes):
+        if node not in rows:
+            rows[node] = one_to_many_distances(G, node, target_nodes)
+        table[i] = rows[node]
+    return table
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of computed routes with per-entry time-to-live.
+
+    Keys are (graph version, start node, end node, weight attribute,
+    engine), so a changed graph never serves stale routes and a result's
+    engine and settled_nodes always belong to the engine asked for. Each entry stores the route
+    result, its get_route_statistics() dict and how long it took to compute,
+    which is what a hit saves.
+    """
+
+    def __init__(self, max_entries=1024, ttl_s=3600):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # key -> (expires_at, value, compute_s)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_s = 0.0
+
+    def get(self, key):
+        """Return the cached value or None; expired entries count as misses."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_s += entry[2]
+            return entry[1]
+
+    def put(self, key, value, compute_s=0.0):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, value, compute_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Drop entries whose key matches predicate(key), or all entries; returns the count."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def migrate(self, old_version, new_version, keep):
+        """
+        Move routes cached for old_version over to new_version.
+
+        Entries for which keep(key, value) is false are dropped instead;
+        entries of other graph versions are left alone.
+
+        Returns:
+            (moved, dropped) counts
+        """
+        moved = dropped = 0
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == old_version]:
+                entry = self._entries.pop(key)
+                if keep(key, entry[1]):
+                    self._entries[(new_version,) + key[1:]] = entry
+                    moved += 1
+                else:
+                    dropped += 1
+        return moved, dropped
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Returns:
+            dict with hits, misses, hit_ratio, evictions, entries and
+            latency_saved_s (compute time of every entry served from cache)
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "latency_saved_s": self.saved_s,
+            }
+
+
+# Shared by every session in the process
+route_cache = RouteCache()
+
+
+def cached_route(G, start_node, end_node, weight="length", engine=DEFAULT_ENGINE, cache=None):
+    """
+    Shortest route between two nodes, served from the route cache when possible.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        weight: Edge attribute to minimise; anything other than 'length'
+            needs a NetworkX graph
+        engine: Routing engine used on a cache miss
+        cache: RouteCache to use (default: the process-wide route_cache)
+
+    Returns:
+        find_route() result dict plus 'stats' (get_route_statistics) and
+        'cached' (True if served from the cache)
+    """
+    cache = route_cache if cache is None else cache
+    if weight != "length" and isinstance(G, CompactGraph):
+        raise ValueError(f"Compact graphs only carry 'length' weights, not '{weight}'")
+    graph = get_compact_graph(G, weight=weight)
+
+    key = (graph.version, start_node, end_node, weight, engine)
+    value = cache.get(key)
+    if value is not None:
+        return dict(value, cached=True)
+
+    start_time = time.perf_counter()
+    result = find_route(graph, start_node, end_node, engine=engine)
+    result["stats"] = get_route_statistics(G, result["path"])
+    cache.put(key, result, time.perf_counter() - start_time)
+    return dict(result, cached=False)
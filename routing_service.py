@@ -0,0 +1,287 @@
+# routing_service.py
+"""
+Asynchronous HTTP JSON API around the router.
+
+Endpoints (all POST with a JSON body, responses are JSON):
+    /route   {"origin": name | [lat, lon], "destination": ..., "engine": optional}
+    /matrix  {"sources": [[lat, lon], ...], "targets": [[lat, lon], ...]}
+    /snap    {"points": [[lat, lon], ...]}
+and GET /health.
+
+Searches run in a worker pool so the event loop only parses requests and
+writes responses. Identical requests that arrive while the first one is
+still being computed share its result instead of starting a new search.
+
+    python routing_service.py --port 8080 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dijkstra_algorithm import DEFAULT_ENGINE, ROUTING_ENGINES, find_route
+from graph_snapshot import load_graph_snapshot, read_snapshot, snapshot_path
+from locations_config import CHANDIGARH_CENTER, CHANDIGARH_LOCATIONS, CHANDIGARH_RADIUS_M
+from route_finder import distance_matrix, nearest_nodes_batch
+from snapping import snap_named_locations
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_MATRIX_CELLS = 250000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+# Per-process graph used by the worker functions below
+_worker = {}
+
+
+def _init_worker(graph_path):
+    graph, _ = read_snapshot(graph_path)
+    _use_graph(graph)
+
+
+def _use_graph(graph):
+    _worker.update(graph=graph, named=snap_named_locations(graph))
+
+
+def _finite(value):
+    """JSON has no Infinity; unreachable distances are returned as null."""
+    return value if math.isfinite(value) else None
+
+
+def _points(payload, key):
+    try:
+        points = [(float(lat), float(lon)) for lat, lon in payload[key]]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a list of [lat, lon] pairs")
+    return points
+
+
+def _resolve(endpoint):
+    """Node id for a location name or a [lat, lon] pair."""
+    if isinstance(endpoint, str):
+        if endpoint not in CHANDIGARH_LOCATIONS:
+            raise ValueError(f"Unknown location '{endpoint}'")
+        return _worker["named"][endpoint]
+    try:
+        lat, lon = (float(v) for v in endpoint)
+    except (TypeError, ValueError):
+        raise ValueError("Endpoints must be a location name or a [lat, lon] pair")
+    return nearest_nodes_batch(_worker["graph"], [lat], [lon])[0].item()
+
+
+def compute_route(payload):
+    graph = _worker["graph"]
+    if "origin" not in payload or "destination" not in payload:
+        raise ValueError("'origin' and 'destination' are required")
+    engine = payload.get("engine", DEFAULT_ENGINE)
+    result = find_route(graph, _resolve(payload["origin"]), _resolve(payload["destination"]), engine=engine)
+    path = result["path"] or []
+    return {
+        "path": path,
+        "coordinates": [list(p) for p in graph.node_latlons(path)] if path else [],
+        "distance_m": _finite(result["distance_m"]),
+        "num_nodes": len(path),
+        "settled_nodes": result["settled_nodes"],
+        "engine": engine,
+    }
+
+
+def compute_matrix(payload):
+    sources, targets = _points(payload, "sources"), _points(payload, "targets")
+    if len(sources) * len(targets) > MAX_MATRIX_CELLS:
+        raise ValueError(f"Matrix too large; at most {MAX_MATRIX_CELLS} cells per request")
+    table = distance_matrix(_worker["graph"], sources, targets)
+    return {"distances": [[_finite(v) for v in row] for row in table.tolist()]}
+
+
+def compute_snap(payload):
+    points = _points(payload, "points")
+    nodes = nearest_nodes_batch(_worker["graph"], [p[0] for p in points], [p[1] for p in points])
+    return {"nodes": nodes.tolist()}
+
+
+HANDLERS = {
+    "/route": compute_route,
+    "/matrix": compute_matrix,
+    "/snap": compute_snap,
+}
+
+
+class RoutingService:
+    """
+    Request dispatcher with in-flight request coalescing.
+
+    handle() is independent of the transport, so it can be awaited
+    directly; serve() exposes it over HTTP.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._in_flight = {}
+        self.requests = 0
+        self.computed = 0
+        self.coalesced = 0
+
+    @classmethod
+    def with_process_pool(cls, graph_path, workers=None):
+        """Workers each memory-map the snapshot at graph_path once."""
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                       initializer=_init_worker, initargs=(graph_path,))
+        return cls(executor)
+
+    @classmethod
+    def in_process(cls, graph, workers=2):
+        """Thread-pool variant sharing graph with the caller, for local use and tests."""
+        _use_graph(graph)
+        return cls(ThreadPoolExecutor(max_workers=workers))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def handle(self, method, path, payload):
+        """
+        Dispatch one request.
+
+        Returns:
+            (HTTP status, JSON-serializable body)
+        """
+        self.requests += 1
+        if path == "/health":
+            return 200, {"status": "ok", "requests": self.requests,
+                         "computed": self.computed, "coalesced": self.coalesced}
+        if path not in HANDLERS:
+            return 404, {"error": f"Unknown endpoint {path}"}
+        if method != "POST":
+            return 405, {"error": f"{path} expects POST"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "Request body must be a JSON object"}
+        engine = payload.get("engine", DEFAULT_ENGINE) if path == "/route" else DEFAULT_ENGINE
+        if not isinstance(engine, str) or engine not in ROUTING_ENGINES:
+            return 400, {"error": f"Unknown routing engine. Available engines: {list(ROUTING_ENGINES)}"}
+
+        key = (path, json.dumps(payload, sort_keys=True))
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, HANDLERS[path], payload)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.computed += 1
+        else:
+            self.coalesced += 1
+
+        try:
+            # shield: one caller disconnecting must not cancel the shared search
+            return 200, await asyncio.shield(future)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"Error handling request: {str(e)}"}
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            status, body = await self._read_and_dispatch(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except ValueError as e:
+            # e.g. a header line longer than the stream limit
+            status, body = 400, {"error": f"Malformed request: {str(e)}"}
+        except Exception as e:
+            status, body = 500, {"error": f"Error handling request: {str(e)}"}
+        data = json.dumps(body).encode("utf-8")
+        try:
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_and_dispatch(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            return 400, {"error": "Malformed request line"}
+        method, path = request_line[0].upper(), request_line[1].split("?", 1)[0]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return 400, {"error": "Content-Length must be a non-negative integer"}
+        if length > MAX_BODY_BYTES:
+            return 413, {"error": "Request body too large"}
+        payload = None
+        if length:
+            try:
+                payload = json.loads(await reader.readexactly(length))
+            except ValueError:
+                # JSONDecodeError and UnicodeDecodeError (a body that is not UTF-8)
+                return 400, {"error": "Request body is not valid JSON"}
+        return await self.handle(method, path, payload)
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Start the HTTP server; returns the asyncio Server (port 0 picks a free port)."""
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+
+async def request(host, port, method, path, payload=None):
+    """
+    Minimal HTTP client for the service.
+
+    Returns:
+        (status, decoded JSON body)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    data = await reader.read()
+    writer.close()
+    return status, json.loads(data)
+
+
+async def _main(host, port, workers):
+    load_graph_snapshot(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, network_type="drive", simplify=True)
+    graph_path = snapshot_path(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, network_type="drive", simplify=True)
+    service = RoutingService.with_process_pool(graph_path, workers)
+    server = await service.serve(host, port)
+    print(f"Routing service listening on http://{host}:{server.sockets[0].getsockname()[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP JSON routing service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,164 @@
+# snapping.py
+"""
+Nearest-node snapping over the node coordinates of a road graph.
+
+A scikit-learn BallTree (haversine metric for lat/lon graphs) or KDTree
+(projected graphs) is built once per graph and reused for every lookup,
+instead of osmnx rebuilding its spatial index on each nearest_nodes call.
+
+Points prefer a node of the graph's largest strongly connected component
+when one is nearly as close as the nearest node, so a location next to a
+one-way stub or a disconnected parking aisle still snaps onto the network
+every other location can reach. The profile graphs of a MultiProfileGraph
+also leave out nodes without a usable edge (e.g. walk-only nodes in the
+drive profile); other graphs index every node with coordinates.
+"""
+import weakref
+
+import numpy as np
+from sklearn.neighbors import BallTree, KDTree
+
+from dijkstra_algorithm import EARTH_RADIUS_M, get_compact_graph, is_geographic
+from locations_config import CHANDIGARH_LOCATIONS
+
+# Candidates considered per point, and how much farther (meters) than the
+# nearest node a node of the largest component may be and still win by
+# default. Chandigarh's sectors have an internal road every 100-200 m, so a
+# point beside a one-way stub or a cut-off parking aisle has a main-network
+# road within 250 m; a closer node farther apart than that is most likely
+# the place actually meant (e.g. a campus whose gates the region cut off).
+SNAP_CANDIDATES = 8
+LARGEST_COMPONENT_SLACK_M = 250
+
+
+class SnapIndex:
+    """
+    Spatial index over the nodes of one CompactGraph.
+
+    Coordinates follow the osmnx convention: (lat, lon) for unprojected
+    graphs, (y, x) in the graph's CRS for projected ones. With drop_unusable,
+    nodes none of whose edges has a finite weight are not indexed (unless
+    that would leave no node at all).
+    """
+
+    def __init__(self, graph, drop_unusable=False):
+        self.graph = graph
+        self.geographic = is_geographic(graph)
+        valid = ~(np.isnan(graph.xs) | np.isnan(graph.ys))
+        if drop_unusable:
+            finite = np.isfinite(graph.weights)
+            usable = np.zeros(graph.num_nodes, dtype=bool)
+            usable[np.repeat(np.arange(graph.num_nodes), np.diff(graph.offsets))[finite]] = True
+            usable[graph.targets[finite]] = True
+            if np.any(valid & usable):
+                valid &= usable
+        self.indices = np.flatnonzero(valid)
+        points = np.column_stack([graph.ys[valid], graph.xs[valid]])
+        if self.geographic:
+            self.tree = BallTree(np.radians(points), metric="haversine")
+        else:
+            self.tree = KDTree(points)
+        self.preferred = graph.connectivity().in_largest(self.indices)
+
+    def nearest_indices(self, lats, lons, prefer_largest=True, slack_m=None):
+        """
+        Dense node indices nearest to each (lat, lon) pair, as an int array.
+
+        Args:
+            prefer_largest: Take the closest node of the largest component
+                instead when it is within slack_m of the nearest node's distance
+            slack_m: Meters (CRS units on projected graphs); defaults to
+                LARGEST_COMPONENT_SLACK_M
+        """
+        if slack_m is None:
+            slack_m = LARGEST_COMPONENT_SLACK_M
+        if slack_m < 0:
+            raise ValueError(f"slack_m must be non-negative, got {slack_m}")
+        points = np.column_stack([np.atleast_1d(np.asarray(lats, dtype=np.float64)),
+                                  np.atleast_1d(np.asarray(lons, dtype=np.float64))])
+        if self.geographic:
+            points = np.radians(points)
+        k = min(SNAP_CANDIDATES, len(self.indices)) if prefer_largest else 1
+        distances, nearest = self.tree.query(points, k=k)
+        if k > 1:
+            if self.geographic:
+                distances = distances * EARTH_RADIUS_M
+            candidates = self.preferred[nearest] & (distances <= distances[:, :1] + slack_m)
+            # Candidates come sorted by distance; fall back to the nearest when none qualifies
+            choice = np.where(candidates.any(axis=1), candidates.argmax(axis=1), 0)
+            return self.indices[nearest[np.arange(len(nearest)), choice]]
+        return self.indices[nearest[:, 0]]
+
+    def nearest_nodes(self, lats, lons, prefer_largest=True, slack_m=None):
+        """Original node ids nearest to each (lat, lon) pair, as an array."""
+        return self.graph.node_ids[self.nearest_indices(lats, lons, prefer_largest=prefer_largest, slack_m=slack_m)]
+
+
+_snap_cache = weakref.WeakKeyDictionary()
+_named_cache = weakref.WeakKeyDictionary()
+# Graphs whose SnapIndex is built with drop_unusable
+_usable_only = weakref.WeakSet()
+
+
+def get_snap_index(G):
+    """Return the SnapIndex for G, building it on first use."""
+    graph = get_compact_graph(G)
+    index = _snap_cache.get(graph)
+    if index is None:
+        index = SnapIndex(graph, drop_unusable=graph in _usable_only)
+        _snap_cache[graph] = index
+    return index
+
+
+def snap_usable_nodes_only(G):
+    """
+    Make get_snap_index(G) leave out nodes without a usable edge.
+
+    For graphs that mark the edges a mode may not use with an infinite
+    weight, such as the profile graphs of a MultiProfileGraph.
+    """
+    graph = get_compact_graph(G)
+    if graph in _usable_only:
+        return
+    _usable_only.add(graph)
+    _snap_cache.pop(graph, None)
+    _named_cache.pop(graph, None)
+
+
+def snap_named_locations(G, locations=CHANDIGARH_LOCATIONS):
+    """
+    Snap every named location to its nearest node in one batch query.
+
+    The result for CHANDIGARH_LOCATIONS is remembered per graph, so calling
+    this at graph load makes later lookups a dict access.
+
+    Returns:
+        dict of location name -> node id
+    """
+    graph = get_compact_graph(G)
+    cacheable = locations is CHANDIGARH_LOCATIONS
+    if cacheable and graph in _named_cache:
+        return _named_cache[graph]
+    names = list(locations)
+    lats = [locations[name][0] for name in names]
+    lons = [locations[name][1] for name in names]
+    nodes = get_snap_index(graph).nearest_nodes(lats, lons).tolist() if names else []
+    snapped = dict(zip(names, nodes))
+    if cacheable:
+        _named_cache[graph] = snapped
+    return snapped
+
+
+def share_snap_index(old, new):
+    """
+    Reuse the spatial index and named-location snaps of old for new.
+
+    For graphs with the same nodes and coordinates, such as one returned by
+    CompactGraph.with_weights.
+    """
+    if old in _usable_only:
+        _usable_only.add(new)
+    if old in _snap_cache:
+        _snap_cache[new] = _snap_cache[old]
+    if old in _named_cache:
+        _named_cache[new] = _named_cache[old]
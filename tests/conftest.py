@@ -0,0 +1,9 @@
+# tests/conftest.py
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(REPO_ROOT, "cache")
+
+# The modules live at the top level of the repository
+sys.path.insert(0, REPO_ROOT)
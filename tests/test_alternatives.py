@@ -0,0 +1,51 @@
+# tests/test_alternatives.py
+import numpy as np
+import pytest
+
+from alternatives import DEFAULT_MAX_OVERLAP, DEFAULT_MAX_STRETCH, alternative_routes
+from conftest import CACHE_DIR
+from dijkstra_algorithm import find_route
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+def _pairs(graph, count, seed):
+    rng = np.random.default_rng(seed)
+    pairs = []
+    while len(pairs) < count:
+        start, end = (graph.ids[i] for i in rng.integers(graph.num_nodes, size=2))
+        if start != end and graph.can_reach(graph.index_of(start), graph.index_of(end)):
+            pairs.append((start, end))
+    return pairs
+
+
+@pytest.mark.parametrize("max_stretch, max_overlap", [(DEFAULT_MAX_STRETCH, DEFAULT_MAX_OVERLAP), (1.2, 0.5)])
+def test_alternatives_are_distinct_and_within_the_stretch(graph, max_stretch, max_overlap):
+    found = 0
+    for start, end in _pairs(graph, 30, seed=1):
+        routes = alternative_routes(graph, start, end, k=3, max_stretch=max_stretch, max_overlap=max_overlap)
+        assert 1 <= len(routes) <= 3
+        shortest = routes[0]["distance_m"]
+        assert shortest == pytest.approx(find_route(graph, start, end, engine="dijkstra")["distance_m"], rel=1e-9)
+        assert len({tuple(route["path"]) for route in routes}) == len(routes)
+        for route in routes:
+            path = route["path"]
+            assert path[0] == start and path[-1] == end
+            assert sum(graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:])) == pytest.approx(
+                route["distance_m"], rel=1e-9)
+            assert route["distance_m"] <= max_stretch * shortest * (1 + 1e-9)
+            assert route["overlap"] <= max_overlap
+        found += len(routes) - 1
+    # The cache graph has enough parallel streets for some alternatives to exist
+    assert found > 0
+
+
+def test_unreachable_pair_has_no_routes(graph):
+    source = next(i for i in range(graph.num_nodes)
+                  if not all(graph.can_reach(i, j) for j in range(graph.num_nodes)))
+    target = next(j for j in range(graph.num_nodes) if not graph.can_reach(source, j))
+    assert alternative_routes(graph, graph.ids[source], graph.ids[target]) == []
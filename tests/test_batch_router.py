@@ -0,0 +1,39 @@
+# tests/test_batch_router.py
+import json
+
+import pytest
+
+import batch_router
+from batch_router import _route_chunk, read_od_pairs
+from conftest import CACHE_DIR
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from snapping import snap_named_locations
+
+GOOD = {"id": "a", "origin_lat": 30.675, "origin_lon": 76.789, "dest_lat": 30.670, "dest_lon": 76.800}
+
+
+@pytest.fixture(autouse=True)
+def worker(monkeypatch):
+    graph = compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+    monkeypatch.setattr(batch_router, "_worker", {"graph": graph, "named": snap_named_locations(graph),
+                                                  "engine": "dijkstra", "geometry": False})
+
+
+def test_malformed_lines_become_error_rows(tmp_path):
+    path = tmp_path / "od.jsonl"
+    path.write_text("\n".join([
+        json.dumps(GOOD),
+        '{"id": "b", "origin_lat": 30.675,',
+        "",
+        "[30.675, 76.789]",
+        json.dumps(dict(GOOD, id="c", origin="Nowhere")),
+        json.dumps(dict(GOOD, id="d")),
+    ]) + "\n", encoding="utf-8")
+
+    results = _route_chunk(list(read_od_pairs(str(path))))
+    assert [r["id"] for r in results] == ["a", "", "", "c", "d"]
+    assert results[0]["error"] == "" and results[0]["distance_m"] > 0
+    assert "line 2" in results[1]["error"] and "JSON" in results[1]["error"]
+    assert "line 4" in results[2]["error"] and "object" in results[2]["error"]
+    assert "Nowhere" in results[3]["error"]
+    assert results[4] == dict(results[0], id="d")
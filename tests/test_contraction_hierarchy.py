@@ -0,0 +1,48 @@
+# tests/test_contraction_hierarchy.py
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from contraction_hierarchy import build_contraction_hierarchy
+from dijkstra_algorithm import find_route
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+@pytest.fixture(scope="module")
+def hierarchy(graph):
+    return build_contraction_hierarchy(graph)
+
+
+def _pairs(graph, count, seed):
+    rng = np.random.default_rng(seed)
+    return [tuple(graph.ids[i] for i in rng.integers(graph.num_nodes, size=2)) for _ in range(count)]
+
+
+def test_routes_match_dijkstra(graph, hierarchy):
+    assert hierarchy.matches(graph)
+    for start, end in _pairs(graph, 100, seed=1):
+        expected = find_route(graph, start, end, engine="dijkstra")
+        result = hierarchy.find_route(start, end)
+        if expected["path"] is None:
+            assert result["path"] is None
+            continue
+        assert result["distance_m"] == pytest.approx(expected["distance_m"], rel=1e-9)
+        path = result["path"]
+        assert path[0] == start and path[-1] == end
+        # Shortcuts are unpacked into edges of the original graph
+        assert sum(graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:])) == pytest.approx(
+            result["distance_m"], rel=1e-9)
+
+
+def test_many_to_many_matches_dijkstra(graph, hierarchy):
+    starts, ends = zip(*_pairs(graph, 8, seed=2))
+    table = hierarchy.many_to_many(starts, ends)
+    for i, start in enumerate(starts):
+        for j, end in enumerate(ends):
+            assert table[i, j] == pytest.approx(find_route(graph, start, end, engine="dijkstra")["distance_m"],
+                                                rel=1e-9)
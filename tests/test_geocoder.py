@@ -0,0 +1,66 @@
+# tests/test_geocoder.py
+import pytest
+
+import route_finder
+from conftest import CACHE_DIR
+from geocoder import LocalGeocoder
+
+AIRPORT = (30.6741923, 76.7909851)
+# Zirakpur itself is not in the offline index; it only appears in the
+# display_name of the cached Nominatim result for the airport
+ZIRAKPUR = (30.6425, 76.8173)
+
+
+class _Location:
+    latitude, longitude = ZIRAKPUR
+
+
+@pytest.fixture
+def geocoder(monkeypatch):
+    geocoder = LocalGeocoder()
+    geocoder.add_locations()
+    geocoder.add_cache_folder(CACHE_DIR)
+    monkeypatch.setattr(route_finder, "get_local_geocoder", lambda: geocoder)
+    return geocoder
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    queries = []
+
+    def geocode(query, timeout=None):
+        queries.append(query)
+        return _Location() if query == "Zirakpur" else None
+
+    monkeypatch.setattr(route_finder.geolocator, "geocode", geocode)
+    return queries
+
+
+def test_place_named_only_in_an_address_is_not_matched(geocoder):
+    assert geocoder.lookup("Zirakpur") == []
+
+
+def test_names_and_full_aliases_still_match(geocoder):
+    assert geocoder.geocode("Chandigarh International Airport") == AIRPORT
+    assert geocoder.geocode("airport") == AIRPORT
+    display = ("Chandigarh International Airport, Dakshin Marg, Zirakpur, Dera Bassi Tahsil, "
+               "Sahibzada Ajit Singh Nagar, Punjab, 140603, India")
+    assert geocoder.geocode(display) == AIRPORT
+
+
+def test_missing_place_goes_to_nominatim(geocoder, nominatim):
+    with pytest.raises(ValueError):
+        route_finder.geocode_place("Zirakpur")
+    assert nominatim == []
+    assert route_finder.geocode_place("Zirakpur", allow_network=True) == ZIRAKPUR
+    assert nominatim == ["Zirakpur"]
+
+
+def test_only_confident_offline_hits_skip_nominatim(geocoder, nominatim):
+    assert route_finder.geocode_place("Chandigarh International Airport", allow_network=True) == AIRPORT
+    assert nominatim == []
+    # A loose prefix is good enough offline, but not when Nominatim can be asked
+    assert route_finder.geocode_place("chandigarh int") == AIRPORT
+    with pytest.raises(ValueError):
+        route_finder.geocode_place("chandigarh int", allow_network=True)
+    assert nominatim == ["chandigarh int"]
@@ -0,0 +1,100 @@
+# tests/test_graph_updates.py
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from graph_updates import apply_edge_updates
+from location_matrix import _tree_path_nodes, build_location_matrix, update_location_matrix
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from route_finder import RouteCache, cached_route
+
+DRIVE_SPEED_MS = 13.9
+
+
+@pytest.fixture
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+def _locations(graph, count, seed):
+    rng = np.random.default_rng(seed)
+    return {f"place {i}": (float(graph.ys[node]), float(graph.xs[node]))
+            for i, node in enumerate(rng.choice(graph.num_nodes, size=count, replace=False).tolist())}
+
+
+def _edge(graph, position):
+    tail = int(np.searchsorted(graph.offsets, position, side="right") - 1)
+    return graph.ids[tail], graph.ids[int(graph.targets[position])]
+
+
+def test_lengths_may_not_drop_below_the_straight_line(graph):
+    u, v = _edge(graph, int(np.argmax(graph.weights)))
+    with pytest.raises(ValueError):
+        apply_edge_updates(graph, weights={(u, v): 1.0})
+
+
+def test_travel_time_weights_may_drop_freely(graph):
+    seconds = graph.with_weights(graph.weights / DRIVE_SPEED_MS)
+    u, v = _edge(seconds, int(np.argmax(seconds.weights)))
+    report = apply_edge_updates(seconds, weights={(u, v): 1.0}, cache=RouteCache())
+    assert report["changed_edges"] == 1 and report["graph"].edge_weight(u, v) == 1.0
+
+
+def test_cached_travel_time_routes_stay_shortest_when_an_edge_gets_lighter(graph):
+    seconds = graph.with_weights(graph.weights / DRIVE_SPEED_MS)
+    cache = RouteCache()
+    rng = np.random.default_rng(4)
+    results = {}
+    while len(results) < 20:
+        start, end = (seconds.ids[i] for i in rng.integers(seconds.num_nodes, size=2))
+        results[start, end] = cached_route(seconds, start, end, cache=cache)
+    u, v = _edge(seconds, int(np.argmax(seconds.weights)))
+    updated = apply_edge_updates(seconds, weights={(u, v): 0.5}, cache=cache)["graph"]
+    for start, end in results:
+        again = cached_route(updated, start, end, cache=cache)
+        assert again["distance_m"] == pytest.approx(
+            cached_route(updated, start, end, cache=RouteCache())["distance_m"], rel=1e-9)
+
+
+def test_edges_off_the_location_paths_recompute_nothing(graph):
+    matrix = build_location_matrix(graph, _locations(graph, 10, seed=1), workers=1)
+    sources = np.array([graph.index_of(node) for node in matrix.nodes])
+    on_paths = set().union(*(_tree_path_nodes(tree, sources) for tree in matrix.predecessors))
+    # An edge of the first tree that leads to no location in any tree
+    tree = matrix.predecessors[0]
+    head = next(h for h in range(graph.num_nodes) if tree[h] >= 0 and h not in on_paths)
+    position = int(graph.find_edges(np.array([tree[head]]), np.array([head]))[0])
+    weights = np.array(graph.weights)
+    weights[position] *= 2
+    updated, rows = update_location_matrix(matrix, graph.with_weights(weights), np.array([position]),
+                                           graph.weights[[position]])
+    assert rows == 0
+    assert np.array_equal(updated.distances, matrix.distances)
+
+
+@pytest.mark.parametrize("time_weights", [False, True])
+def test_updated_matrix_matches_a_rebuild(graph, time_weights):
+    if time_weights:
+        graph = graph.with_weights(graph.weights / DRIVE_SPEED_MS)
+    locations = _locations(graph, 12, seed=2)
+    matrix = build_location_matrix(graph, locations, workers=1)
+    rng = np.random.default_rng(9)
+    base = graph.weights
+    for _ in range(5):
+        # Slow down a fresh set of edges; last round's edges revert and get lighter
+        weights = np.array(base)
+        slowed = rng.integers(len(weights), size=30)
+        weights[slowed] *= rng.uniform(1.0, 3.0, size=len(slowed))
+        positions = np.flatnonzero(weights != graph.weights)
+        updated_graph = graph.with_weights(weights)
+        updated, rows = update_location_matrix(matrix, updated_graph, positions, graph.weights[positions],
+                                               straight_line=not time_weights)
+        expected = build_location_matrix(updated_graph, locations, workers=1)
+        assert np.allclose(updated.distances, expected.distances, rtol=1e-9)
+        for start in updated.names:
+            for end in updated.names:
+                path = updated.lookup(start, end)["path"]
+                if path is not None:
+                    assert sum(updated_graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:])) == \
+                        pytest.approx(updated.distance(start, end), rel=1e-9)
+        graph, matrix = updated_graph, updated
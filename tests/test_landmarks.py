@@ -0,0 +1,48 @@
+# tests/test_landmarks.py
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from dijkstra_algorithm import find_route
+from landmarks import LANDMARK_METHODS, build_landmarks
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+def _pairs(graph, count, seed):
+    rng = np.random.default_rng(seed)
+    return [tuple(graph.ids[i] for i in rng.integers(graph.num_nodes, size=2)) for _ in range(count)]
+
+
+def _assert_matches_dijkstra(graph, landmarks, pairs):
+    for start, end in pairs:
+        expected = find_route(graph, start, end, engine="dijkstra")
+        result = landmarks.find_route(graph, start, end)
+        assert result["distance_m"] == pytest.approx(expected["distance_m"], rel=1e-9)
+        if expected["path"] is None:
+            assert result["path"] is None
+            continue
+        path = result["path"]
+        assert path[0] == start and path[-1] == end
+        assert sum(graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:])) == pytest.approx(
+            result["distance_m"], rel=1e-9)
+
+
+@pytest.mark.parametrize("method", LANDMARK_METHODS)
+def test_routes_match_dijkstra(graph, method):
+    _assert_matches_dijkstra(graph, build_landmarks(graph, k=8, method=method), _pairs(graph, 100, seed=1))
+
+
+def test_bounds_stay_admissible_after_slowdowns(graph):
+    landmarks = build_landmarks(graph, k=8)
+    rng = np.random.default_rng(3)
+    weights = np.array(graph.weights)
+    slowed = rng.integers(len(weights), size=200)
+    weights[slowed] *= rng.uniform(1.0, 4.0, size=len(slowed))
+    slower = graph.with_weights(weights)
+    assert landmarks.matches(slower)
+    _assert_matches_dijkstra(slower, landmarks, _pairs(graph, 100, seed=4))
@@ -0,0 +1,82 @@
+# tests/test_network_profiles.py
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from network_profiles import build_multi_profile, publish_profile_graph
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from snapping import SnapIndex, get_snap_index
+
+
+@pytest.fixture
+def profiles():
+    paths = overpass_response_files(CACHE_DIR)
+    return build_multi_profile({name: compact_graph_from_overpass(paths, network_type=name)
+                                for name in ("drive", "walk")})
+
+
+def _closed(graph, edges):
+    weights = np.array(graph.weights)
+    weights[edges] = np.inf
+    return graph.with_weights(weights)
+
+
+def test_profile_graphs_share_topology(profiles):
+    drive, walk = profiles.graph("drive"), profiles.graph("walk")
+    assert drive.targets is walk.targets and drive.road_classes is walk.road_classes
+    assert np.array_equal(np.isfinite(walk.weights), profiles.accessible("walk"))
+
+
+def test_profile_snapping_skips_nodes_without_usable_edges(profiles):
+    graph = profiles.graph("walk")
+    # Close every edge at node 0, so only profile snapping leaves it out
+    start, end = graph.offsets[0], graph.offsets[1]
+    into = np.flatnonzero(graph.targets == 0)
+    closed = _closed(graph, np.concatenate([np.arange(start, end), into]))
+    lat, lon = graph.ys[0], graph.xs[0]
+    assert SnapIndex(closed).nearest_indices([lat], [lon], prefer_largest=False)[0] == 0
+    assert SnapIndex(closed, drop_unusable=True).nearest_indices([lat], [lon], prefer_largest=False)[0] != 0
+
+
+def test_publish_replaces_only_that_profile(profiles):
+    drive, walk = profiles.graph("drive"), profiles.graph("walk")
+    updated = _closed(drive, [0])
+    assert publish_profile_graph(drive, updated)
+    assert profiles.graph("drive") is updated and profiles.topology is updated
+    assert profiles.graph("walk") is walk
+    assert profiles.weights["drive"] is updated.weights
+    assert get_snap_index(updated).indices.tolist() == SnapIndex(updated, drop_unusable=True).indices.tolist()
+    # A graph that was replaced already is no longer published
+    assert not publish_profile_graph(drive, _closed(drive, [1]))
+
+
+def test_publish_ignores_other_graphs(profiles):
+    graph = compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+    assert not publish_profile_graph(graph, _closed(graph, [0]))
+
+
+def test_replace_requires_the_same_topology(profiles):
+    other = compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+    with pytest.raises(ValueError):
+        profiles.replace_profile_graph("drive", other)
+
+
+def test_edge_updates_reach_the_profile(profiles):
+    pytest.importorskip("osmnx")
+    from graph_updates import apply_edge_updates
+
+    drive, walk = profiles.graph("drive"), profiles.graph("walk")
+    walk_weights = np.array(walk.weights)
+    u, v = drive.ids[0], drive.ids[int(drive.targets[drive.offsets[0]])]
+    report = apply_edge_updates(drive, closed=[(u, v)])
+    assert report["changed_edges"] == 1
+    assert profiles.graph("drive") is report["graph"] is not drive
+    assert profiles.graph("drive").edge_weight(u, v) == np.inf
+    assert drive.edge_weight(u, v) < np.inf  # searches holding the old graph keep it
+    assert profiles.graph("walk") is walk
+    assert np.array_equal(profiles.graph("walk").weights, walk_weights)
+
+    report = apply_edge_updates(profiles.graph("walk"), closed=[(u, v)])
+    assert profiles.graph("walk") is report["graph"]
+    assert profiles.graph("walk").edge_weight(u, v) == np.inf
+    assert profiles.graph("drive").edge_weight(u, v) == np.inf
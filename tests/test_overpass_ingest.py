@@ -0,0 +1,49 @@
+# tests/test_overpass_ingest.py
+import numpy as np
+
+from conftest import CACHE_DIR
+from graph_snapshot import load_graph_snapshot, snapshot_path
+from locations_config import CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M
+from overpass_ingest import (
+    bbox_from_point, compact_graph_from_overpass, ingest_cached_overpass, overpass_response_files,
+)
+
+# Inside the area the bundled drive response covers
+BUNDLED_CENTER = (30.675, 76.789)
+BUNDLED_DIST = 2000
+
+
+def test_bundled_cache_holds_an_overpass_response():
+    assert len(overpass_response_files(CACHE_DIR)) == 1
+
+
+def test_compact_graph_from_bundled_response():
+    graph = compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+    assert graph.num_edges > 0
+    assert graph.crs == "epsg:4326"
+    assert np.all(np.isfinite(graph.weights)) and np.all(graph.weights > 0)
+    assert len(graph.road_classes) == graph.num_edges
+    assert 30.64 < graph.ys.min() and graph.ys.max() < 30.71
+    assert 76.75 < graph.xs.min() and graph.xs.max() < 76.83
+
+
+def test_ingest_covered_area():
+    graph = ingest_cached_overpass(BUNDLED_CENTER, BUNDLED_DIST, cache_folder=CACHE_DIR)
+    assert graph is not None and graph.num_edges > 0
+    north, south, east, west = bbox_from_point(BUNDLED_CENTER, BUNDLED_DIST)
+    assert np.all((graph.ys <= north) & (graph.ys >= south))
+    assert np.all((graph.xs <= east) & (graph.xs >= west))
+
+
+def test_ingest_leaves_uncovered_area_to_osmnx():
+    assert ingest_cached_overpass(CHANDIGARH_CENTER, CHANDIGARH_RADIUS_M, cache_folder=CACHE_DIR) is None
+
+
+def test_snapshot_built_from_bundled_cache(tmp_path):
+    graph = load_graph_snapshot(BUNDLED_CENTER, BUNDLED_DIST, snapshot_dir=str(tmp_path),
+                                cache_folder=CACHE_DIR)
+    ingested = ingest_cached_overpass(BUNDLED_CENTER, BUNDLED_DIST, cache_folder=CACHE_DIR)
+    assert graph.version == ingested.version
+    assert np.array_equal(graph.road_classes, ingested.road_classes)
+    assert isinstance(graph.weights, np.memmap)
+    assert (tmp_path / snapshot_path(BUNDLED_CENTER, BUNDLED_DIST, snapshot_dir="")).exists()
@@ -0,0 +1,41 @@
+# tests/test_route_cache.py
+import pytest
+
+from conftest import CACHE_DIR
+from graph_updates import apply_edge_updates
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from route_finder import RouteCache, cached_route
+
+
+@pytest.fixture
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+def _pair(graph):
+    for end in graph.ids[1:]:
+        if graph.can_reach(0, graph.index_of(end)):
+            return graph.ids[0], end
+
+
+def test_results_are_cached_per_engine(graph):
+    cache = RouteCache()
+    start, end = _pair(graph)
+    first = cached_route(graph, start, end, engine="dijkstra", cache=cache)
+    other = cached_route(graph, start, end, engine="astar", cache=cache)
+    assert not first["cached"] and not other["cached"]
+    assert first["engine"] == "dijkstra" and other["engine"] == "astar"
+    again = cached_route(graph, start, end, engine="astar", cache=cache)
+    assert again["cached"] and again["engine"] == "astar"
+    assert again["settled_nodes"] == other["settled_nodes"]
+
+
+def test_cached_routes_follow_edge_updates(graph):
+    cache = RouteCache()
+    start, end = _pair(graph)
+    before = cached_route(graph, start, end, engine="dijkstra", cache=cache)
+    path = before["path"]
+    updated = apply_edge_updates(graph, closed=[(path[0], path[1])], cache=cache)["graph"]
+    after = cached_route(updated, start, end, engine="dijkstra", cache=cache)
+    assert not after["cached"]
+    assert after["path"] is None or after["distance_m"] >= before["distance_m"]
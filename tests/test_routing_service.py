@@ -0,0 +1,79 @@
+# tests/test_routing_service.py
+import asyncio
+import json
+
+import pytest
+
+from conftest import CACHE_DIR
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from routing_service import RoutingService, request
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = RoutingService.in_process(compact_graph_from_overpass(overpass_response_files(CACHE_DIR)))
+    yield service
+    service.close()
+
+
+async def _raw(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    writer.write_eof()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def _serve(service, exchange):
+    async def run():
+        server = await service.serve(port=0)
+        try:
+            return await exchange(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(run())
+
+
+ROUTE = {"origin": [30.675, 76.789], "destination": [30.670, 76.800]}
+
+
+def test_route(service):
+    status, body = _serve(service, lambda port: request("127.0.0.1", port, "POST", "/route", ROUTE))
+    assert status == 200 and body["path"]
+
+
+@pytest.mark.parametrize("engine", ["warp_drive", [], {"name": "dijkstra"}, 3])
+def test_bad_engine(service, engine):
+    status, body = asyncio.run(service.handle("POST", "/route", dict(ROUTE, engine=engine)))
+    assert status == 400 and "engine" in body["error"]
+    status, _ = _serve(service, lambda port: request("127.0.0.1", port, "POST", "/route",
+                                                     dict(ROUTE, engine=engine)))
+    assert status == 400
+
+
+@pytest.mark.parametrize("data", [
+    b"POST /route HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+    b"POST /route HTTP/1.1\r\nContent-Length: -3\r\n\r\n",
+    b"POST /route HTTP/1.1\r\nContent-Length: \xb2\r\n\r\n",
+    b"POST /route HTTP/1.1\r\nContent-Length: 2\r\n\r\n\xff\xfe",
+    b"POST /route HTTP/1.1\r\nContent-Length: 5\r\n\r\n{oops",
+    b"POST /route HTTP/1.1\r\nContent-Length: 2\r\n\r\n[]",
+    b"GARBAGE\r\n\r\n",
+])
+def test_bad_body(service, data):
+    status, body = _serve(service, lambda port: _raw(port, data))
+    assert status == 400 and body["error"]
+
+
+def test_unexpected_error_still_answers(service, monkeypatch):
+    async def broken(method, path, payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "handle", broken)
+    status, body = _serve(service, lambda port: request("127.0.0.1", port, "POST", "/route", ROUTE))
+    assert status == 500 and "boom" in body["error"]
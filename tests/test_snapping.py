@@ -0,0 +1,61 @@
+# tests/test_snapping.py
+import numpy as np
+import pytest
+
+from dijkstra_algorithm import CompactGraph
+from route_finder import nearest_nodes_batch
+from snapping import LARGEST_COMPONENT_SLACK_M, SnapIndex
+
+LAT = 30.70
+# Meters per degree of longitude at LAT
+M_PER_DEG_LON = 111195 * np.cos(np.radians(LAT))
+
+
+def _two_components(gap_m):
+    """
+    A four-node ring (the largest component) and a two-way edge 5 <-> 6
+    whose node 5 lies gap_m east of the ring's easternmost node 4.
+    """
+    edges = [(1, 2), (2, 1), (2, 3), (3, 2), (3, 4), (4, 3), (4, 1), (1, 4), (5, 6), (6, 5)]
+    lons = 76.700 + np.array([0.0, 0.0005, 0.001, 0.0015, 0.0015, 0.002])
+    lons[4:] += gap_m / M_PER_DEG_LON
+    node_ids = np.arange(1, 7)
+    edges.sort()
+    offsets = np.searchsorted([u for u, _ in edges], node_ids, side="left").tolist() + [len(edges)]
+    targets = np.array([v - 1 for _, v in edges], dtype=np.int32)
+    return CompactGraph(node_ids, np.array(offsets), targets, np.full(len(edges), 1000.0),
+                        xs=lons, ys=np.full(6, LAT), crs="epsg:4326")
+
+
+def _snap(graph, **kwargs):
+    # The point sits on node 5, the only node of the small component that is that close
+    return int(SnapIndex(graph).nearest_nodes([LAT], [graph.xs[4]], **kwargs)[0])
+
+
+def test_small_component_is_reachable():
+    graph = _two_components(100)
+    assert graph.can_reach(4, 5) and graph.can_reach(5, 4)
+    assert not graph.can_reach(4, 0)
+
+
+def test_largest_component_wins_within_the_slack():
+    graph = _two_components(LARGEST_COMPONENT_SLACK_M - 50)
+    assert _snap(graph) == 4
+    assert _snap(graph, prefer_largest=False) == 5
+
+
+def test_closer_small_component_wins_beyond_the_slack():
+    graph = _two_components(LARGEST_COMPONENT_SLACK_M + 50)
+    assert _snap(graph) == 5
+
+
+@pytest.mark.parametrize("slack_m, expected", [(0, 5), (150, 5), (250, 4), (1000, 4)])
+def test_slack_is_configurable(slack_m, expected):
+    graph = _two_components(200)
+    assert _snap(graph, slack_m=slack_m) == expected
+    assert nearest_nodes_batch(graph, [LAT], [graph.xs[4]], slack_m=slack_m)[0] == expected
+
+
+def test_negative_slack_is_rejected():
+    with pytest.raises(ValueError):
+        _snap(_two_components(100), slack_m=-1)
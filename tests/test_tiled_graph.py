@@ -0,0 +1,81 @@
+# tests/test_tiled_graph.py
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from dijkstra_algorithm import _straight_line, find_route
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from snapping import get_snap_index
+from tiled_graph import TiledGraph, build_tile_store
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+@pytest.mark.parametrize("tile_size", [0.005, 0.01, 0.02])
+def test_nearest_node_matches_whole_graph_snapping(graph, tile_size, tmp_path):
+    build_tile_store(graph, folder=str(tmp_path), tile_size=tile_size)
+    tiled = TiledGraph(str(tmp_path))
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(graph.ys.min(), graph.ys.max(), 300)
+    lons = rng.uniform(graph.xs.min(), graph.xs.max(), 300)
+    expected = get_snap_index(graph).nearest_nodes(lats, lons, prefer_largest=False)
+
+    for lat, lon, node in zip(lats, lons, expected.tolist()):
+        found = tiled.nearest_node(lat, lon)
+        if found != node:
+            # Only an equally close node may stand in for the expected one
+            i, j = graph.index_of(found), graph.index_of(node)
+            assert _straight_line(graph.xs[i], graph.ys[i], lon, lat, True) == pytest.approx(
+                _straight_line(graph.xs[j], graph.ys[j], lon, lat, True), abs=1e-6)
+
+
+def _cross_tile_pairs(graph, tiled, count, seed):
+    rng = np.random.default_rng(seed)
+    pairs = []
+    while len(pairs) < count:
+        start, end = (graph.ids[i] for i in rng.integers(graph.num_nodes, size=2))
+        if tiled.tile_of(start) != tiled.tile_of(end):
+            pairs.append((start, end))
+    return pairs
+
+
+def test_routes_across_tiles_match_whole_graph_dijkstra(graph, tmp_path):
+    build_tile_store(graph, folder=str(tmp_path), tile_size=0.01)
+    tiled = TiledGraph(str(tmp_path))
+    for start, end in _cross_tile_pairs(graph, tiled, 40, seed=3):
+        expected = find_route(graph, start, end, engine="dijkstra")
+        result = tiled.find_route(start, end)
+        if expected["path"] is None:
+            assert result["path"] is None
+            continue
+        assert result["distance_m"] == pytest.approx(expected["distance_m"], rel=1e-9)
+        path = result["path"]
+        assert path[0] == start and path[-1] == end
+        # The unpacked path is a real path of the whole graph with that length
+        assert sum(graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:])) == pytest.approx(
+            result["distance_m"], rel=1e-9)
+
+
+def test_tiles_load_lazily_and_are_evicted(graph, tmp_path):
+    build_tile_store(graph, folder=str(tmp_path), tile_size=0.005)
+    tiled = TiledGraph(str(tmp_path))
+    assert tiled.stats()["misses"] == 0 and tiled.nbytes() == 0
+
+    tails = np.repeat(np.arange(graph.num_nodes), np.diff(graph.offsets))
+    start, end = next((graph.ids[u], graph.ids[v]) for u, v in zip(tails.tolist(), graph.targets.tolist())
+                      if tiled.tile_of(graph.ids[u]) == tiled.tile_of(graph.ids[v]))
+    result = tiled.find_route(start, end)
+    assert result["tiles"] == [tiled.tile_of(start)]
+    assert tiled.stats()["misses"] <= 2  # the tile and its overlay
+
+    tiled = TiledGraph(str(tmp_path), max_bytes=1)
+    for start, end in _cross_tile_pairs(graph, tiled, 5, seed=5):
+        result = tiled.find_route(start, end)
+        assert len(result["tiles"]) < tiled.stats()["tiles"] or result["path"] is None
+        assert result["distance_m"] == pytest.approx(find_route(graph, start, end)["distance_m"], rel=1e-9)
+    stats = tiled.stats()
+    # With a budget below one tile only the last tile read stays resident
+    assert stats["evictions"] > 0 and stats["entries"] == 1
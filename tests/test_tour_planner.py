@@ -0,0 +1,59 @@
+# tests/test_tour_planner.py
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from snapping import snap_named_locations
+from tour_planner import HELD_KARP_MAX_STOPS, plan_tour, stop_matrix
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+def _locations(graph, count, seed):
+    # Stops on the largest component, so every stop can reach every other
+    candidates = np.flatnonzero(graph.connectivity().in_largest(np.arange(graph.num_nodes)))
+    rng = np.random.default_rng(seed)
+    return {f"stop {i}": (float(graph.ys[node]), float(graph.xs[node]))
+            for i, node in enumerate(rng.choice(candidates, size=count, replace=False).tolist())}
+
+
+def _assert_visits_every_stop(graph, stops, tour, round_trip=False, keep_last=False):
+    order = tour["order"]
+    assert order[0] == stops[0]
+    assert sorted(order[:-1] if round_trip else order) == sorted(stops)
+    if round_trip:
+        assert order[-1] == stops[0]
+    if keep_last:
+        assert order[-1] == stops[-1]
+    assert [(leg["from"], leg["to"]) for leg in tour["legs"]] == list(zip(order[:-1], order[1:]))
+    path = tour["path"]
+    assert sum(graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:])) == pytest.approx(
+        tour["distance_m"], rel=1e-9)
+
+
+@pytest.mark.parametrize("count", [2, 6, HELD_KARP_MAX_STOPS + 5])
+@pytest.mark.parametrize("round_trip, keep_last", [(False, False), (True, False), (False, True)])
+def test_tour_visits_every_stop_once(graph, count, round_trip, keep_last):
+    locations = _locations(graph, count, seed=count)
+    stops = list(locations)
+    tour = plan_tour(graph, stops, round_trip=round_trip, keep_last=keep_last, time_budget_s=0.2,
+                     locations=locations)
+    assert tour["method"] == ("held_karp" if count <= HELD_KARP_MAX_STOPS else "local_search")
+    _assert_visits_every_stop(graph, stops, tour, round_trip=round_trip, keep_last=keep_last)
+
+
+def test_small_round_trip_is_optimal(graph):
+    locations = _locations(graph, 6, seed=1)
+    stops = list(locations)
+    tour = plan_tour(graph, stops, round_trip=True, locations=locations)
+    snapped = snap_named_locations(graph, locations)
+    distances, _ = stop_matrix(graph, [snapped[name] for name in stops])
+    best = min(sum(distances[a, b] for a, b in zip((0,) + rest, rest + (0,)))
+               for rest in permutations(range(1, len(stops))))
+    assert tour["optimal"] and tour["distance_m"] == pytest.approx(best, rel=1e-9)
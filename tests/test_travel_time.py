@@ -0,0 +1,87 @@
+# tests/test_travel_time.py
+import numpy as np
+import pytest
+
+from conftest import CACHE_DIR
+from dijkstra_algorithm import CompactGraph
+from graph_updates import apply_edge_updates
+from network_profiles import build_multi_profile
+from overpass_ingest import compact_graph_from_overpass, overpass_response_files
+from travel_time import (
+    SLOT_SECONDS, SLOTS_PER_DAY, SpeedProfiles, build_speed_profiles, fastest_route, get_speed_profiles,
+)
+
+MORNING_PEAK_S = 9 * 3600
+
+
+@pytest.fixture
+def graph():
+    return compact_graph_from_overpass(overpass_response_files(CACHE_DIR))
+
+
+def _long_route(graph, profiles):
+    rng = np.random.default_rng(11)
+    while True:
+        start, end = (graph.ids[i] for i in rng.integers(graph.num_nodes, size=2))
+        result = fastest_route(graph, start, end, MORNING_PEAK_S, profiles=profiles)
+        if result["path"] is not None and len(result["path"]) > 10:
+            return start, end, result
+
+
+def test_fastest_route_around_a_closed_edge(graph):
+    start, end, before = _long_route(graph, get_speed_profiles(graph))
+    path = before["path"]
+    u, v = path[len(path) // 2], path[len(path) // 2 + 1]
+    # The speed profiles are carried over onto the closed graph
+    closed = apply_edge_updates(graph, closed=[(u, v)])["graph"]
+    after = fastest_route(closed, start, end, MORNING_PEAK_S)
+    if after["path"] is not None:
+        assert (u, v) not in set(zip(after["path"][:-1], after["path"][1:]))
+        assert after["travel_time_s"] >= before["travel_time_s"]
+        assert np.isfinite(after["travel_time_s"])
+
+
+def test_profile_graph_skips_edges_it_may_not_use(graph):
+    paths = overpass_response_files(CACHE_DIR)
+    profiles = build_multi_profile({"drive": graph,
+                                    "walk": compact_graph_from_overpass(paths, network_type="walk")})
+    drive = profiles.graph("drive")
+    assert not np.all(np.isfinite(drive.weights))
+    rng = np.random.default_rng(2)
+    plain_profiles, drive_profiles = build_speed_profiles(graph), build_speed_profiles(drive)
+    for _ in range(10):
+        start, end = (graph.ids[i] for i in rng.integers(graph.num_nodes, size=2))
+        expected = fastest_route(graph, start, end, MORNING_PEAK_S, profiles=plain_profiles)
+        result = fastest_route(drive, start, end, MORNING_PEAK_S, profiles=drive_profiles)
+        assert result["travel_time_s"] == pytest.approx(expected["travel_time_s"], rel=1e-9)
+
+
+def _single_edge(length_m, speeds_kmh):
+    graph = CompactGraph(np.array([1, 2]), np.array([0, 1, 1]), np.array([1], dtype=np.int32),
+                         np.array([length_m]), xs=np.array([76.70, 76.71]), ys=np.array([30.70, 30.70]),
+                         crs="epsg:4326")
+    return graph, SpeedProfiles(graph, np.asarray(speeds_kmh, dtype=np.float32).reshape(1, SLOTS_PER_DAY))
+
+
+def _drive_slot_by_slot(length_m, speeds_kmh, depart_s):
+    now, left = depart_s, length_m
+    while True:
+        speed = speeds_kmh[int(now // SLOT_SECONDS) % SLOTS_PER_DAY] / 3.6
+        slot_end = (now // SLOT_SECONDS + 1) * SLOT_SECONDS
+        if now + left / speed <= slot_end:
+            return now + left / speed
+        left -= (slot_end - now) * speed
+        now = slot_end
+
+
+@pytest.mark.parametrize("speeds_kmh", [
+    np.full(SLOTS_PER_DAY, 1.0),
+    np.where(np.arange(SLOTS_PER_DAY) % 7 == 0, 0.5, 2.0),
+])
+def test_edges_longer_than_a_day(speeds_kmh):
+    # 100 km at walking pace or slower spans several days of slots
+    graph, profiles = _single_edge(100000.0, speeds_kmh)
+    result = fastest_route(graph, 1, 2, 1234.0, profiles=profiles)
+    assert result["path"] == [1, 2]
+    # Slot costs are float32 speeds, good to about 1e-7
+    assert result["arrival_s"] == pytest.approx(_drive_slot_by_slot(100000.0, speeds_kmh, 1234.0), rel=1e-6)
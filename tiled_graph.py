@@ -0,0 +1,480 @@
+# tiled_graph.py
+"""
+Road network split into geographic tiles that are loaded lazily for routing.
+
+The network is cut into square tiles of TILE_SIZE_DEG degrees (TILE_SIZE_M
+meters for projected graphs). Every tile is written to the tile store as
+two graph_snapshot files:
+
+    tile_<row>_<col>.bin     the tile's nodes and the edges between them
+    overlay_<row>_<col>.bin  its boundary table: the shortest distance
+                             inside the tile from every entry node (head
+                             of an edge coming in from another tile) to
+                             every exit node (tail of an edge leaving it),
+                             plus the edges that leave the tile
+
+A query reads the full tiles of its two endpoints and runs A* over those
+plus the overlays of the tiles the search passes through, which are a few
+hundred edges each. Any shortest path splits into stretches inside one
+tile joined by crossing edges, and every stretch through an intermediate
+tile is one overlay edge of exactly its length, so the search finds the
+distance routing on the whole graph finds. Overlay edges on the result are
+expanded afterwards by a search inside their tile.
+
+Tiles the search never reaches are never read, and loaded ones live in a
+GraphRegistry with its own memory budget, evicted least-recently-used
+first. Node ids and strongly connected components (which reject
+unreachable pairs before any tile is read) sit in memory-mapped tables, so
+resident memory depends on the query corridor and the budget, not on the
+area the store covers.
+"""
+import heapq
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from connectivity import Connectivity
+from dijkstra_algorithm import (
+    CompactGraph, _dijkstra_search, _straight_line, get_compact_graph, is_geographic, straight_line_to_point,
+)
+from graph_registry import GraphRegistry, graph_registry
+from graph_snapshot import load_graph_snapshot, read_snapshot, write_snapshot
+from locations_config import TRICITY_CENTER, TRICITY_RADIUS_M
+from overpass_ingest import _gather_ranges
+from snapping import get_snap_index
+
+TILE_STORE_DIR = "tiles"
+# ~5.5 x 4.8 km at Chandigarh's latitude
+TILE_SIZE_DEG = 0.05
+TILE_SIZE_M = 5000
+DEFAULT_TILE_BUDGET = 64 * 1024 * 1024  # bytes
+
+# Python-side footprint of a loaded tile on top of its arrays: the id
+# lookup dict per node and the adjacency lists per edge
+_PY_BYTES_PER_NODE = 120
+_PY_BYTES_PER_EDGE = 70
+
+_COMPONENT_ARRAYS = ("labels", "dag_offsets", "dag_targets", "sizes", "closure")
+
+
+def _tile_file(folder, kind, tile):
+    return os.path.join(folder, f"{kind}_{tile[0]}_{tile[1]}.bin")
+
+
+def _csr_positions(tails, heads, num_nodes):
+    """Order that sorts edges by (tail, head) and the CSR offsets of the result."""
+    order = np.lexsort((heads, tails))
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=num_nodes), out=offsets[1:])
+    return order, offsets
+
+
+def _boundary_table(tile_graph, entries, exits):
+    """
+    Shortest in-tile distances from entry to exit nodes (local indices).
+
+    Returns:
+        (tails, heads, weights) of the finite entry -> exit pairs
+    """
+    if len(entries) == 0 or len(exits) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+    m = tile_graph.num_nodes
+    finite = np.isfinite(tile_graph.weights)
+    sources = np.repeat(np.arange(m, dtype=np.int64), np.diff(tile_graph.offsets))[finite]
+    matrix = csr_matrix((tile_graph.weights[finite], (sources, tile_graph.targets[finite])), shape=(m, m))
+    distances = dijkstra(matrix, indices=entries)[:, exits]
+    rows, columns = np.nonzero(np.isfinite(distances) & (entries[:, None] != exits[None, :]))
+    return entries[rows], exits[columns], distances[rows, columns]
+
+
+def build_tile_store(G, folder=TILE_STORE_DIR, tile_size=None):
+    """
+    Split G into tiles and write the tile store.
+
+    Args:
+        G: NetworkX graph or CompactGraph with node coordinates and integer ids
+        folder: Destination directory; tiles of an earlier build are removed
+        tile_size: Tile edge in the graph's coordinate units; defaults to
+            TILE_SIZE_DEG for lat/lon graphs and TILE_SIZE_M otherwise
+
+    Returns:
+        Manifest dict (also written to folder/manifest.json)
+    """
+    graph = get_compact_graph(G)
+    if graph.xs is None or graph.ys is None:
+        raise ValueError("Tiling needs node coordinates")
+    if graph.node_ids.dtype == object:
+        raise ValueError("The tile store requires integer node ids")
+    geographic = is_geographic(graph)
+    if tile_size is None:
+        tile_size = TILE_SIZE_DEG if geographic else TILE_SIZE_M
+    if not tile_size > 0:
+        raise ValueError("tile_size must be positive")
+
+    n = graph.num_nodes
+    cells = np.column_stack([np.floor(graph.ys / tile_size), np.floor(graph.xs / tile_size)]).astype(np.int64)
+    tiles, node_tile = np.unique(cells, axis=0, return_inverse=True)
+    node_tile = node_tile.ravel()
+    # Tiles partition the nodes; each keeps them in their global order
+    node_order = np.argsort(node_tile, kind="stable")
+    node_starts = np.zeros(len(tiles) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(node_tile, minlength=len(tiles)), out=node_starts[1:])
+    local = np.empty(n, dtype=np.int64)
+    local[node_order] = np.arange(n) - node_starts[node_tile[node_order]]
+
+    sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.offsets))
+    heads = graph.targets.astype(np.int64)
+    tail_tile, head_tile = node_tile[sources], node_tile[heads]
+    edge_order = np.argsort(tail_tile, kind="stable")
+    edge_starts = np.zeros(len(tiles) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tail_tile, minlength=len(tiles)), out=edge_starts[1:])
+    crossing = np.flatnonzero(tail_tile != head_tile)
+    incoming = crossing[np.argsort(head_tile[crossing], kind="stable")]
+    incoming_starts = np.zeros(len(tiles) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(head_tile[crossing], minlength=len(tiles)), out=incoming_starts[1:])
+
+    os.makedirs(folder, exist_ok=True)
+    for name in os.listdir(folder):
+        if name.endswith(".bin") and name.startswith(("tile_", "overlay_")):
+            os.remove(os.path.join(folder, name))
+
+    entries_manifest = []
+    for t, (row, col) in enumerate(tiles.tolist()):
+        nodes = node_order[node_starts[t]:node_starts[t + 1]]
+        edges = edge_order[edge_starts[t]:edge_starts[t + 1]]
+        inner = edges[head_tile[edges] == t]
+        leaving = edges[head_tile[edges] != t]
+
+        # Edges come in CSR order and local indices keep the node order, so rows stay sorted
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(local[sources[inner]], minlength=len(nodes)), out=offsets[1:])
+        geometry_offsets = geometry_xy = None
+        if graph.geometry_offsets is not None:
+            geometry_offsets, flat = _gather_ranges(graph.geometry_offsets, inner)
+            geometry_xy = graph.geometry_xy[flat]
+        tile_graph = CompactGraph(
+            graph.node_ids[nodes], offsets, local[heads[inner]].astype(np.int32), graph.weights[inner],
+            xs=graph.xs[nodes], ys=graph.ys[nodes], crs=graph.crs,
+            geometry_offsets=geometry_offsets, geometry_xy=geometry_xy,
+        )
+
+        entries = np.unique(local[heads[incoming[incoming_starts[t]:incoming_starts[t + 1]]]])
+        exits = np.unique(local[sources[leaving]])
+        table_tails, table_heads, table_weights = _boundary_table(tile_graph, entries, exits)
+
+        # Overlay nodes: the tile's boundary nodes, then the heads of the leaving edges
+        boundary = np.union1d(entries, exits)
+        foreign = np.unique(heads[leaving])
+        overlay_nodes = np.concatenate([nodes[boundary], foreign])
+        tails = np.concatenate([np.searchsorted(boundary, table_tails),
+                                np.searchsorted(boundary, local[sources[leaving]])])
+        head_index = np.concatenate([np.searchsorted(boundary, table_heads),
+                                     len(boundary) + np.searchsorted(foreign, heads[leaving])])
+        weights = np.concatenate([table_weights, graph.weights[leaving]])
+        order, overlay_offsets = _csr_positions(tails, head_index, len(overlay_nodes))
+        overlay = CompactGraph(
+            graph.node_ids[overlay_nodes], overlay_offsets, head_index[order].astype(np.int32), weights[order],
+            xs=graph.xs[overlay_nodes], ys=graph.ys[overlay_nodes], crs=graph.crs,
+        )
+
+        write_snapshot(tile_graph, _tile_file(folder, "tile", (row, col)),
+                       params={"tile": [row, col], "tile_size": tile_size})
+        write_snapshot(overlay, _tile_file(folder, "overlay", (row, col)),
+                       params={"tile": [row, col], "tile_size": tile_size, "num_boundary": len(boundary)})
+        entries_manifest.append({
+            "tile": [row, col],
+            "nodes": len(nodes),
+            "edges": len(inner),
+            "boundary_nodes": len(boundary),
+            "overlay_edges": len(weights),
+        })
+
+    # Node tables are indexed by position in sorted id order
+    id_order = np.argsort(graph.node_ids, kind="stable")
+    np.save(os.path.join(folder, "node_ids.npy"), graph.node_ids[id_order].astype("<i8"))
+    np.save(os.path.join(folder, "node_tiles.npy"), node_tile[id_order].astype("<i4"))
+    components = graph.connectivity().arrays()
+    components["labels"] = components["labels"][id_order]
+    for name in _COMPONENT_ARRAYS:
+        path = os.path.join(folder, f"components_{name}.npy")
+        if name in components:
+            np.save(path, components[name])
+        elif os.path.exists(path):
+            os.remove(path)
+    manifest = {
+        "tile_size": tile_size,
+        "geographic": geographic,
+        "crs": str(graph.crs) if graph.crs is not None else None,
+        "graph_version": graph.version,
+        "num_nodes": n,
+        "num_edges": graph.num_edges,
+        "crossing_edges": len(crossing),
+        "tiles": entries_manifest,
+    }
+    tmp_path = os.path.join(folder, "manifest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(folder, "manifest.json"))
+    return manifest
+
+
+class _Tile:
+    """
+    A loaded tile or overlay with the per-node lookups the search reads.
+
+    head_tiles[k - num_boundary] is the tile of overlay node k for the
+    nodes past the boundary (heads of leaving edges); None for full tiles.
+    """
+
+    def __init__(self, graph, num_boundary=None, head_tiles=None):
+        self.graph = graph
+        self.num_boundary = num_boundary
+        self.head_tiles = head_tiles
+        self.ids = graph.ids
+        self.index = graph.node_index
+        self.offsets, self.targets, self.weights = graph.adjacency()
+
+    def nbytes(self):
+        return (self.graph.nbytes() + _PY_BYTES_PER_NODE * self.graph.num_nodes
+                + _PY_BYTES_PER_EDGE * self.graph.num_edges)
+
+
+class TiledGraph:
+    """
+    Router over a tile store written by build_tile_store.
+
+    Args:
+        folder: Tile store directory
+        max_bytes: Memory budget of the resident tile LRU
+    """
+
+    def __init__(self, folder=TILE_STORE_DIR, max_bytes=DEFAULT_TILE_BUDGET):
+        with open(os.path.join(folder, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.folder = folder
+        self.tile_size = manifest["tile_size"]
+        self.geographic = manifest["geographic"]
+        self.crs = manifest["crs"]
+        self.version = manifest["graph_version"]
+        self.num_nodes = manifest["num_nodes"]
+        self.num_edges = manifest["num_edges"]
+        self.tiles = [tuple(entry["tile"]) for entry in manifest["tiles"]]
+        self.tile_info = {tile: entry for tile, entry in zip(self.tiles, manifest["tiles"])}
+        self._node_ids = np.load(os.path.join(folder, "node_ids.npy"), mmap_mode="r")
+        self._node_tiles = np.load(os.path.join(folder, "node_tiles.npy"), mmap_mode="r")
+        components = {}
+        for name in _COMPONENT_ARRAYS:
+            path = os.path.join(folder, f"components_{name}.npy")
+            if os.path.exists(path):
+                components[name] = np.load(path, mmap_mode="r")
+        self.connectivity = Connectivity.from_arrays(**components)
+        rows = [tile[0] for tile in self.tiles]
+        cols = [tile[1] for tile in self.tiles]
+        self._extent = (min(rows), max(rows), min(cols), max(cols))
+        self.resident = GraphRegistry(max_bytes=max_bytes)
+
+    def nbytes(self):
+        """Memory of the resident tiles (the node table is memory-mapped)."""
+        return self.resident.stats()["resident_bytes"]
+
+    def stats(self):
+        """Tile LRU counters (see GraphRegistry.stats) plus the number of tiles in the store."""
+        return dict(self.resident.stats(), tiles=len(self.tiles))
+
+    def _position(self, node):
+        """Row of an original node id in the node tables."""
+        position = int(np.searchsorted(self._node_ids, node))
+        if position == len(self._node_ids) or self._node_ids[position] != node:
+            raise ValueError(f"Node {node} is not in the tile store")
+        return position
+
+    def tile_of(self, node):
+        """(row, col) of the tile holding an original node id."""
+        return self.tiles[int(self._node_tiles[self._position(node)])]
+
+    def can_reach(self, start, end):
+        """Whether end is reachable from start (original node ids), without reading any tile."""
+        return self.connectivity.can_reach(self._position(start), self._position(end))
+
+    def tile_of_point(self, y, x):
+        """(row, col) of the tile containing a point in the store's coordinates (lat, lon for lat/lon stores)."""
+        return math.floor(y / self.tile_size), math.floor(x / self.tile_size)
+
+    def _load(self, kind, tile):
+        graph, header = read_snapshot(_tile_file(self.folder, kind, tile))
+        if kind == "tile":
+            return _Tile(graph)
+        num_boundary = header["params"]["num_boundary"]
+        rows = np.floor(graph.ys[num_boundary:] / self.tile_size).astype(np.int64).tolist()
+        cols = np.floor(graph.xs[num_boundary:] / self.tile_size).astype(np.int64).tolist()
+        return _Tile(graph, num_boundary, list(zip(rows, cols)))
+
+    def _tile(self, kind, tile):
+        return self.resident.get((kind, tile), lambda: self._load(kind, tile))
+
+    def tile_graph(self, tile):
+        """CompactGraph of one tile (its nodes and the edges between them)."""
+        return self._tile("tile", tile).graph
+
+    def _gap(self, tile, lat, lon):
+        """Lower bound on the distance from a point to anything in tile."""
+        south, west = tile[0] * self.tile_size, tile[1] * self.tile_size
+        near_y = min(max(lat, south), south + self.tile_size)
+        near_x = min(max(lon, west), west + self.tile_size)
+        # The clamped corner is only nearly the closest point of the box on a sphere
+        return 0.99 * float(_straight_line(lon, lat, near_x, near_y, self.geographic))
+
+    def nearest_node(self, lat, lon):
+        """
+        Node id nearest to a point.
+
+        Reads the point's tile, then rings of tiles around it until no
+        unread tile can hold a closer node.
+        """
+        row, col = self.tile_of_point(lat, lon)
+        min_row, max_row, min_col, max_col = self._extent
+        reach = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+        best = None
+        for radius in range(reach + 1):
+            ring = [(row + dr, col + dc) for dr in range(-radius, radius + 1) for dc in range(-radius, radius + 1)
+                    if max(abs(dr), abs(dc)) == radius]
+            gaps = sorted((self._gap(tile, lat, lon), tile) for tile in ring)
+            if best is not None and gaps[0][0] >= best[0]:
+                break
+            for gap, tile in gaps:
+                if tile not in self.tile_info or (best is not None and gap >= best[0]):
+                    continue
+                graph = self.tile_graph(tile)
+                i = int(get_snap_index(graph).nearest_indices([lat], [lon], prefer_largest=False)[0])
+                distance = float(_straight_line(graph.xs[i], graph.ys[i], lon, lat, self.geographic))
+                if best is None or distance < best[0]:
+                    best = (distance, graph.ids[i])
+        return best[1]
+
+    def find_route(self, start, end):
+        """
+        Shortest route between two node ids of the store.
+
+        Unreachable pairs are answered from the component tables without
+        reading a tile.
+
+        Returns:
+            dict with path (None if unreachable), distance_m, settled_nodes,
+            engine ("tiled") and tiles (the tiles read, sorted)
+        """
+        if not self.can_reach(start, end):
+            return {"path": None, "distance_m": float('inf'), "settled_nodes": 0, "engine": "tiled", "tiles": []}
+        source_tile, target_tile = self.tile_of(start), self.tile_of(end)
+        target = self._tile("tile", target_tile)
+        j = target.index[end]
+        tx, ty = float(target.graph.xs[j]), float(target.graph.ys[j])
+        full = {source_tile, target_tile}
+        views = {}
+        bounds = {}
+
+        def view(tile):
+            """(loaded tile, first head index used, first head index in another tile) to expand a node of tile."""
+            if tile not in views:
+                overlay = self._tile("overlay", tile)
+                if tile in full:
+                    # Real edges inside the tile, and only the leaving edges of its overlay
+                    views[tile] = [(self._tile("tile", tile), 0, None),
+                                   (overlay, overlay.num_boundary, overlay.num_boundary)]
+                else:
+                    views[tile] = [(overlay, 0, overlay.num_boundary)]
+            return views[tile]
+
+        dist = {start: 0.0}
+        pred = {start: None}  # node -> (previous node, edge weight, tile to expand the edge in or None)
+        node_tile = {start: source_tile}
+        settled = set()
+        pq = [(0.0, start)]
+
+        while pq:
+            _, u = heapq.heappop(pq)
+            if u in settled:
+                continue
+            settled.add(u)
+            if u == end:
+                break
+            d = dist[u]
+            tile = node_tile[u]
+            for loaded, first, foreign_from in view(tile):
+                i = loaded.index.get(u)
+                if i is None:
+                    continue
+                h = bounds.get(id(loaded))
+                if h is None:
+                    h = bounds[id(loaded)] = straight_line_to_point(loaded.graph, tx, ty).tolist()
+                ids, targets, weights = loaded.ids, loaded.targets, loaded.weights
+                for e in range(loaded.offsets[i], loaded.offsets[i + 1]):
+                    k = targets[e]
+                    if k < first:
+                        continue
+                    v = ids[k]
+                    if v in settled:
+                        continue
+                    new_dist = d + weights[e]
+                    if new_dist < dist.get(v, float('inf')):
+                        dist[v] = new_dist
+                        if foreign_from is not None and k >= foreign_from:
+                            node_tile[v] = loaded.head_tiles[k - foreign_from]
+                            pred[v] = (u, weights[e], None)
+                        else:
+                            node_tile[v] = tile
+                            pred[v] = (u, weights[e], tile if loaded.num_boundary is not None else None)
+                        heapq.heappush(pq, (new_dist + h[k], v))
+
+        settled_count = len(settled)
+        touched = set(views)
+        hops = []
+        v = end
+        while pred[v] is not None:
+            u, weight, via = pred[v]
+            hops.append((u, v, weight, via))
+            v = u
+        path, edge_weights = [start], []
+        for u, v, weight, via in reversed(hops):
+            if via is None:
+                path.append(v)
+                edge_weights.append(weight)
+                continue
+            # Overlay edge: the shortest path inside its tile has exactly this length
+            inner = self._tile("tile", via)
+            segment, _, count = _dijkstra_search(inner.graph, inner.index[u], inner.index[v])
+            settled_count += count
+            touched.add(via)
+            path.extend(segment[1:])
+            edge_weights.extend(inner.graph.edge_weight(a, b) for a, b in zip(segment[:-1], segment[1:]))
+        # Summed edge by edge in path order, as a search over the whole graph does
+        distance = 0.0
+        for weight in edge_weights:
+            distance += weight
+        return {
+            "path": path,
+            "distance_m": distance,
+            "settled_nodes": settled_count,
+            "engine": "tiled",
+            "tiles": sorted(touched),
+        }
+
+
+def get_tiled_graph(folder=TILE_STORE_DIR, max_bytes=DEFAULT_TILE_BUDGET):
+    """TiledGraph for a tile store, opened once per process and kept in the graph_registry."""
+    key = ("tiles", os.path.abspath(folder), max_bytes)
+    return graph_registry.get(key, lambda: TiledGraph(folder, max_bytes=max_bytes))
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else TILE_STORE_DIR
+    graph = load_graph_snapshot(TRICITY_CENTER, dist=TRICITY_RADIUS_M, network_type="drive", simplify=True)
+    manifest = build_tile_store(graph, folder)
+    boundary = sum(entry["boundary_nodes"] for entry in manifest["tiles"])
+    print(f"{manifest['num_nodes']} nodes, {manifest['num_edges']} edges -> {len(manifest['tiles'])} tiles "
+          f"({boundary} boundary nodes, {manifest['crossing_edges']} crossing edges) in {folder}/")
@@ -0,0 +1,239 @@
+# tour_planner.py
+"""
+Multi-stop tours through named locations.
+
+The stop-to-stop matrix comes from one one-to-many search per stop, which
+also keeps that stop's shortest-path tree so the legs of the final tour
+are stitched together without searching again. Visiting order is solved
+exactly with Held-Karp dynamic programming for up to HELD_KARP_MAX_STOPS
+stops, and with nearest-neighbour construction improved by 2-opt and
+Or-opt moves under a time budget beyond that.
+
+Every variant is a path with a fixed first and last position: a round
+trip ends at the start again, keep_last ends at the last given stop, and
+an open tour ends at a zero-cost dummy stop that every stop can reach.
+"""
+import time
+
+import numpy as np
+
+from dijkstra_algorithm import _reconstruct_path, _shortest_path_tree, get_compact_graph
+from locations_config import CHANDIGARH_LOCATIONS
+from route_finder import get_route_statistics
+from snapping import snap_named_locations
+
+HELD_KARP_MAX_STOPS = 13
+DEFAULT_TIME_BUDGET_S = 1.0
+
+# Stands in for inf in the heuristic so that cost deltas stay finite
+_UNREACHABLE = 1e15
+
+
+def stop_matrix(G, nodes):
+    """
+    Road distances between every pair of stops.
+
+    Returns:
+        (distances, predecessors): (N, N) float64 matrix (inf where
+        unreachable) and one predecessor list per stop, valid for the paths
+        to the other stops
+    """
+    graph = get_compact_graph(G)
+    indices = [graph.index_of(node) for node in nodes]
+    distances = np.empty((len(indices), len(indices)), dtype=np.float64)
+    predecessors = []
+    for i, source in enumerate(indices):
+        row, tree = _shortest_path_tree(graph, source, stop_at=indices)
+        distances[i] = [row[j] for j in indices]
+        predecessors.append(tree)
+    return distances, predecessors
+
+
+def _held_karp(cost, start, end, middle):
+    """
+    Exact cheapest order of middle between fixed start and end.
+
+    Vectorized over the last stop of each subset, so the Python loop runs
+    once per subset (2 ** len(middle)).
+
+    Returns:
+        (order of middle, total cost)
+    """
+    m = len(middle)
+    if m == 0:
+        return [], cost[start, end]
+    inner = cost[np.ix_(middle, middle)]
+    bits = np.arange(m)
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int16)
+    dp[1 << bits, bits] = cost[start, middle]
+
+    for mask in range(1, 1 << m):
+        members = np.flatnonzero((mask >> bits) & 1)
+        if len(members) < 2:
+            continue
+        previous = mask ^ (1 << members)
+        # candidates[r, k]: reach subset previous[r] ending at k, then go k -> members[r]
+        candidates = dp[previous] + inner[:, members].T
+        best = candidates.argmin(axis=1)
+        dp[mask, members] = candidates[np.arange(len(members)), best]
+        parent[mask, members] = best
+
+    full = (1 << m) - 1
+    totals = dp[full] + cost[middle, end]
+    last = int(totals.argmin())
+    total = float(totals[last])
+
+    order, mask = [], full
+    while last != -1:
+        order.append(middle[last])
+        mask, last = mask ^ (1 << last), int(parent[mask, last])
+    order.reverse()
+    return order, total
+
+
+def _nearest_neighbour(cost, start, middle):
+    order, current, remaining = [], start, set(middle)
+    while remaining:
+        current = min(remaining, key=lambda j: cost[current][j])
+        order.append(current)
+        remaining.discard(current)
+    return order
+
+
+def _prefix_costs(cost, seq):
+    """Prefix sums of seq's edge costs driven forwards and backwards."""
+    forward, backward = [0.0], [0.0]
+    for a, b in zip(seq[:-1], seq[1:]):
+        forward.append(forward[-1] + cost[a][b])
+        backward.append(backward[-1] + cost[b][a])
+    return forward, backward
+
+
+def _two_opt_move(cost, seq):
+    """Apply the first improving segment reversal; returns True if one was found."""
+    forward, backward = _prefix_costs(cost, seq)
+    last = len(seq) - 2
+    for i in range(1, last):
+        a, si = seq[i - 1], seq[i]
+        for k in range(i + 1, last + 1):
+            sk, b = seq[k], seq[k + 1]
+            # Distances may be asymmetric (one-way streets), so the reversed
+            # segment is priced driving it backwards
+            old = cost[a][si] + forward[k] - forward[i] + cost[sk][b]
+            new = cost[a][sk] + backward[k] - backward[i] + cost[si][b]
+            if new < old - 1e-9:
+                seq[i:k + 1] = seq[i:k + 1][::-1]
+                return True
+    return False
+
+
+def _or_opt_move(cost, seq):
+    """Apply the first improving move of a 1-3 stop segment; returns True if one was found."""
+    last = len(seq) - 2
+    for length in (1, 2, 3):
+        for i in range(1, last - length + 2):
+            j = i + length - 1
+            a, si, sj, b = seq[i - 1], seq[i], seq[j], seq[j + 1]
+            removed = cost[a][si] + cost[sj][b] - cost[a][b]
+            for p in range(len(seq) - 1):
+                if i - 1 <= p <= j:
+                    continue
+                x, y = seq[p], seq[p + 1]
+                if cost[x][si] + cost[sj][y] - cost[x][y] < removed - 1e-9:
+                    segment = seq[i:j + 1]
+                    rest = seq[:i] + seq[j + 1:]
+                    at = p + 1 if p < i else p + 1 - length
+                    seq[:] = rest[:at] + segment + rest[at:]
+                    return True
+    return False
+
+
+def _local_search(cost, start, end, middle, time_budget_s):
+    """
+    Nearest neighbour, then 2-opt and Or-opt until no move helps or time runs out.
+
+    Returns:
+        (order of middle, total cost)
+    """
+    cost = np.where(np.isfinite(cost), cost, _UNREACHABLE).tolist()
+    seq = [start] + _nearest_neighbour(cost, start, middle) + [end]
+    deadline = time.perf_counter() + time_budget_s
+    while time.perf_counter() < deadline:
+        if not (_two_opt_move(cost, seq) or _or_opt_move(cost, seq)):
+            break
+    total = sum(cost[a][b] for a, b in zip(seq[:-1], seq[1:]))
+    return seq[1:-1], (total if total < _UNREACHABLE else float("inf"))
+
+
+def plan_tour(G, stops, round_trip=False, keep_last=False, time_budget_s=DEFAULT_TIME_BUDGET_S,
+              locations=CHANDIGARH_LOCATIONS):
+    """
+    Shortest tour visiting every stop once, starting at the first.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        stops: Location names from locations, in any order but the first
+        round_trip: Return to the first stop at the end
+        keep_last: End at the last given stop (ignored for round trips)
+        time_budget_s: Time allowed for the heuristic on larger tours
+
+    Returns:
+        dict with order (stop names), path (stitched node ids), distance_m,
+        legs (from, to, path and get_route_statistics stats per leg),
+        method ("held_karp" or "local_search") and optimal
+    """
+    if len(stops) < 2:
+        raise ValueError("A tour needs at least two stops")
+    if len(set(stops)) != len(stops):
+        raise ValueError("Each stop may appear only once")
+    unknown = [name for name in stops if name not in locations]
+    if unknown:
+        raise ValueError(f"Unknown location(s): {', '.join(unknown)}")
+
+    graph = get_compact_graph(G)
+    snapped = snap_named_locations(graph, locations)
+    nodes = [snapped[name] for name in stops]
+    distances, predecessors = stop_matrix(graph, nodes)
+
+    n = len(stops)
+    # Extra row/column n is the dummy end of an open tour: free to reach, never left
+    cost = np.full((n + 1, n + 1), np.inf)
+    cost[:n, :n] = distances
+    cost[:n, n] = 0.0
+    if round_trip:
+        end, middle = 0, list(range(1, n))
+    elif keep_last:
+        end, middle = n - 1, list(range(1, n - 1))
+    else:
+        end, middle = n, list(range(1, n))
+
+    if len(middle) + 1 <= HELD_KARP_MAX_STOPS:
+        order, total = _held_karp(cost, 0, end, middle)
+        method = "held_karp"
+    else:
+        order, total = _local_search(cost, 0, end, middle, time_budget_s)
+        method = "local_search"
+    if not np.isfinite(total):
+        raise ValueError("Some stops cannot reach each other on the road network")
+
+    visit = [0] + order + ([end] if end != n else [])
+    path, legs = [], []
+    for a, b in zip(visit[:-1], visit[1:]):
+        leg = _reconstruct_path(graph.ids, predecessors[a], graph.index_of(nodes[b]))
+        legs.append({
+            "from": stops[a],
+            "to": stops[b],
+            "path": leg,
+            "stats": get_route_statistics(G, leg),
+        })
+        path.extend(leg if not path else leg[1:])
+
+    return {
+        "order": [stops[i] for i in visit],
+        "path": path,
+        "distance_m": sum(leg["stats"]["distance_m"] for leg in legs),
+        "legs": legs,
+        "method": method,
+        "optimal": method == "held_karp",
+    }
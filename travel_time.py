@@ -0,0 +1,376 @@
+# travel_time.py
+"""
+Time-dependent travel-time routing.
+
+Every edge of a CompactGraph gets a speed profile of SLOTS_PER_DAY
+fifteen-minute slots, derived from its osmnx 'maxspeed'/'highway' tags (or
+the road_classes a snapshot keeps of them) and a congestion curve for its
+road class (optionally overridden per edge).
+The profiles are one float32 matrix of shape (num_edges, SLOTS_PER_DAY)
+in km/h, aligned with the graph's CSR edge order.
+
+The search is Dijkstra / A* over arrival times: leaving node u at time t,
+an edge is driven at the speed of the slot t falls in, switching speed when
+the drive crosses into the next slot. Because a later departure can never
+arrive earlier under this model (FIFO), label-setting search stays exact.
+"""
+import heapq
+import math
+import re
+from datetime import datetime, time as dt_time
+
+import numpy as np
+
+from dijkstra_algorithm import (
+    ROAD_CLASSES, CompactGraph, _reconstruct_path, get_compact_graph, straight_line_distances,
+)
+from graph_registry import graph_registry
+
+SLOT_SECONDS = 15 * 60
+SLOTS_PER_DAY = 24 * 60 * 60 // SLOT_SECONDS
+
+# Free-flow speeds (km/h) by osmnx 'highway' value, used when 'maxspeed' is missing
+DEFAULT_SPEEDS_KMH = {
+    "motorway": 90,
+    "motorway_link": 50,
+    "trunk": 70,
+    "trunk_link": 40,
+    "primary": 50,
+    "primary_link": 35,
+    "secondary": 40,
+    "secondary_link": 30,
+    "tertiary": 35,
+    "tertiary_link": 25,
+    "unclassified": 30,
+    "residential": 25,
+    "living_street": 10,
+    "service": 15,
+}
+FALLBACK_SPEED_KMH = 30
+
+# Roads that carry through traffic slow down most in the peaks
+ARTERIAL_HIGHWAYS = {
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link",
+}
+
+# (start hour, end hour, speed factor) for Chandigarh's morning and evening peaks
+ARTERIAL_PEAKS = [(8.0, 10.5, 0.55), (17.0, 20.0, 0.5)]
+LOCAL_PEAKS = [(8.0, 10.5, 0.8), (17.0, 20.0, 0.75)]
+
+_MPH_TO_KMH = 1.609344
+
+
+def congestion_profile(peaks, base=1.0):
+    """
+    Speed factors for each slot of the day.
+
+    Args:
+        peaks: list of (start hour, end hour, factor); factors ramp in and
+            out over one slot on each side so speeds do not jump abruptly
+        base: factor outside the peaks
+
+    Returns:
+        float32 array of length SLOTS_PER_DAY
+    """
+    hours = (np.arange(SLOTS_PER_DAY) + 0.5) * SLOT_SECONDS / 3600
+    ramp = SLOT_SECONDS / 3600
+    profile = np.full(SLOTS_PER_DAY, base, dtype=np.float64)
+    for start, end, factor in peaks:
+        # 1 inside the peak, 0 outside, linear over one slot at the edges
+        weight = np.clip(np.minimum(hours - start, end - hours) / ramp + 0.5, 0, 1)
+        profile = np.minimum(profile, base - (base - factor) * weight)
+    return profile.astype(np.float32)
+
+
+def parse_maxspeed(value):
+    """
+    Speed in km/h from an OSM 'maxspeed' tag, or None if it is not numeric.
+
+    Handles "50", "50 km/h", "30 mph" and osmnx lists of those (the lowest wins).
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        speeds = [s for s in (parse_maxspeed(v) for v in value) if s is not None]
+        return min(speeds) if speeds else None
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(mph)?", str(value))
+    if not match or float(match.group(1)) <= 0:
+        return None
+    speed = float(match.group(1))
+    return speed * _MPH_TO_KMH if match.group(2) else speed
+
+
+def _highway(value):
+    """First 'highway' value of an edge (osmnx may store a list)."""
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+class SpeedProfiles:
+    """
+    Per-edge speed profiles aligned with one CompactGraph.
+
+    speeds[e, slot] is the speed in km/h on CSR edge e during that slot.
+    """
+
+    def __init__(self, graph, speeds):
+        if speeds.shape != (graph.num_edges, SLOTS_PER_DAY):
+            raise ValueError(
+                f"Speed matrix must have shape ({graph.num_edges}, {SLOTS_PER_DAY}), got {speeds.shape}"
+            )
+        if speeds.size and not np.all(speeds > 0):
+            raise ValueError("Speeds must be positive")
+        self.graph = graph
+        self.graph_version = graph.version
+        self.speeds = speeds
+        self.max_speed_ms = float(speeds.max()) / 3.6 if speeds.size else 1.0
+        self._slot_costs = [None] * SLOTS_PER_DAY
+
+    def matches(self, G):
+        return get_compact_graph(G).version == self.graph_version
+
+    def nbytes(self):
+        return self.speeds.nbytes
+
+    def slot_costs(self, slot):
+        """
+        Seconds to drive every edge at the speeds of one slot.
+
+        Converted to a Python list on first use of the slot, since the
+        search loop indexes it per edge.
+        """
+        costs = self._slot_costs[slot]
+        if costs is None:
+            costs = (self.graph.weights / (self.speeds[:, slot] / 3.6)).tolist()
+            self._slot_costs[slot] = costs
+        return costs
+
+
+def build_speed_profiles(G, overrides=None, speeds_kmh=None):
+    """
+    Derive speed profiles from the road tags of G.
+
+    Args:
+        G: NetworkX graph from osmnx (the source of 'maxspeed'/'highway'),
+            or a CompactGraph, whose road_classes give the default speed of
+            each edge's 'highway' type; edges without one (or graphs built
+            without road classes) get FALLBACK_SPEED_KMH with the local
+            congestion curve
+        overrides: optional dict of (u, v) node ids -> km/h, either one
+            number for every slot or a sequence of SLOTS_PER_DAY values
+        speeds_kmh: optional dict of highway -> km/h replacing entries of
+            DEFAULT_SPEEDS_KMH
+
+    Returns:
+        SpeedProfiles
+    """
+    graph = get_compact_graph(G)
+    defaults = dict(DEFAULT_SPEEDS_KMH, **(speeds_kmh or {}))
+    arterial = congestion_profile(ARTERIAL_PEAKS)
+    local = congestion_profile(LOCAL_PEAKS)
+
+    base = np.full(graph.num_edges, FALLBACK_SPEED_KMH, dtype=np.float32)
+    is_arterial = np.zeros(graph.num_edges, dtype=bool)
+    sources = np.repeat(np.arange(graph.num_nodes), np.diff(graph.offsets))
+    edge_index = {(u, v): e for e, (u, v) in enumerate(zip(sources.tolist(), graph.targets.tolist()))}
+
+    if isinstance(G, CompactGraph):
+        if graph.road_classes is not None:
+            class_speeds = np.array([defaults.get(name, FALLBACK_SPEED_KMH) for name in ROAD_CLASSES],
+                                    dtype=np.float32)
+            class_arterial = np.array([name in ARTERIAL_HIGHWAYS for name in ROAD_CLASSES])
+            base = class_speeds[graph.road_classes]
+            is_arterial = class_arterial[graph.road_classes]
+    else:
+        index = graph.node_index
+        # CompactGraph keeps the shortest of parallel edges; take tags from that one
+        chosen = {}
+        for u, v, data in G.edges(data=True):
+            if u == v:
+                continue
+            length = data.get("length", 1)
+            length = 1 if length is None else length
+            pairs = [(index[u], index[v])]
+            if not G.is_directed():
+                pairs.append((index[v], index[u]))
+            for pair in pairs:
+                if pair not in chosen or length < chosen[pair][0]:
+                    chosen[pair] = (length, data)
+        for pair, (_, data) in chosen.items():
+            e = edge_index[pair]
+            highway = _highway(data.get("highway"))
+            speed = parse_maxspeed(data.get("maxspeed")) or defaults.get(highway, FALLBACK_SPEED_KMH)
+            base[e] = speed
+            is_arterial[e] = highway in ARTERIAL_HIGHWAYS
+
+    speeds = base[:, None] * np.where(is_arterial[:, None], arterial[None, :], local[None, :])
+
+    for (u, v), override in (overrides or {}).items():
+        e = edge_index.get((graph.index_of(u), graph.index_of(v)))
+        if e is None:
+            raise ValueError(f"No edge from {u} to {v}")
+        row = np.asarray(override, dtype=np.float32)
+        if row.ndim > 1 or (row.ndim == 1 and len(row) != SLOTS_PER_DAY):
+            raise ValueError(f"Override for ({u}, {v}) must be one speed or {SLOTS_PER_DAY} speeds")
+        speeds[e] = row
+
+    return SpeedProfiles(graph, np.ascontiguousarray(speeds, dtype=np.float32))
+
+
+def get_speed_profiles(G):
+    """
+    Return the default speed profiles for G.
+
+    Kept in the graph_registry under the graph's content version, so every
+    session routing on the same graph shares one matrix.
+    """
+    graph = get_compact_graph(G)
+    key = ("speed_profiles", graph.version)
+    return graph_registry.get(key, lambda: build_speed_profiles(G))
+
+
+def seconds_since_midnight(depart_at):
+    """Departure as seconds since midnight from a number, datetime.time or datetime."""
+    if isinstance(depart_at, datetime):
+        depart_at = depart_at.time()
+    if isinstance(depart_at, dt_time):
+        return depart_at.hour * 3600 + depart_at.minute * 60 + depart_at.second + depart_at.microsecond / 1e6
+    try:
+        return float(depart_at)
+    except (TypeError, ValueError):
+        raise ValueError("depart_at must be seconds since midnight, a datetime.time or a datetime")
+
+
+def _time_dependent_search(profiles, source, target, depart_s, heuristic=True):
+    """
+    Earliest-arrival search between dense indices.
+
+    With heuristic, A* uses the straight-line distance at the fastest speed
+    anywhere in the profiles, which never overestimates the remaining time.
+
+    Returns:
+        (path, arrival time in seconds, settled_count)
+    """
+    graph = profiles.graph
+    offsets, targets, _ = graph.adjacency()
+    if heuristic:
+        h = (straight_line_distances(graph, target) / profiles.max_speed_ms).tolist()
+    else:
+        h = [0.0] * graph.num_nodes
+    slot_costs = profiles.slot_costs
+    n = graph.num_nodes
+    arrival = [math.inf] * n
+    predecessors = [-1] * n
+    settled = bytearray(n)
+    arrival[source] = depart_s
+    pq = [(depart_s + h[source], source)]
+    settled_count = 0
+
+    while pq:
+        (_, node) = heapq.heappop(pq)
+
+        if settled[node]:
+            continue
+
+        settled[node] = 1
+        settled_count += 1
+        now = arrival[node]
+
+        if node == target:
+            return _reconstruct_path(graph.ids, predecessors, target), now, settled_count
+
+        # One slot lookup per settled node; edges that run past the slot end are rare
+        slot_index = int(now // SLOT_SECONDS)
+        slot_end = (slot_index + 1) * SLOT_SECONDS
+        costs = slot_costs(slot_index % SLOTS_PER_DAY)
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            # Closed edges, and edges the graph's profile may not use, weigh inf
+            cost = costs[e]
+            if settled[neighbor] or cost == math.inf:
+                continue
+
+            new_time = now + cost
+            if new_time > slot_end:
+                new_time = _cross_slots(slot_costs, e, now, slot_index)
+
+            if new_time < arrival[neighbor]:
+                arrival[neighbor] = new_time
+                predecessors[neighbor] = node
+                heapq.heappush(pq, (new_time + h[neighbor], neighbor))
+
+    return None, math.inf, settled_count
+
+
+def _cross_slots(slot_costs, e, now, slot_index):
+    """
+    Arrival time on edge e entered at now, changing speed at each slot boundary.
+
+    Profiles repeat every day, so an edge still unfinished after a full day
+    of slots skips ahead by the whole days left instead of walking them slot
+    by slot; an edge that cannot be driven at all takes inf.
+    """
+    remaining = 1.0  # fraction of the edge still to drive
+    day_start = None  # (slot index, remaining) at the first slot boundary
+    while True:
+        cost = slot_costs(slot_index % SLOTS_PER_DAY)[e]
+        if cost == math.inf:
+            return math.inf
+        slot_end = (slot_index + 1) * SLOT_SECONDS
+        if now + remaining * cost <= slot_end:
+            return now + remaining * cost
+        remaining -= (slot_end - now) / cost
+        now = slot_end
+        slot_index += 1
+        if day_start is None:
+            day_start = (slot_index, remaining)
+        elif slot_index - day_start[0] == SLOTS_PER_DAY:
+            per_day = day_start[1] - remaining
+            days = math.floor(remaining / per_day)
+            now += days * SLOTS_PER_DAY * SLOT_SECONDS
+            slot_index += days * SLOTS_PER_DAY
+            remaining -= days * per_day
+            day_start = (slot_index, remaining)
+
+
+def fastest_route(G, start, end, depart_at, profiles=None, heuristic=True):
+    """
+    Earliest-arrival route for a departure time.
+
+    Args:
+        G: NetworkX graph or CompactGraph
+        start, end: Original node ids
+        depart_at: Seconds since midnight, datetime.time or datetime
+        profiles: SpeedProfiles for G; defaults to get_speed_profiles(G)
+        heuristic: A* (True) or plain Dijkstra (False)
+
+    Returns:
+        dict with path (None if unreachable), travel_time_s, distance_m,
+        depart_s, arrival_s, settled_nodes and engine
+    """
+    graph = get_compact_graph(G)
+    if profiles is None:
+        profiles = get_speed_profiles(G)
+    elif profiles.graph_version != graph.version:
+        raise ValueError("Speed profiles were built for a different graph")
+    depart_s = seconds_since_midnight(depart_at)
+    path, arrival_s, settled = _time_dependent_search(
+        profiles, graph.index_of(start), graph.index_of(end), depart_s, heuristic=heuristic
+    )
+    distance = math.inf
+    if path is not None:
+        distance = sum(graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:]))
+    return {
+        "path": path,
+        "travel_time_s": arrival_s - depart_s,
+        "distance_m": distance,
+        "depart_s": depart_s,
+        "arrival_s": arrival_s,
+        "settled_nodes": settled,
+        "engine": "time_dependent",
+    }